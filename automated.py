@@ -1,19 +1,120 @@
 """
 The class automated.FarklePlayer makes decisions automatically based on a strategy.
+
+The strategy keeps rolling until the turn score reaches an ideal score that depends on the
+situation. The ideal scores are parameters, so number1, number2 and number3 are the same
+strategy with different ideal scores, and thresholdsweep searches for the best ones.
 """
 
+# Updates 2026-10-18
+#    - Rewrote take_turn() around a decision core built from the constant tables below. The
+#      strategy is chosen once per turn, and each roll is decided in a single pass over the
+#      scorings without building lists, dictionaries or closures. The choices are unchanged.
+
+import bisect
+
+import farkleodds
 
 __AUTHOR__ = 'BEN'
 
+# The strategies, in order of priority, and what the player says when rolling under each:
+#   0  the high score has reached 10,000 and someone else holds it: roll until ahead of it
+#   1  two Farkles in a row: take the highest scoring and stop
+#   2  not yet on the board: roll until the turn reaches its ideal score
+#   3  at least 1,500 points behind a high score of 5,000 or more: as for 2
+#   4  otherwise: as for 2
+STRATEGY_COMMENTS = ('Time for hot dice!',
+                     'I need to play it safe!',
+                     'I am ready to start!',
+                     'I need to catch up!',
+                     'No need to risk that much.')
+
+# What the player says after scoring, once the turn score reaches each threshold
+SCORING_THRESHOLDS = (50, 300, 900, 2500)
+SCORING_COMMENTS = ('Better than nothing.',
+                    'Totally worth it!',
+                    'That was a great roll!',
+                    'I am the ultimate Farkle player!!!')
+
+# What the player says at the end of the turn, once the turn score reaches each threshold
+TURN_THRESHOLDS = (50, 300, 900, 1500, 10000)
+TURN_COMMENTS = ("At least I didn't farkle.",
+                 'That was pretty good.',
+                 'You know what? I will take it.',
+                 'Wow! That is a lot!',
+                 'Good match!')
+
+
+def strategy_for(my_score, high_score, farkle_danger_level):
+    """
+    Choose the strategy for a turn
+    Args:
+        my_score: the player's score
+        high_score: the high score among all players
+        farkle_danger_level: the player's Farkle danger level
+
+    Returns:
+        the number of the strategy, between 0 and 4 (see STRATEGY_COMMENTS)
+    """
+    if high_score >= 10000 and high_score > my_score:
+        return 0
+    if farkle_danger_level == 2:
+        return 1
+    if my_score == 0:
+        return 2
+    if high_score - my_score >= 1500 and high_score >= 5000:
+        return 3
+    return 4
+
+
+def choose_scoring(scorings, score_this_turn, nbr_of_dice, ideal_score):
+    """
+    Choose a scoring under strategies 2 to 4
+    Args:
+        scorings: the scorings of a roll, highest score first
+        score_this_turn: the points scored so far this turn, before this roll
+        nbr_of_dice: the number of dice rolled
+        ideal_score: the turn score to reach before stopping
+
+    Returns:
+        a 2-tuple (index of the chosen scoring, True to roll again). Below the ideal score,
+        the choice is the highest scoring among those using the fewest dice, and the player
+        rolls again. Otherwise it is the highest scoring, and the player rolls again only
+        with hot dice.
+    """
+    if scorings[0][0] + score_this_turn < ideal_score:
+        choice = 0      # Replaced by the first scoring
+        fewest_dice = 7
+        best_score = 0
+        index = 0
+        for score, dice in scorings:
+            dice_used = len(dice)
+            if dice_used < fewest_dice or (dice_used == fewest_dice and score > best_score):
+                choice, fewest_dice, best_score = index, dice_used, score
+            index += 1
+        return choice, True
+    return 0, nbr_of_dice == len(scorings[0][1])
+
 
 class FarklePlayer:
     """ A Farkle player who makes decisions based on a programmed strategy"""
 
-    FARKLE_ODDS = (None, 2 / 3, 1 / 2.3, 1 / 3.6, 1 / 6.4, 1 / 13, 1 / 43.2)
+    FARKLE_ODDS = farkleodds.FARKLE_ODDS      # The exact probability of a Farkle for each number of dice
+
+    # The ideal score for a turn, indexed by strategy: 2 when getting on the board,
+    # 3 when catching up with the leader and 4 otherwise. Strategies 0 and 1 ignore it.
+    IDEAL_SCORES = (0, 0, 500, 900, 300)
 
-    def __init__(self, name):
-        """Initialize a player with a given name"""
+    def __init__(self, name, ideal_scores=None):
+        """
+        Initialize a player
+        Args:
+            name: the player's name
+            ideal_scores: a sequence of 5 ideal scores, as for IDEAL_SCORES, or None to use IDEAL_SCORES
+        """
         self._name = name
+        self._ideal_scores = tuple(self.IDEAL_SCORES if ideal_scores is None else ideal_scores)
+        assert len(self._ideal_scores) == 5, 'There is one ideal score for each of the 5 strategies'
 
     def name(self):
         """Get this player's name"""
@@ -38,125 +139,37 @@ class FarklePlayer:
 
         my_score = match.score_for(self.name())
         high_score = match.high_score()
-        farkle_danger_level = match.farkle_danger_level(self.name())
 
-        wants_to_keep_going = True
+        # The situation cannot change during the turn, so neither can the strategy
+        strat = strategy_for(my_score, high_score, match.farkle_danger_level(self.name()))
+        commentary = STRATEGY_COMMENTS[strat]
+        ideal_score = self._ideal_scores[strat]
+
         roll_number = 0
         score_this_turn = 0
         nbr_of_dice = 6          # Start with 6
         scorings = None
-
-        # start with cont as true to read through the dictionary
-        cont = True
-
-        while roll_number == 0 or wants_to_keep_going:
-
-            # determine what you should answer for the first question,
-            # as well as risk value
-            comments = {0: ((high_score >= 10000 and high_score > my_score), 'Time for hot dice!'),
-                        1: ((farkle_danger_level == 2), 'I need to play it safe!'),
-                        2: ((my_score == 0), 'I am ready to start!'),
-                        3: ((high_score - my_score >= 1500 and high_score >= 5000),
-                            'I need to catch up!'),
-                        4: (True, 'No need to risk that much.')}
-
-            # determine which parameter of the dictionary is true first,
-            # then assign comment and strategy value
-            for i in range(5):
-                if comments[i][0] and cont:
-                    strat, commentary, cont = (i, comments[i][1], False)
-
-            # roll the die
+        wants_to_keep_going = True
+        while wants_to_keep_going:
             roll_number += 1
             scorings = match.roll(commentary)
 
-            # determine the number of dice in the highest score selection
-            nbr_in_scoring = len((scorings[0])[1])
-            # determine how many dice will be left after highest score is chosen
-            nbr_left = nbr_of_dice - nbr_in_scoring
-
-            def play(ideal_score):
-                """
-                How the player would continue rolling if the score is not as high as desired.
-
-                Argument-
-                    ideal_score = desired score (int)
-
-                Return-
-                    choice = index of the selection with highest score and
-                    lowest amount of die (int)
-
-                    go_on = decision to roll again or not (bool)
-                """
-                # create empty lists for potential scores and dice
-                p_scoring, p_dice = ([], [])
-                for amount, dice in scorings:
-                    p_scoring.append(amount)
-                    p_dice.append(len(dice))
-
-                # finding highest score and lowest amount of dice
-                max_score, min_dice = (max(p_scoring), min(p_dice))
-
-                # if the score is less than the desired score
-                if max_score + score_this_turn < ideal_score:
-                    # if the amount of dice is not the lowest, make the matching score be zero
-                    for p_die in p_dice:
-                        if min_dice < p_die:
-                            p_scoring[p_dice.index(p_die)], p_dice[p_dice.index(p_die)] = (0, None)
-                    # choose the scoring with the lowest amount of dice and the highest score
-                    choice = p_scoring.index(max(p_scoring))
-                    # determine how many dice are left
-                    nbr_left_1 = nbr_of_dice - p_dice[choice]
-                    # roll again if the score this turn is less than the ideal score
-                    # or if the number of dice left is zero
-                    go_on = bool(max_score + score_this_turn < ideal_score or nbr_left_1 == 0)
-                # if the score is more than or equal to the desired score
-                else:
-                    # choose highest score and roll again if the amount of dice left is zero
-                    choice, go_on = (0, bool(nbr_left == 0))
-
-                # return index of choice of score, if you will roll again or not
-                return [choice, go_on]
-
-            # how to choose to roll again or not depending on strategy value
             if strat == 1:
-                selection, wants_to_keep_going = (0, False)
-            elif 2 <= strat <= 4:
-                p_ideal_scores = [0, 0, 500, 900, 300]
-                selection, wants_to_keep_going = play(p_ideal_scores[strat])
+                selection, wants_to_keep_going = 0, False
+            elif strat == 0:
+                selection, wants_to_keep_going = 0, my_score + score_this_turn < high_score
             else:
-                selection, wants_to_keep_going = (0,
-                                                  bool((my_score + score_this_turn) < high_score))
-
-            # determining  and adding score to score this turn
-            scoring = (scorings[selection])[0]
-            score_this_turn += scoring
-
-            # create list with score limits and appropriate responses
-            comments_1 = [(50, 'Better than nothing.'), (300, 'Totally worth it!'),
-                          (900, 'That was a great roll!'),
-                          (2500, 'I am the ultimate Farkle player!!!')]
-            # determine what to say in response to the second question
-            for score, comment in comments_1:
-                if score_this_turn >= score:
-                    commentary_1 = comment
-
-            # determine number of dice left and say your response
-            nbr_of_dice = match.score_as(selection, commentary_1)
+                selection, wants_to_keep_going = choose_scoring(scorings, score_this_turn, nbr_of_dice, ideal_score)
 
-        # create list with scores of this turn limits and appropriate responses
-        comments_2 = [(50, "At least I didn't farkle."), (300, 'That was pretty good.'),
-                      (900, 'You know what? I will take it.'), (1500, 'Wow! That is a lot!'),
-                      (10000, 'Good match!')]
-
-        # determining what to say in response to the third question
-        for score, comment in comments_2:
-            if score_this_turn >= score or my_score + score_this_turn >= 10000:
-                commentary_2 = comment
+            score_this_turn += scorings[selection][0]
+            commentary_1 = SCORING_COMMENTS[bisect.bisect_right(SCORING_THRESHOLDS, score_this_turn) - 1]
+            nbr_of_dice = match.score_as(selection, commentary_1)
 
         # Turn ends
         if not scorings:
             # No scorings are available!
             print(f'Farkle after roll #{roll_number}!')
 
-        return commentary_2
+        if my_score + score_this_turn >= 10000:
+            return TURN_COMMENTS[-1]
+        return TURN_COMMENTS[bisect.bisect_right(TURN_THRESHOLDS, score_this_turn) - 1]
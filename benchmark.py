@@ -0,0 +1,172 @@
+"""
+Measure the speed of scoring, dice, score keeping and whole matches.
+
+Every benchmark uses fixed seeds, so each run does exactly the same work. The rates are
+compared with the baseline file, and the run fails if any benchmark is more than
+TOLERANCE slower than its baseline. A benchmark missing from the baseline, such as one added
+since the baseline was recorded, is added to it.
+
+    python benchmark.py                     # compare with the baseline (record one if there is none)
+    python benchmark.py --save              # record the current rates as the new baseline
+    python benchmark.py --baseline <file>   # use another baseline file
+
+Baselines depend on the machine, so no reference baseline is kept in the repository: the
+default file, benchmark_baseline.json beside this script, is ignored by git. Record one with
+--save on the machine that runs the comparison, from the commit to compare against, and keep
+it there (or pass --baseline to keep it outside the working tree).
+"""
+
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import farkle
+import farklematch
+import farklescoring
+import scoresheet2
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+TOLERANCE = 0.25        # The largest slowdown accepted, as a fraction of the baseline rate
+REPEATS = 5             # Each benchmark is timed this many times and the best time is kept
+
+PLAYER_MODULES = ('automated', 'simpleauto', 'number1', 'number2', 'number3', 'optimal')
+
+
+def best_rate(operation, count):
+    """
+    Time an operation
+    Args:
+        operation: a function of no arguments
+        count: the number of items the operation processes in one call
+
+    Returns:
+        the number of items processed per second in the fastest of REPEATS calls
+    """
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def fixed_rolls(n, count, seed):
+    """Generate count rolls of n dice from a fixed seed"""
+    rng = random.Random(seed)
+    return [tuple(rng.randint(1, 6) for _ in range(n)) for _ in range(count)]
+
+
+def scoring_benchmarks():
+    """Time scorings_for(), table lookups, merge_scorings() and histogram_for()"""
+    rates = {}
+    table = farklescoring.build_scorings_table()
+    for n in range(1, 7):
+        rolls = fixed_rolls(n, 2000, n)
+        rates[f'scorings_for {n} dice'] = best_rate(
+            lambda: [farklescoring.scorings_for(roll) for roll in rolls], len(rolls))
+        rates[f'table_scorings_for {n} dice'] = best_rate(
+            lambda: [farklescoring.table_scorings_for(table, roll) for roll in rolls], len(rolls))
+
+    pairs = [(farklescoring.scorings_for(left), farklescoring.scorings_for(right))
+             for left, right in zip(fixed_rolls(3, 2000, 7), fixed_rolls(3, 2000, 8))]
+    rates['merge_scorings'] = best_rate(
+        lambda: [farklescoring.merge_scorings(left, right) for left, right in pairs], len(pairs))
+
+    rolls = fixed_rolls(6, 10000, 9)
+    rates['histogram_for'] = best_rate(lambda: [farkle.histogram_for(roll) for roll in rolls], len(rolls))
+    return rates
+
+
+def score_sheet_benchmarks():
+    """Time ScoreSheet.add_score(), score_for() and __str__()"""
+    rng = random.Random(10)
+    names = ['Ann', 'Bob', 'Cal']
+    entries = [(rng.choice(names), rng.choice((0, 0, 50, 300, 500, 1000, 2500))) for _ in range(300)]
+
+    def fill():
+        sheet = scoresheet2.ScoreSheet(names)
+        for name, score in entries:
+            sheet.add_score(name, score)
+        return sheet
+
+    rates = {'ScoreSheet.add_score': best_rate(fill, len(entries))}
+    sheet = fill()
+    rates['ScoreSheet.score_for'] = best_rate(lambda: [sheet.score_for(name) for name, _ in entries],
+                                              len(entries))
+    rates['ScoreSheet.__str__'] = best_rate(lambda: [str(sheet) for _ in range(20)], 20)
+    return rates
+
+
+def match_benchmarks(policy_directory):
+    """
+    Time whole silent matches between two players of each bundled kind
+    Args:
+        policy_directory: a directory for the policy files of players that solve one
+    """
+    rates = {}
+    table = farklescoring.build_scorings_table()
+    for module_name in PLAYER_MODULES:
+        module = importlib.import_module(module_name)
+        if hasattr(module.FarklePlayer, 'POLICY_FILE'):
+            module.FarklePlayer.POLICY_FILE = os.path.join(policy_directory, f'{module_name}_policy.bin')
+
+        def play_matches():
+            for seed in range(20):
+                random.seed(seed)
+                match = farklematch.FarkleMatch([module.FarklePlayer('A'), module.FarklePlayer('B')],
+                                                silent=True, scorings_table=table)
+                match.start_play()
+
+        rates[f'{module_name} matches'] = best_rate(play_matches, 20)
+    return rates
+
+
+def main():
+    """Run the benchmarks and compare them with the baseline"""
+    baseline_path = BASELINE_FILE
+    if '--baseline' in sys.argv:
+        baseline_path = sys.argv[sys.argv.index('--baseline') + 1]
+
+    rates = {}
+    rates.update(scoring_benchmarks())
+    rates.update(score_sheet_benchmarks())
+    with tempfile.TemporaryDirectory() as policy_directory:
+        rates.update(match_benchmarks(policy_directory))
+
+    baseline = {}
+    if os.path.exists(baseline_path) and '--save' not in sys.argv:
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    regressions = []
+    for name, rate in rates.items():
+        line = f'{name:>32}: {rate:>12,.0f}/s'
+        if name in baseline:
+            change = rate / baseline[name] - 1
+            line += f'  {change:+.0%}'
+            if change < -TOLERANCE:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+
+    added = {name: rate for name, rate in rates.items() if name not in baseline}
+    if added:
+        with open(baseline_path, 'w') as baseline_file:
+            json.dump({**baseline, **added}, baseline_file, indent=2)
+        if baseline:
+            print(f'{len(added)} new benchmark(s) added to the baseline in {baseline_path}')
+        else:
+            print(f'Baseline saved to {baseline_path}')
+
+    if regressions:
+        print(f'FAIL: {len(regressions)} benchmark(s) more than {TOLERANCE:.0%} slower than the baseline')
+        sys.exit(1)
+    print('DONE')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Compare two Farkle players by playing matches between them until the better one is clear.
+
+Matches are played in batches, alternating which player moves first, and after each batch
+the win rate of the first player is reported with a confidence interval. Play stops as soon
+as the interval excludes 50% or the match budget is spent. Because the interval is checked
+after every batch, the confidence level is shared out across all of the possible checks, so
+stopping early does not overstate the result.
+
+Each match is seeded from the master seed in order, so an evaluation repeats exactly for a
+given master seed, whatever the number of worker processes.
+
+With common_dice=True the two matches of each pair share a seed and roll from a
+farkle.TurnSeededDice, so each player meets the same dice from each seat and luck largely
+cancels out of the comparison ("common random numbers").
+"""
+
+import collections
+import functools
+import math
+import multiprocessing
+import random
+import statistics
+
+import farkle
+import tournament
+
+# A running estimate:
+#   matches: the number of matches played so far
+#   wins: the number of those matches won by player A
+#   win_rate: the fraction of matches won by player A
+#   low, high: the bounds of the confidence interval for player A's win rate
+#   resolved: True once the interval excludes 0.5
+Estimate = collections.namedtuple('Estimate', 'matches wins win_rate low high resolved')
+
+
+def wilson_interval(wins, matches, z):
+    """
+    Compute the Wilson score interval for a win rate
+    Args:
+        wins: the number of wins
+        matches: the number of matches, at least 1
+        z: the number of standard deviations spanned on each side
+
+    Returns:
+        a 2-tuple (low, high)
+    """
+    rate = wins / matches
+    denominator = 1 + z * z / matches
+    centre = (rate + z * z / (2 * matches)) / denominator
+    spread = z * math.sqrt(rate * (1 - rate) / matches + z * z / (4 * matches * matches)) / denominator
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def _jobs(spec_a, spec_b, master_seed, common_dice=False):
+    """
+    Generate (seed, specs) jobs without end, alternating who moves first. With common_dice,
+    each pair of jobs shares a seed.
+    """
+    rng = random.Random(master_seed)
+    seat_orders = ((spec_a, spec_b), (spec_b, spec_a))
+    match_number = 0
+    seed = None
+    while True:
+        if not common_dice or match_number % 2 == 0:
+            seed = rng.getrandbits(64)
+        yield seed, seat_orders[match_number % 2]
+        match_number += 1
+
+
+def compare(spec_a, spec_b, master_seed, batch_size=100, max_matches=10000, confidence=0.95, workers=None,
+            common_dice=False):
+    """
+    Play matches between two players and stream estimates of the first player's win rate
+    Args:
+        spec_a: a tournament.PlayerSpec for player A
+        spec_b: a tournament.PlayerSpec for player B, with a different name
+        master_seed: the seed from which each match's seed is derived
+        batch_size: the number of matches between estimates, an even number so that each
+                    player moves first equally often
+        max_matches: the match budget
+        confidence: the overall confidence level of the final interval
+        workers: the number of worker processes; None uses one per CPU and 1 plays
+                 every match in this process
+        common_dice: True to play each pair of matches on the same dice, swapping seats
+
+    Returns:
+        an iterator over an Estimate for each batch. The last Estimate is either resolved
+        or covers max_matches matches.
+    """
+    assert spec_a.name != spec_b.name, 'The players need different names'
+    checks = math.ceil(max_matches / batch_size)
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence) / (2 * checks))
+
+    jobs = _jobs(spec_a, spec_b, master_seed, common_dice)
+    play_match = tournament.play_match
+    if common_dice:
+        play_match = functools.partial(tournament.play_match, dice_source=farkle.TurnSeededDice)
+    pool = multiprocessing.Pool(workers) if workers != 1 else None
+    try:
+        matches = wins = 0
+        while matches < max_matches:
+            batch = [next(jobs) for _ in range(min(batch_size, max_matches - matches))]
+            results = pool.map(play_match, batch) if pool else map(play_match, batch)
+            for result in results:
+                matches += 1
+                wins += result.winner == spec_a.name
+            low, high = wilson_interval(wins, matches, z)
+            resolved = high < 0.5 or low > 0.5
+            yield Estimate(matches, wins, wins / matches, low, high, resolved)
+            if resolved:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def evaluate(spec_a, spec_b, master_seed, **options):
+    """
+    Compare two players, as for compare(), and return only the final Estimate
+    """
+    estimate = None
+    for estimate in compare(spec_a, spec_b, master_seed, **options):
+        pass
+    return estimate
+
+
+if __name__ == '__main__':
+    player_a = tournament.PlayerSpec('automated', 'Ben')
+    player_b = tournament.PlayerSpec('simpleauto', 'Jessica')
+    for progress in compare(player_a, player_b, master_seed=1):
+        print(f'{progress.matches:>6} matches: {player_a.name} wins {progress.win_rate:.1%} '
+              f'[{progress.low:.1%}, {progress.high:.1%}]')
+    print('Resolved' if progress.resolved else 'Not resolved within the match budget')
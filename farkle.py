@@ -3,12 +3,36 @@ Farkle functions.
 
 Note a "die value" is one of 1, 2, 3, 4, 5, or 6.
 
+A "packed roll" holds the dice of a roll, in no particular order, in one int: bits 4(i - 1)
+to 4(i - 1) + 2 count the dice showing i, and the top bit of each 4-bit field is always 0.
+Packed rolls are hashable, and finding their histogram, counting their dice and setting dice
+aside all take constant time.
+
+A "dice source" is any object with a method roll(k) that returns a tuple of k die values.
+A FarkleMatch draws every roll from its dice source, so a match played from the same source
+makes the same rolls whatever else uses the random module:
+    RandomDice       a private random.Random with a seed
+    BufferedDice     a fixed sequence of die values, such as dice generated in advance
+    TurnSeededDice   a separate seeded stream for each turn, so that two strategies compared
+                     on the same seed see the same dice at the start of every turn
+    DiceStream       a seeded NumPy generator (see below)
+A source may also define roll_packed(k), which returns the roll as a packed roll, and
+begin_turn(turn_number), which the match calls at the start of each turn.
+
+The batch functions randomize_batch() and histogram_batch() and the class DiceStream work
+on many rolls at once and require NumPy.
+
 The function main() runs test cases for each function. If an  Assertion Error
 occurs, then a test case failed.
 """
 
 import random
 
+try:
+    import numpy
+except ImportError:     # Only the batch functions and DiceStream need NumPy
+    numpy = None
+
 
 def randomize(dice):
     """
@@ -62,6 +86,276 @@ def set_aside_dice(dice, selected_dice):
     return result
 
 
+# FACE_UNITS[i] is the packed roll of a single die showing i
+FACE_UNITS = (0, 1, 1 << 4, 1 << 8, 1 << 12, 1 << 16, 1 << 20)
+
+_GUARD_BITS = 0x888888      # The top bit of every field, used to detect a borrow
+
+
+def pack_dice(dice):
+    """
+    Pack a roll
+    Args:
+        dice: a sequence (possibly empty) of die values
+
+    Returns:
+        the packed roll holding the same dice
+    """
+    packed = 0
+    for top in dice:
+        packed += FACE_UNITS[top]
+    return packed
+
+
+def unpack_dice(packed):
+    """
+    Unpack a roll
+    Args:
+        packed: a packed roll
+
+    Returns:
+        a tuple of the die values in the roll, in sorted order
+    """
+    result = ()
+    for top in range(1, 7):
+        result += (top,) * ((packed >> 4 * (top - 1)) & 7)
+    return result
+
+
+def packed_histogram(packed):
+    """
+    Create a histogram of a packed roll
+    Args:
+        packed: a packed roll
+
+    Returns:
+        a list H such that H[0] is 0 and H[i] is the number of dice showing i, 0 < i ≤ 6,
+        as for histogram_for()
+    """
+    return [0, packed & 7, (packed >> 4) & 7, (packed >> 8) & 7,
+            (packed >> 12) & 7, (packed >> 16) & 7, (packed >> 20) & 7]
+
+
+def packed_count(packed):
+    """
+    Count the dice in a packed roll
+    Args:
+        packed: a packed roll of at most 14 dice
+
+    Returns:
+        the number of dice in the roll
+    """
+    # 16 leaves a remainder of 1 when divided by 15, so the remainder is the sum of the fields
+    return packed % 15
+
+
+def packed_set_aside(packed, selected):
+    """
+    Set aside some of the dice of a packed roll
+    Args:
+        packed: a packed roll
+        selected: a packed roll of the dice to set aside, all of which are in packed
+
+    Returns:
+        the packed roll of the dice remaining
+    """
+    # A field that would go below 0 borrows from its guard bit, clearing it
+    remaining = (packed | _GUARD_BITS) - selected
+    assert remaining & _GUARD_BITS == _GUARD_BITS, 'The selected dice are not all in the roll'
+    return remaining - _GUARD_BITS
+
+
+class RandomDice:
+    """
+    A dice source drawing from its own random.Random.
+
+    The rolls are the same as those made with the random module after random.seed(seed).
+    """
+
+    def __init__(self, seed=None):
+        """
+        Initialize a source
+        Args:
+            seed: any value accepted by random.Random(); None for fresh entropy
+        """
+        self._randint = random.Random(seed).randint
+
+    def roll(self, k):
+        """Roll k dice and return a tuple of their values"""
+        randint = self._randint
+        return tuple(randint(1, 6) for _ in range(k))
+
+    def roll_packed(self, k):
+        """Roll k dice and return the packed roll"""
+        randint = self._randint
+        packed = 0
+        for _ in range(k):
+            packed += FACE_UNITS[randint(1, 6)]
+        return packed
+
+
+class BufferedDice:
+    """
+    A dice source that hands out a fixed sequence of die values in order
+    """
+
+    def __init__(self, values):
+        """
+        Initialize a source
+        Args:
+            values: a sequence of die values
+        """
+        self._values = tuple(values)
+        self._position = 0
+
+    def remaining(self):
+        """Get the number of die values not yet rolled"""
+        return len(self._values) - self._position
+
+    def roll(self, k):
+        """
+        Roll k dice
+        Returns:
+            a tuple of the next k die values
+        Raises:
+            IndexError if fewer than k values remain
+        """
+        position = self._position
+        if position + k > len(self._values):
+            raise IndexError(f'Only {len(self._values) - position} die values remain, not {k}')
+        self._position = position + k
+        return self._values[position:position + k]
+
+
+class TurnSeededDice:
+    """
+    A dice source with a separate random stream for each turn.
+
+    The stream for a turn depends only on the seed and the turn number, so a different
+    choice in one turn never changes the dice rolled in any other turn. Comparing two
+    strategies on the same seeds ("common random numbers") then needs far fewer matches.
+    """
+
+    def __init__(self, seed):
+        """
+        Initialize a source
+        Args:
+            seed: an int
+        """
+        self._seed = seed
+        self._rng = random.Random()
+        self.begin_turn(1)
+
+    def begin_turn(self, turn_number):
+        """Start the stream for a turn"""
+        self._rng.seed(self._seed * 1000003 + turn_number)
+        self._randint = self._rng.randint
+
+    def roll(self, k):
+        """Roll k dice and return a tuple of their values"""
+        randint = self._randint
+        return tuple(randint(1, 6) for _ in range(k))
+
+    def roll_packed(self, k):
+        """Roll k dice and return the packed roll"""
+        randint = self._randint
+        packed = 0
+        for _ in range(k):
+            packed += FACE_UNITS[randint(1, 6)]
+        return packed
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is not installed"""
+    if numpy is None:
+        raise ImportError('The batch dice functions require NumPy')
+
+
+def randomize_batch(n, k, rng=None):
+    """
+    Roll k dice n times at once
+    Args:
+        n: the number of rolls
+        k: the number of dice in each roll
+        rng: a numpy.random.Generator, a seed for one, or None for fresh entropy
+
+    Returns:
+        a NumPy array of shape (n, k) and type uint8 whose rows are rolls of die values
+    """
+    _require_numpy()
+    return numpy.random.default_rng(rng).integers(1, 7, size=(n, k), dtype=numpy.uint8)
+
+
+def histogram_batch(rolls):
+    """
+    Create a histogram for each of many rolls
+    Args:
+        rolls: a 2-dimensional array of die values, one roll per row. A 0 marks
+               a missing die, so rows may hold rolls of different sizes.
+
+    Returns:
+        an int array H of shape (n, 7) such that H[r, 0] is 0 and H[r, i] is the number of
+        occurrences of i in row r, 0 < i ≤ 6.
+    """
+    _require_numpy()
+    rolls = numpy.asarray(rolls)
+    n = rolls.shape[0]
+    # Give each row its own block of 7 bins so a single bincount handles every row
+    bins = rolls.astype(numpy.intp) + 7 * numpy.arange(n, dtype=numpy.intp)[:, None]
+    result = numpy.bincount(bins.ravel(), minlength=7 * n).reshape(n, 7)
+    result[:, 0] = 0
+    return result
+
+
+class DiceStream:
+    """
+    A seeded stream of die values that is drawn from one roll at a time.
+
+    Die values are generated in large blocks, so each roll costs only a slice.
+    """
+
+    BLOCK_SIZE = 65536
+
+    def __init__(self, seed=None):
+        """
+        Initialize a stream
+        Args:
+            seed: a seed for the stream's numpy.random.Generator; None for fresh entropy
+        """
+        _require_numpy()
+        self._rng = numpy.random.default_rng(seed)
+        self._values = []
+        self._position = 0
+
+    def roll(self, k):
+        """
+        Roll dice
+        Args:
+            k: the number of dice to roll, between 1 and 6
+
+        Returns:
+            a tuple of k die values
+        """
+        position = self._position
+        if position + k > len(self._values):
+            self._values = self._rng.integers(1, 7, size=self.BLOCK_SIZE, dtype=numpy.uint8).tolist()
+            position = 0
+        self._position = position + k
+        return tuple(self._values[position:position + k])
+
+    def batch(self, n, k):
+        """
+        Roll k dice n times at once, as for randomize_batch()
+        Args:
+            n: the number of rolls
+            k: the number of dice in each roll
+
+        Returns:
+            a NumPy array of shape (n, k) and type uint8 whose rows are rolls of die values
+        """
+        return randomize_batch(n, k, self._rng)
+
+
 def main():
     """
     Test the functions above. The first test case failure will terminate program execution.
@@ -141,6 +435,60 @@ def main():
         assert sorted(result) == sorted(expected_result), \
             f'    FAIL: expected: {expected_result}.  Note: order does not matter.'
 
+    print('TESTING packed rolls')
+    for dice, expected_hist in histogram_for_test_cases:
+        packed = pack_dice(dice)
+        assert unpack_dice(packed) == tuple(sorted(dice)), f'    FAIL: expected {sorted(dice)}'
+        assert packed_histogram(packed) == expected_hist, f'    FAIL: expected {expected_hist}'
+        assert packed_count(packed) == len(dice), f'    FAIL: expected {len(dice)} dice'
+    for dice, selected_dice, expected_result in set_aside_test_cases:
+        result = packed_set_aside(pack_dice(dice), pack_dice(selected_dice))
+        assert result == pack_dice(expected_result), f'    FAIL: expected: {expected_result}'
+    try:
+        packed_set_aside(pack_dice([1, 1, 4, 5]), pack_dice([5, 5]))
+        assert False, '    FAIL: expected an AssertionError for dice not in the roll'
+    except AssertionError as error:
+        assert 'not all in the roll' in str(error), str(error)
+
+    print('TESTING dice sources')
+    random.seed(7771)
+    expected_rolls = [tuple(random.randint(1, 6) for _ in range(k)) for k in (6, 4, 1, 6)]
+    source = RandomDice(7771)
+    assert [source.roll(k) for k in (6, 4, 1)] == expected_rolls[:3], '    FAIL: expected the rolls of random.seed(7771)'
+    assert source.roll_packed(6) == pack_dice(expected_rolls[3]), '    FAIL: expected the same packed roll'
+    source = BufferedDice([1, 2, 3, 4, 5])
+    assert source.roll(2) == (1, 2) and source.roll(3) == (3, 4, 5), '    FAIL: expected the buffered values'
+    try:
+        source.roll(1)
+        assert False, '    FAIL: expected an IndexError'
+    except IndexError:
+        pass
+    source_1, source_2 = TurnSeededDice(5), TurnSeededDice(5)
+    source_1.begin_turn(3)
+    source_1.roll(6)
+    source_1.begin_turn(4)
+    source_2.begin_turn(4)
+    assert source_1.roll(6) == source_2.roll(6), '    FAIL: expected the same dice at the start of turn 4'
+
+    if numpy is not None:
+        print('TESTING randomize_batch() and histogram_batch()')
+        rolls = randomize_batch(1000, 6, 7771)
+        assert rolls.shape == (1000, 6), '    FAIL: expected shape (1000, 6)'
+        assert rolls.min() >= 1 and rolls.max() <= 6, '    FAIL: expected die values'
+        assert (rolls == randomize_batch(1000, 6, 7771)).all(), '    FAIL: expected the same rolls for the same seed'
+        hists = histogram_batch(rolls)
+        for roll, hist in zip(rolls.tolist(), hists.tolist()):
+            assert hist == histogram_for(roll), f'    FAIL: histogram_batch() disagrees for {roll}'
+        for dice, expected_hist in histogram_for_test_cases:
+            padded = [dice + [0] * (6 - len(dice))]
+            assert histogram_batch(padded).tolist() == [expected_hist], f'    FAIL: expected {expected_hist}'
+
+        print('TESTING DiceStream')
+        stream_1, stream_2 = DiceStream(7771), DiceStream(7771)
+        for k in (6, 5, 1, 3) * 50000:
+            roll = stream_1.roll(k)
+            assert len(roll) == k and roll == stream_2.roll(k), '    FAIL: expected matching rolls of k dice'
+
     print('DONE')
 
 
@@ -0,0 +1,340 @@
+"""
+Train and evaluate learned Farkle strategies on many matches at once.
+
+FarkleEnv holds a batch of independent two-player matches between an agent and an opponent,
+played by the rules of FarkleMatch and scored with the farklescoring tables. Every match
+waits at the agent's next decision: a roll has just been made and the agent chooses one of
+its scorings and whether to bank the turn's points or roll the dice remaining. step() takes
+one decision for every match, as arrays, and plays each match on to the agent's next
+decision: the agent's next roll, any Farkles, and the opponent's turns, which are played by
+turnkernel.take_turns(). A match that ends is started again at once, so every match always
+has a decision waiting.
+
+An observation is a row of an int array, whose columns are named by the OBS_ constants; the
+scorings of the roll fill the last columns (see FarkleEnv.points_columns). An action is a row
+(scoring index, bank), where bank is 1 to end the turn, keeping its points, and 0 to roll
+the dice remaining. As in FarkleMatch, an invalid scoring index uses scoring 0. The reward
+is 1 in the step in which the agent wins a match, -1 in one in which it loses, and 0 otherwise.
+
+    env = FarkleEnv(4096, seed=1)
+    observations = env.reset()
+    while training:
+        observations, rewards, dones, info = env.step(policy(observations, env.action_mask()))
+
+Requires NumPy.
+"""
+
+try:
+    import numpy
+except ImportError:     # FarkleEnv needs NumPy; importing this module does not
+    numpy = None
+
+import automated
+import farklescoring
+import turnkernel
+
+# The columns of an observation
+OBS_MY_SCORE = 0                # The agent's score
+OBS_OPPONENT_SCORE = 1          # The opponent's score
+OBS_HIGH_SCORE = 2              # The high score
+OBS_MY_DANGER = 3               # The agent's Farkle danger level
+OBS_OPPONENT_DANGER = 4         # The opponent's Farkle danger level
+OBS_TURN_SCORE = 5              # The points scored this turn before this roll
+OBS_DICE_ROLLED = 6             # The number of dice rolled
+OBS_LAST_TURN = 7               # 1 if this is the agent's last turn, after the opponent reached 10,000
+OBS_SCORINGS = 8                # The number of scorings of the roll
+_OBS_FIXED = 9                  # The number of columns before the scorings
+
+_NO_SCORE = 1       # Stands for a score sheet entry of None, which counts as no Farkle
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is not installed"""
+    if numpy is None:
+        raise ImportError('farkleenv requires NumPy')
+
+
+def _danger_levels(last, previous):
+    """Get the Farkle danger levels, as scoresheet2.ScoreSheet.farkle_danger_level() does"""
+    return numpy.where(last > 0, 0, numpy.where(previous == 0, 2, 1))
+
+
+class FarkleEnv:
+    """
+    A batch of Farkle matches between an agent and an opponent, advanced one decision at a time
+    """
+
+    def __init__(self, count, opponent_ideal_scores=automated.FarklePlayer.IDEAL_SCORES,
+                 opponent_single_roll=False, agent_seat=None, seed=None, rules=farklescoring.STANDARD_RULES):
+        """
+        Initialize the environment. Call reset() before step().
+        Args:
+            count: the number of matches
+            opponent_ideal_scores: the ideal scores of the opponent, an automated.FarklePlayer
+            opponent_single_roll: True to play the opponent as simpleauto.FarklePlayer instead
+            agent_seat: 0 for the agent to take the first turn of every match, 1 for the
+                        second, or None to draw the agent's seat for each match
+            seed: a seed for the dice and the seats, or None for fresh entropy
+            rules: the farklescoring.Ruleset
+        """
+        _require_numpy()
+        self.count = count
+        self._opponent_ideal_scores = opponent_ideal_scores
+        self._opponent_single_roll = opponent_single_roll
+        self._agent_seat = agent_seat
+        self._rules = rules
+        self._rng = numpy.random.default_rng(seed)
+        self._choices = turnkernel.choice_table(rules)
+        self.max_scorings = self._choices.points.shape[1]
+        self.points_columns = slice(_OBS_FIXED, _OBS_FIXED + self.max_scorings)
+        self.dice_columns = slice(_OBS_FIXED + self.max_scorings, _OBS_FIXED + 2 * self.max_scorings)
+        self.observation_size = _OBS_FIXED + 2 * self.max_scorings
+
+        # The score sheets: a row per match and a column per seat
+        self._scores = numpy.zeros((count, 2), numpy.int64)
+        self._started = numpy.zeros((count, 2), bool)           # True once on the board
+        self._last = numpy.full((count, 2), _NO_SCORE, numpy.int64)        # The last entry
+        self._previous = numpy.full((count, 2), _NO_SCORE, numpy.int64)    # The entry before it
+
+        # The progress of each match
+        self._seat = numpy.zeros(count, numpy.int64)             # The agent's seat
+        self._mover = numpy.zeros(count, numpy.int64)            # The seat taking the current turn
+        self._turn_number = numpy.zeros(count, numpy.int64)
+        self._final_turns = numpy.full(count, -1, numpy.int64)  # -1 until someone reaches 10,000
+
+        # The agent's turn in progress
+        self._turn_score = numpy.zeros(count, numpy.int64)
+        self._dice = numpy.full(count, 6, numpy.int64)
+        self._roll = numpy.zeros(count, numpy.int64)             # The roll_index() of the last roll
+
+        # The outcome of the step in progress
+        self._rewards = numpy.zeros(count, numpy.float32)
+        self._dones = numpy.zeros(count, bool)
+        self._final_scores = numpy.zeros((count, 2), numpy.int64)        # Agent first
+        self._final_turn_numbers = numpy.zeros(count, numpy.int64)
+
+    def reset(self):
+        """
+        Start every match again
+        Returns:
+            the observations of the agent's first decision in each match
+        """
+        every_match = numpy.arange(self.count)
+        self._start_matches(every_match)
+        self._play_to_decisions(every_match)
+        return self.observations()
+
+    def step(self, actions):
+        """
+        Take one decision in every match and play on to the next
+        Args:
+            actions: an int array of shape (count, 2), each row (scoring index, bank)
+
+        Returns:
+            a 4-tuple (observations, rewards, dones, info). dones is True for each match that
+            ended during the step; its observation is the first decision of the match that
+            replaced it. info is a dictionary of arrays about the matches that ended:
+            'scores' holds the final (agent, opponent) scores and 'turns' the number of turns.
+            Their rows for the other matches are 0.
+        """
+        actions = numpy.asarray(actions)
+        self._rewards[:] = 0
+        self._dones[:] = False
+        self._final_scores[:] = 0
+        self._final_turn_numbers[:] = 0
+        every_match = numpy.arange(self.count)
+
+        scoring = actions[:, 0].astype(numpy.int64)
+        scoring[(scoring < 0) | (scoring >= self._choices.count[self._roll])] = 0
+        self._turn_score += self._choices.points[self._roll, scoring]
+        dice_remaining = self._dice - self._choices.dice[self._roll, scoring]
+        dice_remaining[dice_remaining == 0] = 6
+
+        bank = actions[:, 1].astype(bool)
+        banking = every_match[bank]
+        self._end_turns(banking, self._turn_score[banking])
+
+        rolling = every_match[~bank]
+        self._dice[rolling] = dice_remaining[rolling]
+        farkled = self._roll_dice(rolling)
+        self._end_turns(farkled, numpy.zeros(farkled.size, numpy.int64))
+
+        self._play_to_decisions(numpy.concatenate((banking, farkled)))
+        info = {'scores': self._final_scores.copy(), 'turns': self._final_turn_numbers.copy()}
+        return self.observations(), self._rewards.copy(), self._dones.copy(), info
+
+    def observations(self):
+        """Get the observation of the decision waiting in each match"""
+        every_match = numpy.arange(self.count)
+        agent, opponent = self._seat, 1 - self._seat
+        danger = _danger_levels(self._last, self._previous)
+        observations = numpy.empty((self.count, self.observation_size), numpy.int32)
+        observations[:, OBS_MY_SCORE] = self._scores[every_match, agent]
+        observations[:, OBS_OPPONENT_SCORE] = self._scores[every_match, opponent]
+        observations[:, OBS_HIGH_SCORE] = self._scores.max(axis=1)
+        observations[:, OBS_MY_DANGER] = danger[every_match, agent]
+        observations[:, OBS_OPPONENT_DANGER] = danger[every_match, opponent]
+        observations[:, OBS_TURN_SCORE] = self._turn_score
+        observations[:, OBS_DICE_ROLLED] = self._dice
+        observations[:, OBS_LAST_TURN] = self._final_turns == 0
+        observations[:, OBS_SCORINGS] = self._choices.count[self._roll]
+        observations[:, self.points_columns] = self._choices.points[self._roll]
+        observations[:, self.dice_columns] = self._choices.dice[self._roll]
+        return observations
+
+    def action_mask(self):
+        """Get a bool array of shape (count, max_scorings), True for each valid scoring index"""
+        return numpy.arange(self.max_scorings) < self._choices.count[self._roll][:, None]
+
+    def _start_matches(self, matches):
+        """Set up new matches; the player in seat 0 takes the first turn"""
+        self._scores[matches] = 0
+        self._started[matches] = False
+        self._last[matches] = _NO_SCORE
+        self._previous[matches] = _NO_SCORE
+        if self._agent_seat is None:
+            self._seat[matches] = self._rng.integers(0, 2, matches.size)
+        else:
+            self._seat[matches] = self._agent_seat
+        self._mover[matches] = 0
+        self._turn_number[matches] = 1
+        self._final_turns[matches] = -1
+
+    def _roll_dice(self, matches):
+        """
+        Roll the agent's dice in some matches
+        Returns:
+            the matches in which the roll was a Farkle
+        """
+        self._roll[matches] = turnkernel.roll_indexes(self._dice[matches], self._rng)
+        return matches[self._choices.count[self._roll[matches]] == 0]
+
+    def _play_to_decisions(self, matches):
+        """Play matches whose next turn has not begun on to the agent's next decision"""
+        while matches.size:
+            opponent_moves = self._mover[matches] != self._seat[matches]
+            opponents = matches[opponent_moves]
+            if opponents.size:
+                seats = self._mover[opponents]
+                danger = _danger_levels(self._last[opponents, seats], self._previous[opponents, seats])
+                states = turnkernel.TurnStates(self._scores[opponents, seats], self._scores[opponents].max(axis=1),
+                                               danger)
+                outcomes = turnkernel.take_turns(states, self._opponent_ideal_scores, self._opponent_single_roll,
+                                                 self._rng, self._rules)
+                self._end_turns(opponents, outcomes.turn_score)
+
+            agents = matches[~opponent_moves]
+            self._turn_score[agents] = 0
+            self._dice[agents] = 6
+            farkled = self._roll_dice(agents)
+            self._end_turns(farkled, numpy.zeros(farkled.size, numpy.int64))
+            matches = numpy.concatenate((opponents, farkled))
+
+    def _end_turns(self, matches, turn_scores):
+        """
+        Record the scores of the turns in progress, as scoresheet2.ScoreSheet.add_score() does,
+        and begin the next turns, or end the matches and start new ones
+        """
+        seats = self._mover[matches]
+        started = self._started[matches, seats]
+        last = self._last[matches, seats]
+        danger = _danger_levels(last, self._previous[matches, seats])
+        entries = numpy.where(started,
+                              numpy.where((turn_scores == 0) & (danger == 2), -1000, turn_scores),
+                              numpy.where(turn_scores < 500, _NO_SCORE, turn_scores))
+        self._scores[matches, seats] += numpy.where(started | (turn_scores >= 500), entries, 0)
+        self._started[matches, seats] = started | (turn_scores >= 500)
+        self._previous[matches, seats] = last
+        self._last[matches, seats] = entries
+
+        # Once someone reaches 10,000, the other player takes one more turn
+        final_turns = self._final_turns[matches]
+        over = final_turns == 0
+        reached = (self._scores[matches] >= 10000).any(axis=1)
+        self._final_turns[matches] = numpy.where((final_turns < 0) & reached, 1, final_turns)
+
+        ended = matches[over]
+        if ended.size:
+            # The winner is the first player, in seat order, with at least 10,000 points
+            winners = numpy.where(self._scores[ended, 0] >= 10000, 0, 1)
+            self._rewards[ended] += numpy.where(winners == self._seat[ended], 1, -1)
+            self._dones[ended] = True
+            self._final_scores[ended, 0] = self._scores[ended, self._seat[ended]]
+            self._final_scores[ended, 1] = self._scores[ended, 1 - self._seat[ended]]
+            self._final_turn_numbers[ended] = self._turn_number[ended]
+            self._start_matches(ended)
+
+        going_on = matches[~over]
+        self._mover[going_on] = 1 - self._mover[going_on]
+        self._turn_number[going_on] += 1
+        self._final_turns[going_on] = numpy.where(self._final_turns[going_on] > 0, self._final_turns[going_on] - 1,
+                                                  self._final_turns[going_on])
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    import farkle
+    import farklematch
+    import scoresheet2
+
+    # The score sheets follow scoresheet2 exactly
+    rng = random.Random(5)
+    env = FarkleEnv(1, seed=5)
+    for _ in range(200):
+        env._start_matches(numpy.arange(1))
+        env._mover[0] = 0
+        score_sheet = scoresheet2.ScoreSheet(['A', 'B'])
+        for _ in range(40):
+            score = rng.choice((0, 0, 0, 50, 300, 450, 500, 750, 2000))
+            score_sheet.add_score('A', score)
+            env._end_turns(numpy.arange(1), numpy.array([score]))
+            env._mover[0] = 0
+            env._final_turns[0] = -1
+            assert env._scores[0, 0] == score_sheet.score_for('A')
+            assert _danger_levels(env._last, env._previous)[0, 0] == score_sheet.farkle_danger_level('A')
+
+    # An agent that takes the highest scoring and banks at 300 points wins as often, in matches
+    # as long, as the same policy playing automated.FarklePlayer in FarkleMatch
+    def bank_at_300(observation, legal_actions):
+        if observation.scorings is not None:
+            return 0
+        return farklematch.BANK if observation.turn_score >= 300 else farklematch.ROLL
+
+    matches = 3000
+    wins = turns = 0
+    for seed in range(matches):
+        players = [farklematch.PolicyPlayer('Agent', bank_at_300), automated.FarklePlayer('Ben')]
+        match = farklematch.FarkleMatch(players[::-1] if seed % 2 else players, silent=True,
+                                        dice=farkle.RandomDice(seed))
+        wins += match.start_play() == 'Agent'
+        turns += match.result().turns
+    match_win_rate, match_turns = wins / matches, turns / matches
+
+    env = FarkleEnv(2048, seed=11)
+    observations = env.reset()
+    # Count the first matches of each environment only: short matches end first, so counting
+    # every match until some total would favour them
+    per_environment = 5
+    completed = numpy.zeros(env.count, int)
+    env_wins = env_turns = steps = 0
+    started = time.perf_counter()
+    while completed.min() < per_environment:
+        bank = observations[:, OBS_TURN_SCORE] + observations[:, env.points_columns.start] >= 300
+        observations, rewards, dones, info = env.step(numpy.stack((numpy.zeros(env.count, int), bank), axis=1))
+        assert not info['turns'][~dones].any() and not info['scores'][~dones].any()
+        counted = dones & (completed < per_environment)
+        env_wins += numpy.count_nonzero(rewards[counted] > 0)
+        env_turns += info['turns'][counted].sum()
+        completed += dones
+        steps += env.count
+    elapsed = time.perf_counter() - started
+    env_win_rate = env_wins / (per_environment * env.count)
+    env_match_turns = env_turns / (per_environment * env.count)
+    print(f'win rate: FarkleMatch {match_win_rate:.3f}, FarkleEnv {env_win_rate:.3f}; '
+          f'turns per match: FarkleMatch {match_turns:.1f}, FarkleEnv {env_match_turns:.1f}')
+    print(f'{steps / elapsed:,.0f} steps per second')
+    assert abs(match_win_rate - env_win_rate) < 4 * (0.25 / matches) ** 0.5, 'FAIL: the win rates disagree'
+    assert abs(match_turns - env_match_turns) < 0.05 * match_turns, 'FAIL: the match lengths disagree'
+    print('DONE')
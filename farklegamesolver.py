@@ -0,0 +1,524 @@
+"""
+Solve for the play that maximizes the probability of winning a two-player Farkle match.
+
+The solver follows the rules as FarkleMatch and ScoreSheet apply them, with one simplification:
+    - a player's first recorded score must be at least 500 points; a smaller turn does not count
+    - once on the board, each Farkle raises the Farkle danger level, and a Farkle at danger
+      level 2 costs 1,000 points. The model then leaves the danger level at 2, so every
+      further Farkle in a row costs 1,000 points too. ScoreSheet instead drops to danger
+      level 1 after two penalties in a row (its last two entries are -1,000, not 0), so the
+      fifth Farkle in a row costs nothing and the count starts again. Telling these apart
+      would need more than the danger level a match reports, and the difference only arises
+      after four Farkles in a row, where the model is the more cautious.
+    - when the first player reaches the target, the second player gets one more turn but cannot
+      win; when the second player reaches it first, the first player gets one more turn and
+      wins by reaching the target too
+
+Scores are counted in units of 50 points. A player's state is either "not on the board" or an
+(on-board score, danger level) pair, with scores below a floor clamped to the floor. For every
+turn-start state (seat to move, mover's state, other player's state) the solver finds the
+probability that the mover wins. Farkles can return play to an earlier state, so the values
+are found by value iteration: each sweep solves every turn exactly against the previous
+sweep's values, and sweeps repeat until the largest change is below a tolerance. A sweep is
+spread across worker processes, and the values are written to a checkpoint file after every
+sweep, so an interrupted solve resumes where it stopped.
+
+The finished values are exported to a compact policy file of 16-bit probabilities. A
+GamePolicy reads that file through a memory map, touching only the rows a turn needs, and
+plans each turn from them.
+
+Solving needs NumPy; reading a policy does not.
+"""
+
+import collections
+import functools
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+
+import farklesolver
+
+try:
+    import numpy
+except ImportError:     # Only solving needs NumPy
+    numpy = None
+
+UNIT = farklesolver.UNIT
+ENTRY_UNITS = 500 // UNIT       # The smallest first score that counts
+PENALTY_UNITS = 1000 // UNIT    # The cost of a third Farkle in a row
+
+DEFAULT_TARGET = 10000
+DEFAULT_FLOOR = -2000
+DEFAULT_CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'farkle_win_checkpoint.bin')
+DEFAULT_POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'farkle_win_policy.bin')
+
+# magic, target, floor, state count, sweeps completed, largest change in the last sweep
+_HEADER = struct.Struct('<4siiIId')
+_CHECKPOINT_MAGIC = b'FKWC'
+_POLICY_MAGIC = b'FKWP'
+
+# The header of a checkpoint or policy file
+Header = collections.namedtuple('Header', 'target floor state_count sweeps change')
+
+
+class GameModel:
+    """
+    The player states of a two-player match and the transitions between them.
+
+    State 0 is "not on the board". Every other state is an on-board score, between the floor
+    and just below the target, together with a Farkle danger level.
+    """
+
+    def __init__(self, target=DEFAULT_TARGET, floor=DEFAULT_FLOOR):
+        """
+        Initialize a model
+        Args:
+            target: the score that ends the match, a multiple of 50 and at least 500
+            floor: the lowest score tracked, a multiple of 50 no greater than 0
+        """
+        assert target % UNIT == 0 and target >= 500 and floor % UNIT == 0 and floor <= 0
+        self.target = target
+        self.floor = floor
+        self.target_units = target // UNIT
+        self.floor_units = floor // UNIT
+        self.state_count = 1 + (self.target_units - self.floor_units) * 3
+        self.max_need = self.target_units - self.floor_units
+
+    def state_for(self, score, danger_level, on_board):
+        """
+        Get the state of a player
+        Args:
+            score: the player's score
+            danger_level: the player's Farkle danger level
+            on_board: True once the player has recorded a first score
+
+        Returns:
+            a state index
+        """
+        if not on_board:
+            return 0
+        units = min(max(score // UNIT, self.floor_units), self.target_units - 1)
+        return 1 + (units - self.floor_units) * 3 + danger_level
+
+    def need(self, state):
+        """Get the number of units a player in the given state must score to reach the target"""
+        if state == 0:
+            return self.target_units
+        return self.target_units - (self.floor_units + (state - 1) // 3)
+
+    def banked(self, state, units):
+        """
+        Get the state after a player banks a turn
+        Args:
+            state: the player's state at the start of the turn
+            units: the number of units scored this turn, at least 1
+
+        Returns:
+            a 2-tuple (new state, reached), where reached is True when the target has been
+            reached; the new state is then meaningless
+        """
+        if state == 0:
+            if units < ENTRY_UNITS:
+                return 0, False
+            score_units = units
+        else:
+            score_units = self.floor_units + (state - 1) // 3 + units
+        if score_units >= self.target_units:
+            return 0, True
+        return 1 + (score_units - self.floor_units) * 3, False
+
+    def farkled(self, state):
+        """
+        Get the state after a player Farkles. A player at danger level 2 stays there, paying
+        1,000 points for every Farkle (see the module docstring for how ScoreSheet differs).
+        """
+        if state == 0:
+            return 0
+        danger_level = (state - 1) % 3
+        if danger_level < 2:
+            return state + 1
+        return max(state - PENALTY_UNITS * 3, 1 + 2)
+
+
+class TurnPlan:
+    """
+    The win-maximizing choices for one turn, given the value of banking each turn score
+    """
+
+    def __init__(self, need, bank_values, farkle_value):
+        """
+        Solve a turn
+        Args:
+            need: the turn score, in units, at which the player stops and banks
+            bank_values: a sequence whose item t is the value of banking t units, 0 ≤ t ≤ need
+            farkle_value: the value of a Farkle
+        """
+        self._need = need
+        self._bank_values = bank_values
+        outcomes = [None] + [_outcomes(n) for n in range(1, 7)]
+        values = [[bank_values[need]] * 7 for _ in range(need + 1)]
+        for t in range(need - 1, -1, -1):
+            bank_value = bank_values[t] if t > 0 else -1.0     # The first roll is not optional
+            row = values[t]
+            for n in range(1, 7):
+                farkle_probability, groups = outcomes[n]
+                expected = farkle_probability * farkle_value
+                for probability, options in groups:
+                    expected += probability * max(values[min(t + points, need)][dice_remaining]
+                                                  for points, dice_remaining in options)
+                row[n] = max(bank_value, expected)
+        self._values = values
+
+    def value(self, turn_score, dice_remaining):
+        """Get the probability of winning from the given point in the turn, playing optimally"""
+        return self._values[min(turn_score // UNIT, self._need)][dice_remaining]
+
+    def should_roll(self, turn_score, dice_remaining):
+        """
+        Decide whether to roll again
+        Args:
+            turn_score: the points scored so far this turn
+            dice_remaining: the number of dice left to roll
+
+        Returns:
+            True if rolling gives a better chance to win than banking
+        """
+        t = turn_score // UNIT
+        return t < self._need and self._values[t][dice_remaining] > self._bank_values[t]
+
+    def choose_scoring(self, scorings, turn_score, dice_rolled):
+        """
+        Choose the scoring that gives the best chance to win
+        Args:
+            scorings: the non-empty scorings of a roll, as returned by FarkleMatch.roll()
+            turn_score: the points scored this turn before this roll
+            dice_rolled: the number of dice in the roll
+
+        Returns:
+            the index of the best scoring
+        """
+        best_index, best_value = 0, -1.0
+        for index, (score, dice) in enumerate(scorings):
+            value = self.value(turn_score + score, dice_rolled - len(dice) or 6)
+            if value > best_value:
+                best_index, best_value = index, value
+        return best_index
+
+
+@functools.lru_cache(maxsize=None)
+def _outcomes(n):
+    """
+    Get the roll outcomes for n dice
+    Returns:
+        a 2-tuple (Farkle probability, groups), where groups are as returned by
+        farklesolver.roll_outcomes(n)
+    """
+    groups = farklesolver.roll_outcomes(n)
+    return 1 - sum(probability for probability, _ in groups), groups
+
+
+class GamePolicy:
+    """
+    Win probabilities read from a policy file through a memory map
+    """
+
+    def __init__(self, path=DEFAULT_POLICY_FILE):
+        """
+        Open a policy file written by export_policy()
+        Args:
+            path: the name of the policy file
+        """
+        with open(path, 'rb') as policy_file:
+            self._map = mmap.mmap(policy_file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _read_header(self._map, _POLICY_MAGIC, path)
+        self.model = GameModel(header.target, header.floor)
+        count = header.state_count
+        probabilities = memoryview(self._map)[_HEADER.size:].cast('H')
+        self._reach = probabilities[:count]
+        self._wins = probabilities[count:]
+        self._plan = functools.lru_cache(maxsize=4096)(self._make_plan)
+
+    def win_probability(self, seat, mover_state, other_state):
+        """
+        Get the probability that the player about to start a turn wins
+        Args:
+            seat: the mover's seat, 0 for the player who moves first
+            mover_state: the mover's state
+            other_state: the other player's state
+        """
+        count = self.model.state_count
+        return self._wins[(seat * count + mover_state) * count + other_state] / 65535
+
+    def plan(self, seat, my_state, other_state, other_has_reached_target=False):
+        """
+        Plan a turn
+        Args:
+            seat: my seat, 0 if I move first
+            my_state: my state, from GameModel.state_for()
+            other_state: the other player's state
+            other_has_reached_target: True if this is my last turn because the other
+                                      player has reached the target
+
+        Returns:
+            a TurnPlan
+        """
+        return self._plan(seat, my_state, other_state, other_has_reached_target)
+
+    def _make_plan(self, seat, my_state, other_state, other_has_reached_target):
+        """Solve a turn for plan()"""
+        model = self.model
+        need = model.need(my_state)
+        if other_has_reached_target:
+            # Only the first player can still win, by reaching the target this turn
+            reward = 1.0 if seat == 0 else 0.0
+            return TurnPlan(need, [0.0] * need + [reward], 0.0)
+
+        count = model.state_count
+        row = ((1 - seat) * count + other_state) * count
+        reach_value = 1.0 if seat == 0 else 1 - self._reach[other_state] / 65535
+        bank_values = [None]
+        for t in range(1, need + 1):
+            new_state, reached = model.banked(my_state, t)
+            bank_values.append(reach_value if reached else 1 - self._wins[row + new_state] / 65535)
+        bank_values[0] = bank_values[1]     # Never used: the first roll is not optional
+        farkle_value = 1 - self._wins[row + model.farkled(my_state)] / 65535
+        return TurnPlan(need, bank_values, farkle_value)
+
+
+def _read_header(buffer, magic, path):
+    """Read and check the header of a checkpoint or policy file"""
+    fields = _HEADER.unpack_from(buffer, 0)
+    assert fields[0] == magic, f'{path} is not the expected kind of Farkle solver file'
+    return Header(*fields[1:])
+
+
+def _write_file(path, magic, header, reach, wins):
+    """Write a checkpoint or policy file, replacing any existing file only once it is complete"""
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as solver_file:
+        solver_file.write(_HEADER.pack(magic, header.target, header.floor, header.state_count,
+                                       header.sweeps, header.change))
+        reach.tofile(solver_file)
+        wins.tofile(solver_file)
+    os.replace(temporary_path, path)
+
+
+def read_checkpoint(path):
+    """
+    Read a checkpoint file
+    Args:
+        path: the name of the checkpoint file
+
+    Returns:
+        a 3-tuple (header, reach, wins) in which reach[s] is the probability that the first
+        player, in state s, reaches the target in one turn, and wins[seat, mover, other] is the
+        probability that the mover wins. Both arrays are read-only memory maps.
+    """
+    _require_numpy()
+    with open(path, 'rb') as checkpoint_file:
+        header = _read_header(checkpoint_file.read(_HEADER.size), _CHECKPOINT_MAGIC, path)
+    count = header.state_count
+    reach = numpy.memmap(path, numpy.float32, 'r', _HEADER.size, (count,))
+    wins = numpy.memmap(path, numpy.float32, 'r', _HEADER.size + 4 * count, (2, count, count))
+    return header, reach, wins
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is not installed"""
+    if numpy is None:
+        raise ImportError('The Farkle game solver requires NumPy')
+
+
+class _ModelArrays:
+    """The transitions of a GameModel as arrays, for solving many turns at once"""
+
+    def __init__(self, model):
+        self.model = model
+        states = range(model.state_count)
+        self.need = numpy.array([model.need(state) for state in states])
+        self.farkled = numpy.array([model.farkled(state) for state in states])
+        self.banked = numpy.zeros((model.max_need + 1, model.state_count), dtype=numpy.intp)
+        self.reached = numpy.zeros((model.max_need + 1, model.state_count), dtype=bool)
+        for t in range(1, model.max_need + 1):
+            for state in states:
+                self.banked[t, state], self.reached[t, state] = model.banked(state, t)
+
+        # The options of each roll outcome as rectangular arrays, padded by repeating the first
+        # option, so that all of the outcomes for n dice are handled with one gather, one
+        # maximum and one weighted sum
+        self.outcomes = [None]
+        for n in range(1, 7):
+            farkle_probability, groups = _outcomes(n)
+            width = max(len(options) for _, options in groups)
+            padded = [options + options[:1] * (width - len(options)) for _, options in groups]
+            self.outcomes.append((farkle_probability,
+                                  numpy.array([probability for probability, _ in groups]),
+                                  numpy.array([[points for points, _ in options] for options in padded]),
+                                  numpy.array([[dice for _, dice in options] for options in padded])))
+
+
+_model_arrays_cache = {}
+
+
+def _model_arrays(target, floor):
+    """Get the _ModelArrays for a model, building them once per process"""
+    key = (target, floor)
+    if key not in _model_arrays_cache:
+        _model_arrays_cache[key] = _ModelArrays(GameModel(target, floor))
+    return _model_arrays_cache[key]
+
+
+def _solve_turns(arrays, bank_values, farkle_values):
+    """
+    Solve turns for every mover state against a block of other-player states at once
+    Args:
+        arrays: the _ModelArrays for the model
+        bank_values: a function of t returning a (block, state count) array holding the value
+                     of banking t units
+        farkle_values: a (block, state count) array holding the value of a Farkle
+
+    Returns:
+        a (block, state count) array holding the value of each turn before its first roll
+    """
+    top = arrays.model.max_need
+    values = numpy.empty((top + 1, 7) + farkle_values.shape)
+    values[top] = bank_values(top)
+    for t in range(top - 1, -1, -1):
+        bank = bank_values(t) if t > 0 else numpy.full(farkle_values.shape, -1.0)
+        done = t >= arrays.need
+        for n in range(1, 7):
+            farkle_probability, probabilities, points, dice_remaining = arrays.outcomes[n]
+            best = values[numpy.minimum(t + points, top), dice_remaining].max(axis=1)
+            expected = numpy.tensordot(probabilities, best, axes=1) + farkle_probability * farkle_values
+            values[t, n] = numpy.where(done, bank, numpy.maximum(bank, expected))
+    return values[0, 6]
+
+
+def _reach_probabilities(arrays):
+    """Compute the probability of reaching the target in one turn from each state"""
+    count = arrays.model.state_count
+    return _solve_turns(arrays,
+                        lambda t: arrays.reached[t][None, :].astype(float),
+                        numpy.zeros((1, count)))[0]
+
+
+def _sweep_block(task):
+    """
+    Solve the turns of one seat against a block of other-player states
+    Args:
+        task: a 4-tuple (checkpoint path, seat, start, stop)
+
+    Returns:
+        a 4-tuple (seat, start, stop, values) where values[b - start, s] is the new probability
+        that the mover, in seat and state s, wins against the other player in state b
+    """
+    path, seat, start, stop = task
+    header, reach, wins = read_checkpoint(path)
+    arrays = _model_arrays(header.target, header.floor)
+
+    # The other player moves next; their chance to win is wins[1 - seat, other, mine]
+    other_wins = numpy.array(wins[1 - seat, start:stop, :], dtype=float)
+    if seat == 0:
+        reach_values = numpy.ones(stop - start)
+    else:
+        reach_values = 1 - numpy.asarray(reach[start:stop], dtype=float)
+
+    def bank_values(t):
+        return numpy.where(arrays.reached[t][None, :], reach_values[:, None],
+                           1 - other_wins[:, arrays.banked[t]])
+
+    values = _solve_turns(arrays, bank_values, 1 - other_wins[:, arrays.farkled])
+    return seat, start, stop, values
+
+
+def solve(path=DEFAULT_CHECKPOINT_FILE, target=DEFAULT_TARGET, floor=DEFAULT_FLOOR,
+          workers=None, tolerance=1e-5, max_sweeps=1000, block_size=8, progress=None):
+    """
+    Solve for the win probabilities, resuming from the checkpoint file when it exists
+    Args:
+        path: the name of the checkpoint file
+        target: the score that ends the match
+        floor: the lowest score tracked; lower scores are treated as this score
+        workers: the number of worker processes; None uses one per CPU and 1 solves in
+                 this process
+        tolerance: stop once no probability changes by more than this in a sweep
+        max_sweeps: stop after this many sweeps in all
+        block_size: the number of other-player states solved together by one task
+        progress: None, or a function called with the Header after each sweep
+
+    Returns:
+        the Header of the final checkpoint
+    """
+    _require_numpy()
+    if os.path.exists(path):
+        header, reach, wins = read_checkpoint(path)
+        assert (header.target, header.floor) == (target, floor), \
+            f'{path} is a checkpoint for a different target or floor'
+        reach, wins = numpy.array(reach), numpy.array(wins)
+    else:
+        model = GameModel(target, floor)
+        reach = _reach_probabilities(_model_arrays(target, floor)).astype(numpy.float32)
+        wins = numpy.full((2, model.state_count, model.state_count), 0.5, dtype=numpy.float32)
+        header = Header(target, floor, model.state_count, 0, float('inf'))
+        _write_file(path, _CHECKPOINT_MAGIC, header, reach, wins)
+
+    count = header.state_count
+    tasks = [(path, seat, start, min(start + block_size, count))
+             for seat in (0, 1) for start in range(0, count, block_size)]
+    pool = multiprocessing.Pool(workers) if workers != 1 else None
+    try:
+        while header.change > tolerance and header.sweeps < max_sweeps:
+            new_wins = numpy.empty_like(wins)
+            results = pool.imap_unordered(_sweep_block, tasks) if pool else map(_sweep_block, tasks)
+            for seat, start, stop, values in results:
+                new_wins[seat, :, start:stop] = values.T
+            change = float(numpy.abs(new_wins - wins).max())
+            wins = new_wins
+            header = header._replace(sweeps=header.sweeps + 1, change=change)
+            _write_file(path, _CHECKPOINT_MAGIC, header, reach, wins)
+            if progress is not None:
+                progress(header)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return header
+
+
+def export_policy(checkpoint_path=DEFAULT_CHECKPOINT_FILE, policy_path=DEFAULT_POLICY_FILE):
+    """
+    Write the compact policy file for a solved checkpoint
+    Args:
+        checkpoint_path: the name of the checkpoint file
+        policy_path: the name of the policy file to write
+    """
+    header, reach, wins = read_checkpoint(checkpoint_path)
+
+    def quantized(probabilities):
+        return numpy.rint(numpy.clip(probabilities, 0, 1) * 65535).astype('<u2')
+
+    _write_file(policy_path, _POLICY_MAGIC, header, quantized(reach), quantized(wins))
+
+
+def main():
+    """
+    Solve and export the policy for the standard match, or for the target and floor
+    given on the command line
+    """
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TARGET
+    floor = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FLOOR
+
+    def report(header):
+        print(f'Sweep {header.sweeps}: largest change {header.change:.2e}', flush=True)
+
+    header = solve(target=target, floor=floor, progress=report)
+    export_policy()
+    policy = GamePolicy()
+    print(f'Solved {header.state_count} player states in {header.sweeps} sweeps')
+    print(f'The first player wins {policy.win_probability(0, 0, 0):.2%} of matches with optimal play')
+
+
+if __name__ == '__main__':
+    main()
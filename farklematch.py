@@ -2,6 +2,31 @@
 Defines the FarkleMatch class
 """
 
+# Last update: 2026-10-18
+#   - Added an optional scorings table so each roll is scored with a single lookup.
+#   - Added a silent mode that plays a match without printing or speaking anything
+#     and reports the outcome through FarkleMatch.result().
+#   - Messages are now spoken by a background speech.SpeechWorker, so play runs ahead of the
+#     speech instead of waiting for each message. A worker the match creates is closed
+#     however the match ends.
+#   - The current roll is kept as a packed roll (see farkle.pack_dice()), and a silent match
+#     rolls straight into one without building a tuple.
+#   - Added a ruleset parameter for house rules, compiled once into a scorings table.
+#   - Added an optional replaylog.ReplayRecorder that records every roll and decision.
+#   - Added a dice parameter so a match can roll from its own dice source (see farkle.py)
+#     instead of the random module, making it repeatable whatever else uses random.
+#   - Added an optional matchprofile.MatchProfiler. The match wraps its methods only when
+#     given one, so an unprofiled match runs exactly as before.
+#   - A failing player no longer stalls an unattended match: failures are handled by a
+#     playerguard policy (eliminate, forfeit or retry) and logged, and a turn budget limits
+#     the rolls and time of each turn. Only a match that is not silent still waits for Enter.
+#     A match in which every player has been eliminated now ends instead of looping forever.
+#   - An isolated turn budget runs each player in its own process, which is killed when a
+#     turn runs too long. Budget overruns are counted in the result and the statistics.
+#   - A match can also be played step by step: begin(), then observe() and act() (or
+#     play_turn() for a FarklePlayer) until finished(). start_play() is now built on the
+#     same steps, and PolicyPlayer lets a step-by-step policy take turns as a FarklePlayer.
+
 # Last update: 2021-12-06 15:45
 #   - Modified the code so that each player gets one more turn after a player reaches 10,000.
 #   - Fixed bug where a Farkle was recorded twice.
@@ -19,10 +44,16 @@ Defines the FarkleMatch class
 #   - removed print('You rolled...')
 #   - removed extraneous import statements
 
-import os
+import collections
+import contextlib
 import random
 import scoresheet2
+import farkle
 import farklescoring
+import playerguard
+import replaylog
+import speech
+import time
 import traceback
 import sys
 
@@ -32,8 +63,63 @@ class Farkle(Exception):
     pass
 
 
+# The outcome of a match:
+#   winner: the winner's name
+#   turns: the total number of turns taken
+#   farkle_tallies: a dictionary from player name to that player's number of Farkles
+#   scores: a dictionary from player name to that player's final score
+#   overruns: a dictionary from player name to the number of that player's turns that
+#             overran the turn budget
+MatchResult = collections.namedtuple('MatchResult', 'winner turns farkle_tallies scores overruns')
+
+# The actions of a match played step by step (see FarkleMatch.act()), besides the index of a
+# scoring of the last roll
+ROLL = 'roll'           # Roll the dice remaining
+BANK = 'bank'           # End the turn, keeping its points
+
+# What an action did, as returned by FarkleMatch.act()
+ROLLED = 'rolled'       # The dice were rolled and their scorings await a choice
+FARKLED = 'farkled'     # The roll was a Farkle, which ended the turn
+SCORED = 'scored'       # The roll was scored
+BANKED = 'banked'       # The turn ended and its points were kept
+
+# A match as the player taking the current turn sees it, from FarkleMatch.observe():
+#   player: the name of the player taking the turn, or None once the match is over
+#   turn: the turn number
+#   score: the player's score
+#   high_score: the high score among all players
+#   farkle_danger_level: the player's Farkle danger level
+#   turn_score: the points scored so far this turn
+#   dice_remaining: the number of dice the next roll uses
+#   dice: the dice of the turn's last roll in ascending order, or () before the first roll
+#   scorings: the scorings of the last roll while they await a choice, otherwise None
+#   winner: the winner's name once the match is over, otherwise None
+Observation = collections.namedtuple('Observation', 'player turn score high_score farkle_danger_level '
+                                                    'turn_score dice_remaining dice scorings winner')
+
+
+class _NullOutput:
+    """A write-only stream that discards everything written to it"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+_NULL_OUTPUT = _NullOutput()
+
+
 class FarkleMatch:
-    """A Farkle match is an instance of Farkle played by one or more players"""
+    """
+    A Farkle match is an instance of Farkle played by one or more players.
+
+    start_play() plays the whole match, calling each player's take_turn(). Alternatively,
+    call begin() and then drive the match one step at a time: observe() the player taking the
+    current turn and act() for them, or play_turn() to let a FarklePlayer take the whole turn,
+    until finished().
+    """
 
     VOICES = ('Alex',
               'Karen',
@@ -46,12 +132,36 @@ class FarkleMatch:
               'Veena',
               'Victoria')
 
-    def __init__(self, players, say=False):
+    def __init__(self, players, say=False, scorings_table=None, silent=False, speech_worker=None,
+                 ruleset=None, recorder=None, dice=None, profiler=None,
+                 on_failure=None, retries=1, turn_budget=None, failure_log=None):
         """
         Initialize a match
         Args:
             players: a sequence of FarklePlayer instances. Play will follow this order.
                      Note: player_names should have unique names
+            say: True to speak each message aloud with the say command
+            scorings_table: a table from farklescoring.load_scorings_table(), or None to compute
+                            the scorings for each roll as it is made
+            silent: True to play without printing or speaking any messages, including those
+                    printed by the players. Use result() to learn the outcome.
+            speech_worker: a speech.SpeechWorker that speaks each message, used instead of
+                           the one created when say is True. The caller closes it.
+            ruleset: a farklescoring.Ruleset giving the point values, or None for the standard
+                     rules. The ruleset is compiled into a scorings table, which is ignored when
+                     scorings_table is given.
+            recorder: a replaylog.ReplayRecorder that records every roll and decision of the
+                      match, or None. The caller closes it.
+            dice: a dice source, such as a farkle.RandomDice, from which every roll is drawn,
+                  or None to roll with the random module
+            profiler: a matchprofile.MatchProfiler that times the players' turns, the rolls,
+                      the scoring, the score sheet queries and the output, or None
+            on_failure: the playerguard policy for a player whose turn fails; None uses
+                        ELIMINATE for a silent match and INTERACTIVE otherwise
+            retries: the number of times a failed turn is played again under playerguard.RETRY
+            turn_budget: a playerguard.TurnBudget limiting each turn, or None. With an isolated
+                         budget, each player takes its turns in its own process.
+            failure_log: a playerguard.FailureLog to which each failure is appended, or None
         """
         self.__player_index = {player.name(): player for player in players}  # To look up a player by name
         assert len(self.__player_index) == len(players), 'ERROR: Duplicate player names!'
@@ -62,20 +172,64 @@ class FarkleMatch:
         self.__voice = FarkleMatch.VOICES[0]
         self.__player_voices = {player.name(): FarkleMatch.VOICES[(i + 1) % len(FarkleMatch.VOICES)]
                                 for i, player in enumerate(players, 1)}
-        self.__say = say
+        self.__owns_speech_worker = say and speech_worker is None
+        self.__speech_worker = speech.SpeechWorker() if self.__owns_speech_worker else speech_worker
+        self.__silent = silent
+        if scorings_table is None and ruleset is not None:
+            scorings_table = farklescoring.compile_ruleset(ruleset)
+        self.__scorings_table = scorings_table
+        self.__recorder = recorder
+        self.__dice = dice
+        if dice is None:
+            self.__roll_packed = None
+        else:
+            self.__roll_packed = getattr(dice, 'roll_packed', None) or (lambda k: farkle.pack_dice(dice.roll(k)))
+        self.__begin_dice_turn = getattr(dice, 'begin_turn', None)
         self.__farkle_tallies = {player.name(): 0 for player in players}
+        self.__overrun_tallies = {player.name(): 0 for player in players}
         self.__eliminated_player_names = set()
+        if on_failure is None:
+            on_failure = playerguard.ELIMINATE if silent else playerguard.INTERACTIVE
+        assert on_failure in playerguard.POLICIES, f'Unknown failure policy {on_failure!r}'
+        self.__on_failure = on_failure
+        self.__retries = retries
+        self.__turn_budget = turn_budget
+        self.__isolated_players = None
+        if turn_budget is not None and turn_budget.isolated:
+            self.__isolated_players = {player.name(): playerguard.IsolatedPlayer(player, turn_budget.seconds, silent)
+                                       for player in players}
+        self.__failure_log = failure_log
+        self.__failures = []
+        self.__early_winner = None      # Set when the match ends before anyone reaches 10,000
+        self.__final_turns = None       # The turns left once someone has reached 10,000
+        self.__finished = False
+        self.__rolls_this_turn = 0
+        self.__turn_deadline = None
+        self.__budget_overrun = None
 
         # These are used to manage a player's turn
         self.__player_taking_turn = None
         self.__dice_remaining = None
         self.__score_this_turn = None
-        self.__current_roll = None
+        self.__current_roll = 0          # A packed roll
         self.__current_roll_scorings = None
         self.__player_has_farkled = None
         self.__awaiting_roll = True
         self.__awaiting_score_as = False
 
+        self.__profiler = profiler
+        self.__profiled_scorings = None
+        if profiler is not None:
+            # Instance attributes hide the methods, so only a profiled match pays for timing
+            self.roll = profiler.wrap('roll', self.roll)
+            self.score_as = profiler.wrap('score_as', self.score_as)
+            self.score_for = profiler.wrap('score_sheet', self.score_for)
+            self.high_score = profiler.wrap('score_sheet', self.high_score)
+            self.farkle_danger_level = profiler.wrap('score_sheet', self.farkle_danger_level)
+            self.__profiled_scorings = profiler.wrap('scorings', self._scorings_for)
+            self._say = profiler.wrap('output', self._say)
+            self._show_score_sheet = profiler.wrap('output', self._show_score_sheet)
+
     def player_names(self):
         """Get the names of the player_names in this match"""
         return tuple(player.name() for player in self.__players)
@@ -94,39 +248,212 @@ class FarkleMatch:
 
     def winner(self):
         """Get the winner (or None if no winner yet)"""
+        if self.__early_winner is not None:
+            return self.__early_winner
         return self.__score_sheet.winner()
 
+    def failures(self):
+        """Get a tuple of the playerguard.PlayerFailure values for the failed turns so far"""
+        return tuple(self.__failures)
+
+    def result(self):
+        """Get a MatchResult describing the match as it stands"""
+        return MatchResult(self.winner(),
+                           self.__turn_number,
+                           dict(self.__farkle_tallies),
+                           {player.name(): self.score_for(player.name()) for player in self.__players},
+                           dict(self.__overrun_tallies))
+
     def start_play(self):
         """Run a match and determine the winner"""
-        self._say("Play beginning!", self.__voice)
-
-        winner = self.winner()
-        while winner is None:
-            self.__turn_number += 1
-            current_player = self.__players[(self.__turn_number - 1) % self.__player_count]
-            self._manage_turn(current_player)
+        try:
+            self.begin()
+            while not self.__finished:
+                self._take_turn(self.__player_taking_turn)
+                self._next_turn()
+        finally:
+            self._close_isolated_players()
+            self._close_speech_worker()
+        return self.winner()
+
+    def begin(self):
+        """
+        Begin a match to be played step by step, with observe() and act() or play_turn(),
+        instead of with start_play(). The first player's turn begins at once.
+        """
+        if not self.__silent:
+            self._say("Play beginning!", self.__voice)
+        if self.__recorder is not None:
+            self.__recorder.begin_match(self.player_names())
+        if self.__profiler is not None:
+            self.__profiler.count('matches')
+        self._next_turn()
+
+    def finished(self):
+        """True once the match is over"""
+        return self.__finished
+
+    def observe(self):
+        """Get an Observation of the match as it stands"""
+        if self.__finished:
+            return Observation(None, self.__turn_number, None, self.high_score(), None, 0, 0, (), None,
+                               self.winner())
+        player_name = self.__player_taking_turn.name()
+        return Observation(player_name,
+                           self.__turn_number,
+                           self.score_for(player_name),
+                           self.high_score(),
+                           self.farkle_danger_level(player_name),
+                           self.__score_this_turn,
+                           self.__dice_remaining,
+                           farkle.unpack_dice(self.__current_roll),
+                           self.__current_roll_scorings if self.__awaiting_score_as else None,
+                           None)
+
+    def legal_actions(self):
+        """
+        Get the actions act() accepts now
+        Returns:
+            a tuple: the scoring indexes while a roll awaits a scoring, otherwise ROLL and, once
+            the player has scored this turn, BANK. Empty once the match is over.
+        """
+        if self.__finished:
+            return ()
+        if self.__awaiting_score_as:
+            return tuple(range(len(self.__current_roll_scorings)))
+        if self.__score_this_turn > 0:
+            return ROLL, BANK
+        return ROLL,
+
+    def act(self, action):
+        """
+        Take the next step of the current player's turn
+        Args:
+            action: one of legal_actions(): ROLL, BANK or the index of a scoring of the last roll
 
-            print()
-            print(self.__score_sheet)
-            print()
+        Returns:
+            what happened: ROLLED, FARKLED, SCORED or BANKED. After FARKLED and BANKED the next
+            player's turn has begun, unless the match is over.
+        """
+        if action not in self.legal_actions():
+            raise ValueError(f'{action!r} is not a legal action now')
+        if action == ROLL:
+            if self._roll():
+                return ROLLED
+            self._farkled(self.__player_taking_turn.name())
+            event = FARKLED
+        elif action == BANK:
+            event = BANKED
+        else:
+            self._score_as(action)
+            return SCORED
+        self._finish_turn(self.__player_taking_turn.name())
+        self._next_turn()
+        return event
 
-            winner = self.winner()
+    def play_turn(self, player):
+        """
+        Let a player take the current turn through its take_turn(), as start_play() does, then
+        begin the next turn. This lets FarklePlayer classes play in a match driven step by step.
+        Args:
+            player: the player whose turn it is
+        """
+        assert player is self.__player_taking_turn and self.__score_this_turn == 0 and self.__awaiting_roll,\
+               'play_turn() plays a whole turn for the player taking it'
+        self._take_turn(player)
+        self._next_turn()
 
-        # The current player has reached 10,000 points. Give each other player one more turn
-        self._say(f'{winner} has reached {self.high_score()} points.', self.__voice)
-        self._say('Everyone else gets one more turn.', self.__voice)
-        for _ in range(1, len(self.__players)):
+    def eliminate(self, player_name, forfeit=False, failure=None):
+        """
+        Sit out the player taking the current turn of a match played step by step, then begin
+        the next turn
+        Args:
+            player_name: the name of the player taking the current turn
+            forfeit: True to end the match; the player with the highest score among those left wins
+            failure: the playerguard.PlayerFailure that caused this, recorded as the match records
+                     its own failures, or None
+        """
+        assert player_name == self.__player_taking_turn.name() and not self.__finished,\
+               'Only the player taking the current turn can be eliminated'
+        if failure is not None:
+            self._record_failure(failure)
+        self.__awaiting_roll = False
+        self.__awaiting_score_as = False
+        self._eliminate(player_name, (self.__turn_number - 1) % self.__player_count, forfeit)
+        self._next_turn()
+
+    def _next_turn(self):
+        """Begin the next turn, skipping players who sit out, or end the match"""
+        silent = self.__silent
+        while True:
+            if self.__turn_number > 0 and not silent:
+                self._show_score_sheet()
+            if self.__final_turns is None and (self.__score_sheet.winner() is not None
+                                               or self.__early_winner is not None):
+                # Someone has reached 10,000 points. Give each other player one more turn
+                if self.__early_winner is not None:
+                    self.__final_turns = 0
+                else:
+                    self.__final_turns = self.__player_count - 1
+                    if not silent:
+                        self._say(f'{self.winner()} has reached {self.high_score()} points.', self.__voice)
+                        self._say('Everyone else gets one more turn.', self.__voice)
+            if self.__final_turns == 0 or self.__early_winner is not None:
+                self._end_match()
+                return
             self.__turn_number += 1
-            current_player = self.__players[(self.__turn_number - 1) % self.__player_count]
-            self._manage_turn(current_player)
-
-            print()
-            print(self.__score_sheet)
-            print()
+            if self.__final_turns is not None:
+                self.__final_turns -= 1
+            player = self.__players[(self.__turn_number - 1) % self.__player_count]
+            if player.name() not in self.__eliminated_player_names:
+                self._begin_turn(player)
+                return
+            if not silent:
+                self._say(f'skip {player.name()}', self.__voice)
+
+    def _begin_turn(self, player):
+        """Begin a player's turn"""
+        self.__player_taking_turn = player
+        if not self.__silent:
+            self._say(f'{player.name()}\'s TURN:', self.__voice)
+        if self.__recorder is not None:
+            self.__recorder.begin_turn((self.__turn_number - 1) % self.__player_count, self.__turn_number)
+        if self.__begin_dice_turn is not None:
+            self.__begin_dice_turn(self.__turn_number)
+        if self.__profiler is not None:
+            self.__profiler.count('turns')
+        self._reset_turn()
+
+    def _reset_turn(self):
+        """Set up the current turn to start from its first roll"""
+        self.__turn_has_ended = False
+        self.__dice_remaining = 6
+        self.__score_this_turn = 0
+        self.__player_has_farkled = False
+        self.__current_roll = 0
+        self.__awaiting_roll = True
+        self.__awaiting_score_as = False
+        if self.__turn_budget is not None:
+            self.__rolls_this_turn = 0
+            self.__budget_overrun = None
+            if self.__turn_budget.seconds is not None:
+                self.__turn_deadline = time.perf_counter() + self.__turn_budget.seconds
+
+    def _end_match(self):
+        """Finish the match, announcing the winner and the statistics unless silent"""
+        self.__finished = True
+        self.__player_taking_turn = None
+        self._close_isolated_players()
+        winner = self.winner()      # Could be someone other than the first to reach 10,000!
+        if self.__recorder is not None:
+            self.__recorder.end_match(self.player_names().index(winner), self.__turn_number)
+        if self.__silent:
+            self._close_speech_worker()
+            return
 
-        winner = self.winner()      # Could be someone else!
         self._say(f'Congratulations, {winner.upper()}!', self.__voice)
         self._say('GAME OVER', self.__voice)
+        self._close_speech_worker()
 
         print('Match Statistics')
         print('  Winner:', winner)
@@ -134,62 +461,180 @@ class FarkleMatch:
         print('  Total number of Farkles:', sum(self.__farkle_tallies.values()))
         print('   ', '\n    '.join(f'{player.name():>10}: {self.__farkle_tallies[player.name()]:>4}'
                                for player in self.__players))
-
-        return winner
-
-    def _manage_turn(self, player):
+        if self.__turn_budget is not None:
+            print('  Total number of budget overruns:', sum(self.__overrun_tallies.values()))
+            print('   ', '\n    '.join(f'{player.name():>10}: {self.__overrun_tallies[player.name()]:>4}'
+                                   for player in self.__players))
+
+    def _close_isolated_players(self):
+        """Stop the processes of isolated players"""
+        if self.__isolated_players is not None:
+            for isolated_player in self.__isolated_players.values():
+                isolated_player.close()
+
+    def _close_speech_worker(self):
+        """Speak the messages still queued and stop the speech worker, if the match created it"""
+        if self.__owns_speech_worker:
+            self.__owns_speech_worker = False
+            self.__speech_worker.close()
+            self.__speech_worker = None
+
+    def _show_score_sheet(self):
+        """Print the score sheet"""
+        print()
+        print(self.__score_sheet)
+        print()
+
+    def _take_turn(self, player):
+        """
+        Let a player take the current turn through its take_turn(), applying the failure
+        policy if the turn fails
+        Args:
+            player: the player taking the turn
+        """
+        player_name = player.name()
+        take_turn = player.take_turn
+        if self.__isolated_players is not None:
+            take_turn = self.__isolated_players[player_name].take_turn
+        if self.__profiler is not None:
+            take_turn = self.__profiler.wrap(player_name, take_turn)
+        seat = (self.__turn_number - 1) % self.__player_count
+        attempt = 0
+        while True:
+            if attempt > 0:
+                self._reset_turn()
+            try:
+                self._play_turn(player_name, take_turn)
+                break
+            except Exception:
+                if self._player_failed(player_name, seat, attempt) != playerguard.RETRY:
+                    break
+                attempt += 1
+
+    def _play_turn(self, player_name, take_turn):
+        """
+        Let a player take a turn and record its score. Any exception the player raises,
+        other than a Farkle, is passed on.
+        Args:
+            player_name: the name of the player taking the turn
+            take_turn: the player's take_turn() method
         """
-        Manage the given player's turn
+        try:
+            if self.__silent:
+                # Discard anything the player prints
+                with contextlib.redirect_stdout(_NULL_OUTPUT):
+                    take_turn(self)
+            else:
+                turn_commentary = take_turn(self)
+                self._say(turn_commentary, self.__player_voices[player_name])
+            if self.__turn_budget is not None and self.__budget_overrun is not None:
+                # The player caught the BudgetExceeded exception and carried on
+                raise self.__budget_overrun
+            assert self.__awaiting_roll,\
+                   'Your player did not roll and then select a scoring before returning from .take_turn()'
+        except Farkle:
+            self._farkled(player_name)
+        self._finish_turn(player_name)
+
+    def _farkled(self, player_name):
+        """Wipe out the current turn's points after a Farkle"""
+        self.__farkle_tallies[player_name] += 1
+        if self.__profiler is not None:
+            self.__profiler.count('farkles')
+        self.__score_this_turn = 0      # Lost all points
+        if not self.__silent:
+            self._say('Farkle!!!', self.__player_voices[player_name])
+            farkle_danger_level = self.farkle_danger_level(player_name)
+
+            if farkle_danger_level == 1:
+                self._say("Warning: Two Farkles in a row.", self.__voice)
+            if farkle_danger_level == 2:
+                self._say("Oh, no!  Three Farkles in a row.", self.__voice)
+
+    def _finish_turn(self, player_name):
+        """End the current turn, taken by the named player, and record its score"""
+        self.__awaiting_roll = False
+        self.__awaiting_score_as = False
+        self.__turn_has_ended = True
+        if not self.__silent:
+            self._say(f'Your turn is over, {player_name}.', self.__voice)
+            if self.__score_sheet.score_for(player_name) == 0 and self.__score_this_turn < 500:
+                self._say('You need at least 500 points.', self.__voice)
+        self.__score_sheet.add_score(player_name, self.__score_this_turn)
+        if self.__recorder is not None:
+            self.__recorder.end_turn((self.__turn_number - 1) % self.__player_count,
+                                     replaylog.FARKLED if self.__player_has_farkled else replaylog.BANKED,
+                                     self.__score_this_turn)
+
+    def _player_failed(self, player_name, seat, attempt):
+        """
+        Apply the failure policy after a player's turn raised an exception
         Args:
-            player: the player whose turn is starting
+            player_name: the name of the player whose turn failed
+            seat: the player's seat
+            attempt: the number of earlier attempts at this turn
 
         Returns:
-
+            the action taken: playerguard.INTERACTIVE, ELIMINATE, FORFEIT or RETRY
         """
-        if player.name() not in self.__eliminated_player_names:
-            self.__player_taking_turn = player
-            self.__turn_has_ended = False
-            self.__dice_remaining = 6
-            self.__score_this_turn = 0
-            self.__player_has_farkled = False
-            self._say(f'{player.name()}\'s TURN:', self.__voice)
+        error = sys.exc_info()[1]
+        details = traceback.format_exc()
+        action = self.__on_failure
+        if action == playerguard.RETRY and attempt >= self.__retries:
+            action = playerguard.ELIMINATE
+        failure = playerguard.PlayerFailure(self.__turn_number, player_name, attempt,
+                                            getattr(error, 'kind', playerguard.EXCEPTION),
+                                            type(error).__name__, str(error), details, action)
+        self._record_failure(failure)
+        self.__awaiting_roll = False
+        self.__awaiting_score_as = False
 
-            player_name = player.name()
-            try:
-                try:
-                    self.__awaiting_roll = True
-                    turn_commentary = player.take_turn(self)
-                    self._say(turn_commentary, self.__player_voices[player_name])
-                    assert self.__awaiting_roll,\
-                           'Your player did not roll and then select a scoring before returning from .take_turn()'
-                except Farkle:
-                    self.__farkle_tallies[player_name] += 1
-                    self.__score_this_turn = 0      # Lost all points
-                    self._say('Farkle!!!', self.__player_voices[player_name])
-                    farkle_danger_level = self.farkle_danger_level(player_name)
-
-                    if farkle_danger_level == 1:
-                        self._say("Warning: Two Farkles in a row.", self.__voice)
-                    if farkle_danger_level == 2:
-                        self._say("Oh, no!  Three Farkles in a row.", self.__voice)
-
-                self.__awaiting_roll = False
-                self.__awaiting_score_as = False
-                self._say(f'Your turn is over, {player_name}.', self.__voice)
-                self.__turn_has_ended = True
-                if self.__score_sheet.score_for(player_name) == 0 and self.__score_this_turn < 500:
-                    self._say('You need at least 500 points.', self.__voice)
-                self.__score_sheet.add_score(player_name, self.__score_this_turn)
-            except:
-                self._say('An exception has been raised.', self.__voice)
-                self._say(f'{player_name} will sit out the rest of this match.', self.__voice)
-                self.__eliminated_player_names.add(player_name)
-                print(traceback.format_exc(), file=sys.stderr)
-                print(traceback.format_exc())
-                input('This player\'s code raised an exception. That bug needs to be fixed.')
-                self.__awaiting_roll = False
+        if action == playerguard.INTERACTIVE:
+            self._say('An exception has been raised.', self.__voice)
+            self._say(f'{player_name} will sit out the rest of this match.', self.__voice)
+            self._eliminate(player_name, seat)
+            print(details, file=sys.stderr)
+            print(details)
+            input('This player\'s code raised an exception. That bug needs to be fixed.')
+        elif action == playerguard.RETRY:
+            if not self.__silent:
+                self._say(f'{player_name} failed ({type(error).__name__}: {error}) and will try the turn again.',
+                          self.__voice)
         else:
-            self._say(f'skip {player.name()}', self.__voice)
+            if not self.__silent:
+                self._say(f'{player_name} failed ({type(error).__name__}: {error}).', self.__voice)
+                if action == playerguard.FORFEIT:
+                    self._say(f'{player_name} forfeits the match.', self.__voice)
+                else:
+                    self._say(f'{player_name} will sit out the rest of this match.', self.__voice)
+            self._eliminate(player_name, seat, forfeit=action == playerguard.FORFEIT)
+        return action
+
+    def _record_failure(self, failure):
+        """Add a failure to failures() and the failure log, counting a budget overrun"""
+        self.__failures.append(failure)
+        if failure.kind != playerguard.EXCEPTION:
+            self.__overrun_tallies[failure.player] += 1
+            if self.__profiler is not None:
+                self.__profiler.count('overruns')
+        if self.__failure_log is not None:
+            self.__failure_log.append(failure)
+        if self.__profiler is not None:
+            self.__profiler.count('failures')
+
+    def _eliminate(self, player_name, seat, forfeit=False):
+        """
+        Sit a player out for the rest of the match, ending the match if the player forfeits
+        or no player is left
+        """
+        self.__eliminated_player_names.add(player_name)
+        if self.__recorder is not None:
+            self.__recorder.end_turn(seat, replaylog.ELIMINATED, 0)
+        remaining = [name for name in self.player_names() if name not in self.__eliminated_player_names]
+        if forfeit or not remaining:
+            # The player with the highest score among those left wins, or among everyone if none is left
+            candidates = remaining or self.player_names()
+            self.__early_winner = max(candidates, key=self.__score_sheet.score_for)
 
     def roll(self, comment):
         """
@@ -204,24 +649,58 @@ class FarkleMatch:
                       yield those points. The list is ordered from largest point value to smallest point
                       value.
 
-                      An empty list designates a Farkle.
+                      An empty list designates a Farkle. When the match uses a scorings table,
+                      the scorings are a tuple instead of a list.
         """
         assert self.__awaiting_roll, 'A player attempted to roll twice without scoring the first roll.'
         assert not self.__awaiting_score_as, 'You must call match.score_as() for the pending roll.'
-        player_name = self.__player_taking_turn.name()
-        player_voice = self.__player_voices[player_name]
-        self._say(comment, voice=player_voice)
-        self.__current_roll = self.__current_roll = tuple(random.randint(1, 6) for _ in range(self.__dice_remaining))
-        roll_message = f'{player_name} rolled {" ".join(str(top) for top in self.__current_roll)}'
-        self._say(roll_message, self.__voice)
+        if self.__turn_budget is not None:
+            self.__rolls_this_turn += 1
+            self._check_budget()
+        if not self.__silent:
+            self._say(comment, voice=self.__player_voices[self.__player_taking_turn.name()])
+        scorings = self._roll()
+        if not scorings:
+            raise Farkle()
+        return scorings
 
-        self.__current_roll_scorings = farklescoring.scorings_for(self.__current_roll)
+    def _roll(self):
+        """
+        Roll the dice remaining for the player taking the current turn
+        Returns:
+            the scorings of the roll, as for roll(). When empty, the roll is a Farkle.
+        """
+        if self.__silent:
+            if self.__roll_packed is not None:
+                self.__current_roll = self.__roll_packed(self.__dice_remaining)
+            else:
+                packed_roll = 0
+                for _ in range(self.__dice_remaining):
+                    packed_roll += farkle.FACE_UNITS[random.randint(1, 6)]
+                self.__current_roll = packed_roll
+        else:
+            if self.__dice is not None:
+                dice_roll = self.__dice.roll(self.__dice_remaining)
+            else:
+                dice_roll = tuple(random.randint(1, 6) for _ in range(self.__dice_remaining))
+            self.__current_roll = farkle.pack_dice(dice_roll)
+            roll_message = f'{self.__player_taking_turn.name()} rolled {" ".join(str(top) for top in dice_roll)}'
+            self._say(roll_message, self.__voice)
+
+        if self.__profiled_scorings is not None:
+            self.__current_roll_scorings = self.__profiled_scorings(self.__current_roll)
+        elif self.__scorings_table is None:
+            self.__current_roll_scorings = farklescoring.scorings_for(self.__current_roll)
+        else:
+            self.__current_roll_scorings = farklescoring.table_scorings_for(self.__scorings_table,
+                                                                            self.__current_roll)
+        if self.__recorder is not None:
+            self.__recorder.roll(self.__dice_remaining, self.__current_roll)
         if not self.__current_roll_scorings:
             self.__player_has_farkled = True
-            raise Farkle()
-
-        self.__awaiting_roll = False
-        self.__awaiting_score_as = True
+        else:
+            self.__awaiting_roll = False
+            self.__awaiting_score_as = True
         return self.__current_roll_scorings
 
     def score_as(self, scorings_index, comment):
@@ -235,15 +714,28 @@ class FarkleMatch:
             The number of dice remaining after the scoring is recorded
         """
         assert self.__awaiting_score_as, 'The player needs to call match.roll() first'
-        player_voice = self.__player_voices[self.__player_taking_turn.name()]
+        if self.__turn_budget is not None:
+            self._check_budget()
+        dice_remaining = self._score_as(scorings_index)
+        if not self.__silent:
+            self._say(comment, self.__player_voices[self.__player_taking_turn.name()])
+        return dice_remaining
+
+    def _score_as(self, scorings_index):
+        """Score the last roll, as for score_as(), and return the number of dice remaining"""
+        silent = self.__silent
         if scorings_index < 0 or scorings_index >= len(self.__current_roll_scorings):
-            self._say(f'*** INVALID SCORING INDEX. Using 0  - {self.__current_roll_scorings[0]}', self.__voice)
+            if not silent:
+                self._say(f'*** INVALID SCORING INDEX. Using 0  - {self.__current_roll_scorings[0]}', self.__voice)
             scorings_index = 0
         score, dice_used = self.__current_roll_scorings[scorings_index]
-        self._say(f'Score as {score}, setting aside {", ".join(str(top) for top in dice_used)}.', player_voice)
-        self._say(comment, player_voice)
+        if self.__recorder is not None:
+            self.__recorder.score(scorings_index, score)
+        if not silent:
+            player_voice = self.__player_voices[self.__player_taking_turn.name()]
+            self._say(f'Score as {score}, setting aside {", ".join(str(top) for top in dice_used)}.', player_voice)
         self.__score_this_turn += score
-        dice_remaining = len(self.__current_roll) - len(dice_used)
+        dice_remaining = self.__dice_remaining - len(dice_used)
         if dice_remaining == 0:
             dice_remaining = 6
         self.__dice_remaining = dice_remaining
@@ -252,10 +744,93 @@ class FarkleMatch:
         self.__awaiting_roll = True
         return dice_remaining
 
+    def _check_budget(self):
+        """Raise playerguard.BudgetExceeded if the current turn has spent its budget"""
+        budget = self.__turn_budget
+        if self.__budget_overrun is None:
+            if budget.rolls is not None and self.__rolls_this_turn > budget.rolls:
+                self.__budget_overrun = playerguard.BudgetExceeded(
+                    playerguard.ROLLS, f'more than {budget.rolls} rolls in one turn')
+            elif budget.seconds is not None and time.perf_counter() > self.__turn_deadline:
+                self.__budget_overrun = playerguard.BudgetExceeded(
+                    playerguard.TIME, f'more than {budget.seconds} seconds in one turn')
+        if self.__budget_overrun is not None:
+            raise self.__budget_overrun
+
+    def _scorings_for(self, packed_roll):
+        """Get the scorings for a packed roll, used when the match is profiled"""
+        if self.__scorings_table is None:
+            return farklescoring.scorings_for(packed_roll)
+        return farklescoring.table_scorings_for(self.__scorings_table, packed_roll)
+
     def _say(self, message, voice):
-        """Display a message"""
+        """Display a message and, when speaking, queue it for the speech worker"""
         print(message)
-        if self.__say:
-            cleaned_message = message.replace('"', ' ')
-            # print(f'say -v "{voice}" "{cleaned_message}"')      # DEBUG
-            os.system(f'say -v "{voice}" "{cleaned_message}"')
\ No newline at end of file
+        if self.__speech_worker is not None:
+            self.__speech_worker.speak(str(message), voice)
+
+
+class PolicyPlayer:
+    """
+    A FarklePlayer that takes each step of its turns from a policy, as a driver of act() would
+    """
+
+    def __init__(self, name, policy):
+        """
+        Initialize a player
+        Args:
+            name: the player's name
+            policy: a function of an Observation and the legal actions that returns an action
+        """
+        self._name = name
+        self._policy = policy
+
+    def name(self):
+        """Get this player's name"""
+        return self._name
+
+    def take_turn(self, match):
+        """Take my turn, one action of the policy at a time"""
+        while True:
+            action = self._policy(match.observe(), match.legal_actions())
+            if action == BANK:
+                return ''
+            if action == ROLL:
+                match.roll('')
+            else:
+                match.score_as(action, '')
+
+
+if __name__ == '__main__':
+    import automated
+    import simpleauto
+
+    def take_highest_and_bank(observation, legal_actions):
+        """The policy of simpleauto.FarklePlayer"""
+        if observation.scorings is not None:
+            return 0
+        return BANK if BANK in legal_actions else ROLL
+
+    for seed in range(200):
+        expected = FarkleMatch([automated.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')], silent=True,
+                               dice=farkle.RandomDice(seed))
+        expected.start_play()
+
+        # Ben takes his turns through play_turn() and Jessica's are driven step by step
+        ben = automated.FarklePlayer('Ben')
+        match = FarkleMatch([ben, simpleauto.FarklePlayer('Jessica')], silent=True, dice=farkle.RandomDice(seed))
+        match.begin()
+        while not match.finished():
+            observation = match.observe()
+            if observation.player == 'Ben':
+                match.play_turn(ben)
+            else:
+                event = match.act(take_highest_and_bank(observation, match.legal_actions()))
+                assert event in (ROLLED, FARKLED, SCORED, BANKED)
+        assert match.result() == expected.result() and match.observe().winner == expected.winner()
+
+        as_player = FarkleMatch([automated.FarklePlayer('Ben'), PolicyPlayer('Jessica', take_highest_and_bank)],
+                                silent=True, dice=farkle.RandomDice(seed))
+        as_player.start_play()
+        assert as_player.result() == expected.result()
+    print('DONE')
@@ -0,0 +1,152 @@
+"""
+Exact odds for a roll of 1 through 6 dice.
+
+Every roll of n dice is enumerated once, grouped into its distinct sorted rolls, each weighted
+by the number of orderings among the 6 ** n equally likely rolls. The results are kept, so a
+strategy can ask for them at every decision for the price of a dictionary lookup.
+
+    farkle_probability(n)          the chance that n dice Farkle
+    best_score_distribution(n)     the chance of each highest available score
+    probability_at_least(n, score) the chance that the highest available score is at least score
+    expected_best_score(n)         the average highest available score, counting a Farkle as 0
+    expected_dice_remaining(n)     the average dice left after taking the highest score,
+                                   over the rolls that do not Farkle
+
+Each query takes an optional farklescoring.Ruleset. Probabilities are exact Fractions in
+odds_for() and floats elsewhere.
+"""
+
+import collections
+import fractions
+import functools
+import itertools
+import math
+
+import farklescoring
+
+# The exact odds for a roll of some number of dice:
+#   dice: the number of dice rolled
+#   farkle: the probability that the roll has no scoring
+#   best_scores: a tuple of (score, probability) pairs in increasing order of score, for the
+#                highest scoring of each roll that does not Farkle
+#   expected_best_score: the average highest score, with a Farkle counting as 0
+#   expected_dice_remaining: the average number of dice left after the highest scoring is
+#                            taken, over the rolls that do not Farkle; hot dice count as 0
+RollOdds = collections.namedtuple('RollOdds',
+                                  'dice farkle best_scores expected_best_score expected_dice_remaining')
+
+
+def roll_orderings(roll):
+    """
+    Count the orderings of a roll
+    Args:
+        roll: a sequence of die values
+
+    Returns:
+        the number of distinct sequences of the same dice, out of 6 ** len(roll)
+    """
+    orderings = math.factorial(len(roll))
+    for count in collections.Counter(roll).values():
+        orderings //= math.factorial(count)
+    return orderings
+
+
+def weighted_rolls(n):
+    """
+    Generate every distinct roll of n dice with its number of orderings
+    Args:
+        n: the number of dice, between 1 and 6
+
+    Returns:
+        an iterator over 2-tuples (roll, orderings), where roll is sorted. The orderings sum
+        to 6 ** n.
+    """
+    for roll in itertools.combinations_with_replacement(range(1, 7), n):
+        yield roll, roll_orderings(roll)
+
+
+@functools.lru_cache(maxsize=None)
+def odds_for(n, rules=farklescoring.STANDARD_RULES):
+    """
+    Compute the exact odds for a roll of n dice, once per number of dice and ruleset
+    Args:
+        n: the number of dice, between 1 and 6
+        rules: the Ruleset giving the point values
+
+    Returns:
+        a RollOdds whose probabilities and averages are Fractions
+    """
+    assert 1 <= n <= 6, 'Between 1 and 6 dice are rolled'
+    total = 6 ** n
+    farkles = 0
+    best_scores = collections.Counter()
+    dice_remaining = 0
+    for roll, orderings in weighted_rolls(n):
+        scorings = farklescoring.scorings_for(roll, rules)
+        if not scorings:
+            farkles += orderings
+            continue
+        score, dice = scorings[0]
+        best_scores[score] += orderings
+        dice_remaining += (n - len(dice)) * orderings
+
+    scoring_rolls = total - farkles
+    return RollOdds(n,
+                    fractions.Fraction(farkles, total),
+                    tuple((score, fractions.Fraction(count, total)) for score, count in sorted(best_scores.items())),
+                    fractions.Fraction(sum(score * count for score, count in best_scores.items()), total),
+                    fractions.Fraction(dice_remaining, scoring_rolls))
+
+
+@functools.lru_cache(maxsize=None)
+def farkle_probability(n, rules=farklescoring.STANDARD_RULES):
+    """Get the probability that a roll of n dice has no scoring"""
+    return float(odds_for(n, rules).farkle)
+
+
+@functools.lru_cache(maxsize=None)
+def best_score_distribution(n, rules=farklescoring.STANDARD_RULES):
+    """
+    Get the distribution of the highest score available from a roll of n dice
+    Returns:
+        a tuple of (score, probability) pairs in increasing order of score. A Farkle is left
+        out, so the probabilities sum to 1 - farkle_probability(n).
+    """
+    return tuple((score, float(probability)) for score, probability in odds_for(n, rules).best_scores)
+
+
+@functools.lru_cache(maxsize=None)
+def probability_at_least(n, score, rules=farklescoring.STANDARD_RULES):
+    """Get the probability that the highest score available from a roll of n dice is at least score"""
+    return float(sum(probability for best, probability in odds_for(n, rules).best_scores if best >= score))
+
+
+@functools.lru_cache(maxsize=None)
+def expected_best_score(n, rules=farklescoring.STANDARD_RULES):
+    """Get the average highest score available from a roll of n dice, counting a Farkle as 0"""
+    return float(odds_for(n, rules).expected_best_score)
+
+
+@functools.lru_cache(maxsize=None)
+def expected_dice_remaining(n, rules=farklescoring.STANDARD_RULES):
+    """Get the average number of dice left after taking the highest score, when n dice do not Farkle"""
+    return float(odds_for(n, rules).expected_dice_remaining)
+
+
+# The probability of a Farkle for each number of dice, indexed by the number of dice
+FARKLE_ODDS = (None,) + tuple(farkle_probability(n) for n in range(1, 7))
+
+
+if __name__ == '__main__':
+    for nbr_of_dice in range(1, 7):
+        odds = odds_for(nbr_of_dice)
+        assert sum(weight for _, weight in weighted_rolls(nbr_of_dice)) == 6 ** nbr_of_dice
+        assert odds.farkle + sum(probability for _, probability in odds.best_scores) == 1
+        print(f'{nbr_of_dice} dice: Farkle {odds.farkle} = {float(odds.farkle):.4f}, '
+              f'best score {float(odds.expected_best_score):7.1f} on average, '
+              f'{float(odds.expected_dice_remaining):.2f} dice left on average')
+    # Known values: one die Farkles unless it shows 1 or 5, and six dice Farkle 2.31% of the time
+    assert odds_for(1).farkle == fractions.Fraction(2, 3)
+    assert odds_for(6).farkle == fractions.Fraction(1080, 46656)
+    assert probability_at_least(1, 100) == 1 / 6
+    print('DONE')
@@ -3,14 +3,40 @@ Functions that construct the scorings for a dice roll.
 
 A scoring is a pair(score, dice), where score is an int value and dice is a tuple of values 1 through 6.
 
+The point values come from a Ruleset. STANDARD_RULES holds the values used by default; house
+rules are another Ruleset, compiled once into a scorings table by compile_ruleset().
+
 BUGS SHOULD BE REPORTED IN PIAZZA. INCLUDE IN THE BUG REPORT THE DICE ROLL.
 """
 
 # THIS CODE WILL BENEFIT FROM REFACTORING.
 
 
+import collections
+import functools
+import itertools
+import os
+import pickle
+
 import farkle
 
+SCORINGS_TABLE_FORMAT = 2       # Changes whenever the layout of a scorings table changes
+
+# The point values of the scorings:
+#   single_one, single_five: one die showing 1 or 5
+#   triple_one: three 1s
+#   triple_multiplier: three of any other value v score v times this
+#   four_of_a_kind, five_of_a_kind, six_of_a_kind: n of any value
+#   straight: 1 through 6
+#   three_pairs, four_and_a_pair, two_triples: the other six-dice scorings
+Ruleset = collections.namedtuple('Ruleset',
+                                 'single_one single_five triple_one triple_multiplier '
+                                 'four_of_a_kind five_of_a_kind six_of_a_kind '
+                                 'straight three_pairs four_and_a_pair two_triples',
+                                 defaults=(100, 50, 300, 100, 1000, 2000, 3000, 1500, 1500, 1500, 2500))
+
+STANDARD_RULES = Ruleset()
+
 
 def merge_scorings(scorings1, scorings2):
     """
@@ -47,12 +73,26 @@ def seq_scorings(top, points_each, n):
     return list((points_each * k, (top,) * k) for k in range(1, n + 1))
 
 
-def n_of_a_kind_scorings(top, n):
+def triple_score(top, rules=STANDARD_RULES):
+    """
+    Get the score for three of a kind
+    Args:
+        top: the number occurring three times
+        rules: the Ruleset giving the point values
+
+    Returns:
+        the number of points for three dice showing top
+    """
+    return rules.triple_one if top == 1 else top * rules.triple_multiplier
+
+
+def n_of_a_kind_scorings(top, n, rules=STANDARD_RULES):
     """
     Compute a sequence of scorings for n-of-a-kind
     Args:
         top: the number occurring n times
         n: an int value between 3 and 6
+        rules: the Ruleset giving the point values
 
     Returns:
         a list of scorings for n-of-a-kind of the value top
@@ -62,16 +102,16 @@ def n_of_a_kind_scorings(top, n):
     scorings = []
     if n == 6:
         # Score as 6-of-a-kind
-        scorings.append((3000, (top,) * 6))
+        scorings.append((rules.six_of_a_kind, (top,) * 6))
     if n >= 5:
         # Score as 5-of-a-kind
-        scorings.append((2000, (top,) * 5))
+        scorings.append((rules.five_of_a_kind, (top,) * 5))
     if n >= 4:
         # Score as 4-of-a-kind
-        scorings.append((1000, (top,) * 4))
+        scorings.append((rules.four_of_a_kind, (top,) * 4))
     if n >= 3:
         # Score as 3-of-a-kind
-        scorings.append((300 if top == 1 else top * 100, (top,) * 3))
+        scorings.append((triple_score(top, rules), (top,) * 3))
     return scorings
 
 
@@ -79,11 +119,12 @@ def scorings_3_to_6_of_a_kind(dice_roll):
     pass
 
 
-def scorings_for(dice_roll):
+def scorings_for(dice_roll, rules=STANDARD_RULES):
     """
     Find all of the ways to score a randomize of zero or more dice
     Args:
-        dice_roll: a list of die values
+        dice_roll: a list of die values, or a packed roll (see farkle.pack_dice())
+        rules: the Ruleset giving the point values
 
     Returns:
         A list of zero or more 2-tuples of the form (score, selected-dice),
@@ -93,6 +134,9 @@ def scorings_for(dice_roll):
     """
     scorings = []
 
+    if isinstance(dice_roll, int):
+        dice_roll = farkle.unpack_dice(dice_roll)
+
     if dice_roll:
         # There is at least one die to process
         dice_roll = list(dice_roll)  # COPY AS A list
@@ -102,77 +146,77 @@ def scorings_for(dice_roll):
 
         if len(dice_roll) == 1:
             if left_roll == 1:
-                scorings.append((100, (1,)))
+                scorings.append((rules.single_one, (1,)))
             elif left_roll == 5:
-                scorings.append((50, (5,)))
+                scorings.append((rules.single_five, (5,)))
         else:
             hist = farkle.histogram_for(dice_roll)
 
             if hist.count(1) == 6:
                 # Straight
-                scorings.append((1500, (1, 2, 3, 4, 5, 6)))
-                scorings.append((150, (1, 5)))
-                scorings.append((100, (1,)))
-                scorings.append((50, (5,)))
+                scorings.append((rules.straight, (1, 2, 3, 4, 5, 6)))
+                scorings.append((rules.single_one + rules.single_five, (1, 5)))
+                scorings.append((rules.single_one, (1,)))
+                scorings.append((rules.single_five, (5,)))
             elif hist.count(3) == 2:
                 # Two triples
                 top1 = hist.index(3)  # triple 1
                 top2 = hist.index(3, top1 + 1)  # triple 2
-                scorings.append((2500, tuple(dice_roll)))
-                scorings.append((300 if top1 == 1 else top1 * 100, (top1, top1, top1)))
-                scorings.append((top2 * 100, (top2, top2, top2)))  # top2 cannot be 1
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.append((rules.two_triples, tuple(dice_roll)))
+                scorings.append((triple_score(top1, rules), (top1, top1, top1)))
+                scorings.append((triple_score(top2, rules), (top2, top2, top2)))  # top2 cannot be 1
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
             elif hist.count(2) == 3:
                 # Three pairs
-                scorings.append((1500, tuple(dice_roll)))
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.append((rules.three_pairs, tuple(dice_roll)))
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
             elif 4 in hist and 2 in hist:
                 # Four of any number and a pair
-                scorings.append((1500, tuple(dice_roll)))
-                scorings.extend(n_of_a_kind_scorings(hist.index(4), 4))     # ignore pair
-                scorings.extend(n_of_a_kind_scorings(hist.index(4), 3))     # triple
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.append((rules.four_and_a_pair, tuple(dice_roll)))
+                scorings.extend(n_of_a_kind_scorings(hist.index(4), 4, rules))     # ignore pair
+                scorings.extend(n_of_a_kind_scorings(hist.index(4), 3, rules))     # triple
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
             elif 6 in hist:
                 # Six of a kind
-                scorings.extend(n_of_a_kind_scorings(hist.index(6), 6))
-                scorings.extend(n_of_a_kind_scorings(hist.index(6), 5))
-                scorings.extend(n_of_a_kind_scorings(hist.index(6), 4))
-                scorings.extend(n_of_a_kind_scorings(hist.index(6), 3))
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.extend(n_of_a_kind_scorings(hist.index(6), 6, rules))
+                scorings.extend(n_of_a_kind_scorings(hist.index(6), 5, rules))
+                scorings.extend(n_of_a_kind_scorings(hist.index(6), 4, rules))
+                scorings.extend(n_of_a_kind_scorings(hist.index(6), 3, rules))
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
             elif hist[left_roll] == 5:
                 # five-of-a-kind
-                scorings.extend(n_of_a_kind_scorings(hist.index(5), 5))
-                scorings.extend(n_of_a_kind_scorings(hist.index(5), 4))
-                scorings.extend(n_of_a_kind_scorings(hist.index(5), 3))
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.extend(n_of_a_kind_scorings(hist.index(5), 5, rules))
+                scorings.extend(n_of_a_kind_scorings(hist.index(5), 4, rules))
+                scorings.extend(n_of_a_kind_scorings(hist.index(5), 3, rules))
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
                 # scorings.extend(scorings_for(dice_roll[:1]))
                 # scorings.extend(scorings_for(dice_roll[1:]))
             elif hist[left_roll] == 4:
                 # 4-of-a-kind
-                scorings.extend(n_of_a_kind_scorings(hist.index(4), 4))
-                scorings.extend(n_of_a_kind_scorings(hist.index(4), 3))
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.extend(n_of_a_kind_scorings(hist.index(4), 4, rules))
+                scorings.extend(n_of_a_kind_scorings(hist.index(4), 3, rules))
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
                 # scorings.extend(scorings_for(dice_roll[:1]))
                 # scorings.extend(scorings_for(dice_roll[1:]))
             elif hist[left_roll] == 3:
                 # three-of-a-kind
-                scorings.extend(n_of_a_kind_scorings(hist.index(3), 3))
-                scorings.extend(seq_scorings(1, 100, hist[1]))
-                scorings.extend(seq_scorings(5, 50, hist[5]))
+                scorings.extend(n_of_a_kind_scorings(hist.index(3), 3, rules))
+                scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
+                scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
             else:
                 # rolled 1 or 2 of the left number
                 # Just count 1s and 5s
                 if left_roll == 1:
-                    scorings.extend(seq_scorings(1, 100, hist[1]))
+                    scorings.extend(seq_scorings(1, rules.single_one, hist[1]))
                 elif left_roll == 5:
-                    scorings.extend(seq_scorings(5, 50, hist[5]))
-                scorings = merge_scorings(scorings, scorings_for(dice_roll[hist[left_roll]:]))
+                    scorings.extend(seq_scorings(5, rules.single_five, hist[5]))
+                scorings = merge_scorings(scorings, scorings_for(dice_roll[hist[left_roll]:], rules))
 
     # Remove any duplicates
     scorings = list(set(scorings))
@@ -182,6 +226,82 @@ def scorings_for(dice_roll):
     return scorings
 
 
+def sorted_rolls():
+    """
+    Generate every distinct roll of 1 through 6 dice, each in sorted order
+    Returns:
+        an iterator over tuples of die values in non-decreasing order. There are 923 such rolls.
+    """
+    for n in range(1, 7):
+        yield from itertools.combinations_with_replacement(range(1, 7), n)
+
+
+def build_scorings_table(rules=STANDARD_RULES):
+    """
+    Compute the scorings for every distinct roll of 1 through 6 dice
+    Args:
+        rules: the Ruleset giving the point values
+
+    Returns:
+        a dictionary whose keys are packed rolls (see farkle.pack_dice()) and whose values are
+        tuples of the scorings returned by scorings_for(), in the same order
+    """
+    return {farkle.pack_dice(roll): tuple(scorings_for(roll, rules)) for roll in sorted_rolls()}
+
+
+@functools.lru_cache(maxsize=None)
+def compile_ruleset(rules):
+    """
+    Compile a ruleset into a scorings table, once per ruleset
+    Args:
+        rules: a Ruleset
+
+    Returns:
+        the scorings table for the ruleset, as created by build_scorings_table(). The same
+        table is returned for every call with an equal ruleset, so it must not be modified.
+    """
+    return build_scorings_table(rules)
+
+
+def load_scorings_table(path=None):
+    """
+    Get a scorings table, reading it from a cache file when one is available
+    Args:
+        path: the name of a cache file, or None to always build the table. When the file
+              does not exist, the table is built and then saved to it.
+
+    Returns:
+        a scorings table as created by build_scorings_table()
+    """
+    if path is not None and os.path.exists(path):
+        with open(path, 'rb') as cache_file:
+            cached = pickle.load(cache_file)
+        if isinstance(cached, tuple) and cached[0] == SCORINGS_TABLE_FORMAT:
+            return cached[1]
+        # Otherwise the cache was written in an older layout; rebuild it
+
+    table = build_scorings_table()
+    if path is not None:
+        with open(path, 'wb') as cache_file:
+            pickle.dump((SCORINGS_TABLE_FORMAT, table), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return table
+
+
+def table_scorings_for(table, dice_roll):
+    """
+    Look up the scorings for a roll of one or more dice in a scorings table
+    Args:
+        table: a scorings table as created by build_scorings_table()
+        dice_roll: a non-empty sequence of die values, in any order, or a packed roll
+
+    Returns:
+        a tuple holding the same scorings, in the same order, as scorings_for(dice_roll)
+    """
+    if isinstance(dice_roll, int):
+        return table[dice_roll]
+    return table[farkle.pack_dice(dice_roll)]
+
+
 if __name__ == '__main__':
     import random
 
@@ -213,3 +333,14 @@ if __name__ == '__main__':
         roll = tuple(sorted(random.randint(1, 6) for __ in range(n)))
         print(f'Roll: {roll} - {scorings_for(roll)}')
         print()
+
+    # The table must agree with scorings_for() for every roll
+    print('-' * 80)
+    scorings_table = build_scorings_table()
+    assert len(scorings_table) == 923, f'    FAIL: expected 923 rolls, found {len(scorings_table)}'
+    for roll in sorted_rolls():
+        assert list(table_scorings_for(scorings_table, roll[::-1])) == scorings_for(roll), \
+            f'    FAIL: table disagrees for {roll}'
+        assert scorings_for(farkle.pack_dice(roll)) == scorings_for(roll), \
+            f'    FAIL: scorings_for() disagrees for packed {roll}'
+    print(f'Scorings table agrees with scorings_for() for all {len(scorings_table)} rolls')
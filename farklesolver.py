@@ -0,0 +1,247 @@
+"""
+Solve for the play that maximizes the expected score of a single Farkle turn.
+
+A turn is in state (turn score, dice remaining). After each roll the player chooses a scoring
+and then either banks the turn score or rolls the remaining dice again; a Farkle loses the
+whole turn score. Every scoring adds at least 50 points, so the turn score strictly increases
+from state to state and a single backward sweep from the highest turn score down to 0 gives
+the exact values that value iteration would converge to. Above a cap the player always banks.
+
+The solved values are kept in a compact binary file so that later runs only read them back.
+The file records the ruleset and cap it was solved for, and is solved again when asked for
+another. Use load_policy() to get an EVPolicy.
+"""
+
+import array
+import os
+import struct
+
+import farkleodds
+import farklescoring
+
+UNIT = 50                   # Every score is a multiple of 50 points
+DEFAULT_CAP = 30000         # Always bank a turn score of this many points or more
+DEFAULT_POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'farkle_ev_policy.bin')
+
+# magic, unit, cap, then the point values of the ruleset
+_HEADER = struct.Struct(f'<4sII{len(farklescoring.Ruleset._fields)}I')
+_MAGIC = b'FKE2'
+
+
+def roll_outcomes(n, rules=farklescoring.STANDARD_RULES):
+    """
+    Group every roll of n dice by the choices it offers
+    Args:
+        n: the number of dice rolled, between 1 and 6
+        rules: the farklescoring.Ruleset giving the point values
+
+    Returns:
+        a list of 2-tuples (probability, options), where options is a tuple of
+        (points in units of 50, dice remaining) pairs. Only the richest scoring for each
+        number of dice remaining is kept, since more points are never worse. The rolls
+        that Farkle are left out, so the probabilities sum to less than 1.
+    """
+    grouped = {}
+    for roll, orderings in farkleodds.weighted_rolls(n):
+        scorings = farklescoring.scorings_for(roll, rules)
+        if not scorings:
+            continue
+        best = {}
+        for score, dice in scorings:
+            dice_remaining = n - len(dice) or 6
+            best[dice_remaining] = max(best.get(dice_remaining, 0), score // UNIT)
+        options = tuple(sorted((points, dice_remaining) for dice_remaining, points in best.items()))
+        grouped[options] = grouped.get(options, 0) + orderings / 6 ** n
+    return [(probability, options) for options, probability in grouped.items()]
+
+
+def solve(cap=DEFAULT_CAP, rules=farklescoring.STANDARD_RULES):
+    """
+    Compute the expected final turn score from every state of a turn under optimal play
+    Args:
+        cap: a multiple of 50; any turn score this large or larger is banked
+        rules: the farklescoring.Ruleset giving the point values
+
+    Returns:
+        a list V of 7 lists such that V[n][s] is the expected final score of the turn for a
+        player holding s * 50 points with n dice left to roll, playing optimally.
+        V[0] is unused.
+    """
+    top = cap // UNIT
+    outcomes = [None] + [roll_outcomes(n, rules) for n in range(1, 7)]
+    values = [[float(s * UNIT) for s in range(top + 1)] for _ in range(7)]
+
+    for s in range(top - 1, -1, -1):
+        for n in range(1, 7):
+            expected = 0.0
+            for probability, options in outcomes[n]:
+                best = 0.0
+                for points, dice_remaining in options:
+                    next_s = s + points
+                    value = values[dice_remaining][next_s] if next_s <= top else next_s * UNIT
+                    if value > best:
+                        best = value
+                expected += probability * best
+            if expected > values[n][s]:
+                values[n][s] = expected
+    return values
+
+
+class EVPolicy:
+    """
+    The expected-score-maximizing choices for a single turn, looked up from solved values
+    """
+
+    def __init__(self, values, rules=farklescoring.STANDARD_RULES):
+        """
+        Initialize a policy
+        Args:
+            values: the values computed by solve(). They are stored as 32-bit floats, just as
+                    in a policy file, so a solved policy and one read back agree exactly.
+            rules: the farklescoring.Ruleset the values were solved for
+        """
+        self._values = [None] + [array.array('f', values[n]) for n in range(1, 7)]
+        self._top = len(values[1]) - 1
+        self.cap = self._top * UNIT
+        self.rules = rules
+
+    def value(self, turn_score, dice_remaining):
+        """
+        Get the expected final score of a turn played optimally from the given state
+        Args:
+            turn_score: the points scored so far this turn, a multiple of 50
+            dice_remaining: the number of dice left to roll, between 1 and 6
+
+        Returns:
+            the expected final turn score
+        """
+        s = turn_score // UNIT
+        if s > self._top:
+            return float(turn_score)
+        return self._values[dice_remaining][s]
+
+    def should_roll(self, turn_score, dice_remaining):
+        """
+        Decide whether to roll again
+        Args:
+            turn_score: the points scored so far this turn
+            dice_remaining: the number of dice left to roll
+
+        Returns:
+            True if rolling again has a higher expected score than banking
+        """
+        return self.value(turn_score, dice_remaining) > turn_score
+
+    def choose_scoring(self, scorings, turn_score, dice_rolled):
+        """
+        Choose the scoring that leads to the highest expected turn score
+        Args:
+            scorings: the non-empty scorings of a roll, as returned by FarkleMatch.roll()
+            turn_score: the points scored this turn before this roll
+            dice_rolled: the number of dice in the roll
+
+        Returns:
+            the index of the best scoring
+        """
+        best_index, best_value = 0, -1.0
+        for index, (score, dice) in enumerate(scorings):
+            value = self.value(turn_score + score, dice_rolled - len(dice) or 6)
+            if value > best_value:
+                best_index, best_value = index, value
+        return best_index
+
+    def save(self, path):
+        """
+        Write this policy's values to a binary file
+        Args:
+            path: the name of the file
+        """
+        # Write a temporary file first so other processes never read a partial policy
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as policy_file:
+            policy_file.write(_HEADER.pack(_MAGIC, UNIT, self.cap, *self.rules))
+            for n in range(1, 7):
+                self._values[n].tofile(policy_file)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read a policy written by save()
+        Args:
+            path: the name of the file
+
+        Returns:
+            an EVPolicy
+        """
+        with open(path, 'rb') as policy_file:
+            magic, unit, cap, *rules = _read_header(policy_file)
+            assert magic == _MAGIC and unit == UNIT, f'{path} does not hold a Farkle policy'
+            count = cap // UNIT + 1
+            values = array.array('f')
+            values.fromfile(policy_file, 6 * count)
+        return cls([None] + [values[n * count:(n + 1) * count] for n in range(6)],
+                   farklescoring.Ruleset(*rules))
+
+
+def _read_header(policy_file):
+    """
+    Read the header of a policy file
+    Returns:
+        the unpacked header fields, or a tuple of Nones if the file is too short to hold them
+    """
+    data = policy_file.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        return (None,) * (3 + len(farklescoring.Ruleset._fields))
+    return _HEADER.unpack(data)
+
+
+def _saved_for(path, cap, rules):
+    """True if a policy file exists and holds the policy for the given cap and ruleset"""
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as policy_file:
+        magic, unit, saved_cap, *saved_rules = _read_header(policy_file)
+    return (magic, unit, saved_cap, tuple(saved_rules)) == (_MAGIC, UNIT, cap, tuple(rules))
+
+
+def load_policy(path=DEFAULT_POLICY_FILE, cap=DEFAULT_CAP, rules=farklescoring.STANDARD_RULES):
+    """
+    Get the optimal single-turn policy, solving for it only when no saved copy exists
+    Args:
+        path: the name of the policy file, or None to solve without saving. A file saved
+              for another cap or ruleset, or by an older version, is solved again and replaced.
+        cap: the turn score that is always banked
+        rules: the farklescoring.Ruleset giving the point values
+
+    Returns:
+        an EVPolicy
+    """
+    if path is not None and _saved_for(path, cap, rules):
+        return EVPolicy.read(path)
+
+    policy = EVPolicy(solve(cap, rules), rules)
+    if path is not None:
+        policy.save(path)
+    return policy
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    # A saved policy is only reused for the cap and ruleset it was solved for
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'policy.bin')
+        standard = load_policy(path, cap=5000)
+        assert EVPolicy.read(path).value(0, 6) == standard.value(0, 6)
+        generous = load_policy(path, cap=5000, rules=farklescoring.Ruleset(single_five=100))
+        assert generous.value(0, 6) > standard.value(0, 6) and EVPolicy.read(path).rules.single_five == 100
+        assert load_policy(path, cap=3000).cap == 3000
+        assert load_policy(path, cap=5000).value(0, 6) == standard.value(0, 6)
+
+    ev_policy = load_policy(None)
+    print(f'Expected score of a turn played optimally: {ev_policy.value(0, 6):.1f}')
+    for nbr_of_dice in range(1, 7):
+        bank_at = next(score for score in range(0, DEFAULT_CAP + UNIT, UNIT)
+                       if not ev_policy.should_roll(score, nbr_of_dice))
+        print(f'  With {nbr_of_dice} dice left, bank at {bank_at} points or more')
@@ -0,0 +1,180 @@
+"""
+Count and time what happens during Farkle matches.
+
+Give a FarkleMatch a MatchProfiler to time each player's turns, the rolls, the scoring of
+each roll, the score sheet queries and the output. Timings are kept per stack of frames,
+such as ('Ben', 'roll', 'scorings'), so a player's own decision time is the time spent in
+its frame less the time spent in the match methods it called. A match without a profiler
+pays nothing: the match only wraps its methods when it is given one.
+
+A profiler can collect many matches, and profilers from different processes can be merged.
+Read the results with summary() or report(), or write them with write_collapsed() in the
+collapsed-stack format read by flamegraph.pl and speedscope.
+"""
+
+import collections
+import time
+
+# The time spent in one stack of frames:
+#   path: a tuple of frame names, outermost first
+#   calls: the number of times the innermost frame was entered
+#   total: the seconds spent in the innermost frame, including the frames it entered
+#   own: the seconds spent in the innermost frame itself
+ProfileEntry = collections.namedtuple('ProfileEntry', 'path calls total own')
+
+
+class MatchProfiler:
+    """
+    Collect counts and timings for one or more matches
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        """
+        Initialize a profiler with nothing recorded
+        Args:
+            clock: a function of no arguments returning the time in seconds
+        """
+        self._clock = clock
+        self._names = []            # The stack of frame names
+        self._starts = []           # The time each frame on the stack was entered
+        self._child_times = []      # The time spent in the children of each frame on the stack
+        self._calls = collections.Counter()
+        self._totals = collections.Counter()
+        self._own_times = collections.Counter()
+        self.counts = collections.Counter()
+
+    def enter(self, name):
+        """Enter a frame"""
+        self._names.append(name)
+        self._child_times.append(0.0)
+        self._starts.append(self._clock())
+
+    def leave(self):
+        """Leave the innermost frame"""
+        elapsed = self._clock() - self._starts.pop()
+        path = tuple(self._names)
+        self._names.pop()
+        self._calls[path] += 1
+        self._totals[path] += elapsed
+        self._own_times[path] += elapsed - self._child_times.pop()
+        if self._child_times:
+            self._child_times[-1] += elapsed
+
+    def count(self, name, amount=1):
+        """Add to a counter"""
+        self.counts[name] += amount
+
+    def wrap(self, name, function):
+        """
+        Wrap a function so that each call is timed in a frame
+        Args:
+            name: the name of the frame
+            function: any function
+
+        Returns:
+            a function that calls function inside the frame
+        """
+        enter, leave = self.enter, self.leave
+
+        def profiled(*args, **kwargs):
+            enter(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                leave()
+
+        profiled.__doc__ = function.__doc__
+        return profiled
+
+    def merge(self, other):
+        """Add the counts and timings of another profiler to this one"""
+        self._calls.update(other._calls)
+        self._totals.update(other._totals)
+        self._own_times.update(other._own_times)
+        self.counts.update(other.counts)
+
+    def __getstate__(self):
+        """Pickle only the results, so profilers can be returned from worker processes"""
+        state = dict(self.__dict__)
+        state['_clock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._clock = time.perf_counter
+
+    def summary(self):
+        """
+        Summarize the timings
+        Returns:
+            a list of ProfileEntry values, the most own time first
+        """
+        entries = [ProfileEntry(path, self._calls[path], self._totals[path], self._own_times[path])
+                   for path in self._calls]
+        entries.sort(key=lambda entry: entry.own, reverse=True)
+        return entries
+
+    def frame_totals(self, name):
+        """
+        Total a frame over every stack in which it is innermost
+        Returns:
+            a 3-tuple (calls, total seconds, own seconds)
+        """
+        calls = total = own = 0
+        for path, path_calls in self._calls.items():
+            if path[-1] == name:
+                calls += path_calls
+                total += self._totals[path]
+                own += self._own_times[path]
+        return calls, total, own
+
+    def report(self, limit=20):
+        """
+        Describe the counts and the most expensive frames
+        Args:
+            limit: the largest number of frames described
+
+        Returns:
+            a multi-line string
+        """
+        lines = [f'{"frame":<40} {"calls":>10} {"total ms":>10} {"own ms":>10} {"own us/call":>12}']
+        for path, calls, total, own in self.summary()[:limit]:
+            lines.append(f'{";".join(path):<40} {calls:>10} {total * 1e3:>10.1f} {own * 1e3:>10.1f} '
+                         f'{own / calls * 1e6:>12.2f}')
+        for name, count in sorted(self.counts.items()):
+            lines.append(f'{name:<40} {count:>10}')
+        return '\n'.join(lines)
+
+    def collapsed_stacks(self):
+        """
+        Get the timings in the collapsed-stack format: one line per stack, the frame names
+        joined by semicolons, then a space and the own time in microseconds
+        """
+        return [f'{";".join(path)} {round(own * 1e6)}' for path, own in self._own_times.items() if own > 0]
+
+    def write_collapsed(self, path):
+        """Write collapsed_stacks() to a file, one stack per line"""
+        with open(path, 'w') as stacks_file:
+            for line in self.collapsed_stacks():
+                print(line, file=stacks_file)
+
+
+if __name__ == '__main__':
+    import automated
+    import farkle
+    import farklematch
+    import simpleauto
+
+    profiler = MatchProfiler()
+    for seed in range(50):
+        match = farklematch.FarkleMatch([automated.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')],
+                                        silent=True, dice=farkle.RandomDice(seed), profiler=profiler)
+        match.start_play()
+    print(profiler.report())
+
+    assert profiler.counts['matches'] == 50
+    calls, total, own = profiler.frame_totals('roll')
+    assert calls == profiler.frame_totals('scorings')[0] and own <= total
+    assert profiler.frame_totals('Ben')[0] + profiler.frame_totals('Jessica')[0] == profiler.counts['turns']
+    assert all(stack.count(' ') == 1 for stack in profiler.collapsed_stacks())
+    print('DONE')
@@ -0,0 +1,402 @@
+"""
+Host many Farkle matches at once on one asyncio event loop.
+
+FarkleMatch.start_play() drives a match from start to finish and each player's take_turn()
+holds on to the match until its turn is over, so a human who is slow to answer holds up
+everything else in the process. A MatchServer instead plays each match step by step (see
+FarkleMatch.begin()), one event at a time: a roll, the choice of a scoring, or the decision
+to bank the turn's points. Each match is a coroutine, so thousands of them share one event
+loop and a match only waits for its own players.
+
+A seat in a match is either
+    BotSeat      an existing FarklePlayer, whose whole turn is played at once without waiting
+    RemoteSeat   a client on a connection, such as a human at a terminal
+
+A remote client speaks a line protocol. The server sends one JSON object per line:
+    {"event": "turn", "turn": 7, "score": 1500, "high_score": 3200, "danger": 0}
+    {"event": "rolled", "dice": [1, 3, 3, 4, 5, 6], "scorings": [[150, [1, 5]], [100, [1]], [50, [5]]]}
+    {"event": "scored", "points": 150, "turn_score": 150, "dice": 4}
+    {"event": "farkle"}
+    {"event": "banked", "turn_score": 150}
+    {"event": "error", "message": "..."}
+    {"event": "over", "winner": "Ben", "scores": {"Ben": 10050, "Ann": 7100}}
+and the client answers a "turn", "rolled", "scored" or "error" event with one command:
+    roll            roll the dice remaining (always the first command of a turn)
+    score <index>   score the last roll with the scoring at that index
+    bank            end the turn, keeping its points (only after a scoring)
+A client that does not send a valid command within the server's decision time, or
+disconnects, sits out the rest of its match, which ends if only one player is left. Invalid
+commands do not extend the time for a decision.
+
+Connections are either in memory (memory_connection_pair(), for tests and local clients)
+or TCP streams (StreamConnection):
+
+    python matchserver.py [port]    # each TCP client sends 'join <name>', then plays two bots
+    python matchserver.py check     # check the server against FarkleMatch
+"""
+
+import asyncio
+import json
+import sys
+
+import automated
+import farkle
+import farklematch
+import farklescoring
+import playerguard
+import simpleauto
+
+
+class BotSeat:
+    """A seat taken by a FarklePlayer, which plays each turn at once through its take_turn()"""
+
+    def __init__(self, player):
+        """
+        Initialize a seat
+        Args:
+            player: a FarklePlayer that never waits for input
+        """
+        self.player = player
+
+    def name(self):
+        """Get the player's name"""
+        return self.player.name()
+
+    async def play_turn(self, match, decision_seconds):
+        """Play the current turn of a match"""
+        match.play_turn(self.player)
+
+    async def match_over(self, match):
+        """Nothing to do: a bot needs no telling"""
+
+
+class RemoteSeat:
+    """A seat taken by a client on a connection, which sends one command at a time"""
+
+    def __init__(self, name, connection):
+        """
+        Initialize a seat
+        Args:
+            name: the player's name
+            connection: a MemoryConnection or StreamConnection to the client
+        """
+        self._name = name
+        self.connection = connection
+        self.player = self      # The match only needs the name
+
+    def name(self):
+        """Get the player's name"""
+        return self._name
+
+    async def _send(self, event):
+        await self.connection.write_line(json.dumps(event))
+
+    async def play_turn(self, match, decision_seconds):
+        """Play the current turn of a match, one command from the client at a time"""
+        loop = asyncio.get_running_loop()
+        observation = match.observe()
+        turn_number = observation.turn
+        await self._send({'event': 'turn', 'turn': turn_number, 'score': observation.score,
+                          'high_score': observation.high_score, 'danger': observation.farkle_danger_level})
+        deadline = None if decision_seconds is None else loop.time() + decision_seconds
+        while observation.turn == turn_number and not match.finished():
+            # One deadline for each decision, however many invalid commands come before it
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            line = await asyncio.wait_for(self.connection.read_line(), timeout)
+            if line is None:
+                raise ConnectionError(f'{self._name} disconnected')
+            command, _, argument = line.strip().partition(' ')
+            action = int(argument) if command == 'score' and argument.isdigit() else command
+            if action not in match.legal_actions():
+                await self._send({'event': 'error', 'message': f'{line.strip()!r} is not allowed now'})
+                continue
+            turn_score = observation.turn_score
+            event = match.act(action)
+            observation = match.observe()
+            if event == farklematch.ROLLED:
+                await self._send({'event': 'rolled', 'dice': list(observation.dice),
+                                  'scorings': [[points, list(dice)] for points, dice in observation.scorings]})
+            elif event == farklematch.SCORED:
+                await self._send({'event': 'scored', 'points': observation.turn_score - turn_score,
+                                  'turn_score': observation.turn_score, 'dice': observation.dice_remaining})
+            elif event == farklematch.FARKLED:
+                await self._send({'event': 'farkle'})
+            else:
+                await self._send({'event': 'banked', 'turn_score': turn_score})
+            deadline = None if decision_seconds is None else loop.time() + decision_seconds
+
+    async def match_over(self, match):
+        """Tell the client the match is over"""
+        result = match.result()
+        await self._send({'event': 'over', 'winner': result.winner, 'scores': result.scores})
+
+
+class MemoryConnection:
+    """One end of an in-memory line connection"""
+
+    def __init__(self, incoming, outgoing):
+        self._incoming = incoming
+        self._outgoing = outgoing
+
+    async def read_line(self):
+        """Get the next line, without its newline, or None once the other end has closed"""
+        return await self._incoming.get()
+
+    async def write_line(self, text):
+        """Send a line"""
+        self._outgoing.put_nowait(text)
+
+    def close(self):
+        """Close this end; the other end reads None"""
+        self._outgoing.put_nowait(None)
+
+
+def memory_connection_pair():
+    """
+    Connect two MemoryConnection ends
+    Returns:
+        a 2-tuple (server end, client end)
+    """
+    to_server, to_client = asyncio.Queue(), asyncio.Queue()
+    return MemoryConnection(to_server, to_client), MemoryConnection(to_client, to_server)
+
+
+class StreamConnection:
+    """A line connection over an asyncio stream, such as a TCP connection"""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    async def read_line(self):
+        """Get the next line, without its newline, or None once the other end has closed"""
+        data = await self._reader.readline()
+        return data.decode().rstrip('\r\n') if data else None
+
+    async def write_line(self, text):
+        """Send a line"""
+        self._writer.write(text.encode() + b'\n')
+        await self._writer.drain()
+
+    def close(self):
+        """Close the connection"""
+        self._writer.close()
+
+
+class MatchServer:
+    """
+    Play any number of matches at once on the running event loop
+    """
+
+    def __init__(self, decision_seconds=None, scorings_table=None, failure_log=None):
+        """
+        Initialize a server
+        Args:
+            decision_seconds: the longest a remote client may take to make one decision, however
+                              many invalid commands it sends, before it sits out the rest of
+                              its match, or None for no limit
+            scorings_table: a table from farklescoring.build_scorings_table(), or None to build one
+            failure_log: a playerguard.FailureLog to which each failure in a match, including each
+                         remote seat that fails, is appended, or None
+        """
+        self._decision_seconds = decision_seconds
+        self._scorings_table = scorings_table if scorings_table is not None else farklescoring.build_scorings_table()
+        self._failure_log = failure_log
+        self.active_matches = 0
+        self.matches_played = 0
+
+    async def play(self, seats, dice=None):
+        """
+        Play a match
+        Args:
+            seats: a sequence of BotSeat and RemoteSeat values, in seat order
+            dice: a dice source (see farkle.py), or None for fresh entropy
+
+        Returns:
+            the match's farklematch.MatchResult
+        """
+        seat_for = {seat.name(): seat for seat in seats}
+        match = farklematch.FarkleMatch([seat.player for seat in seats], silent=True,
+                                        scorings_table=self._scorings_table, dice=dice,
+                                        failure_log=self._failure_log)
+        failed = set()
+        self.active_matches += 1
+        try:
+            match.begin()
+            while not match.finished():
+                observation = match.observe()
+                try:
+                    await seat_for[observation.player].play_turn(match, self._decision_seconds)
+                except Exception as error:
+                    failed.add(observation.player)
+                    self._seat_failed(match, observation, error, forfeit=len(failed) >= len(seats) - 1)
+                await asyncio.sleep(0)      # Let the other matches move on between turns
+            for seat in seats:
+                if seat.name() not in failed:
+                    await seat.match_over(match)
+        finally:
+            self.active_matches -= 1
+        self.matches_played += 1
+        return match.result()
+
+    async def play_many(self, seat_lists, dice_sources=None):
+        """
+        Play many matches at once
+        Args:
+            seat_lists: a sequence of seat sequences, one for each match
+            dice_sources: a sequence of dice sources, one for each match, or None
+
+        Returns:
+            a list of farklematch.MatchResult values in the order of seat_lists
+        """
+        if dice_sources is None:
+            dice_sources = [None] * len(seat_lists)
+        return await asyncio.gather(*(self.play(seats, dice) for seats, dice in zip(seat_lists, dice_sources)))
+
+    def _seat_failed(self, match, observation, error, forfeit):
+        """Sit out a remote seat whose turn failed, recording the failure in the match"""
+        timed_out = isinstance(error, asyncio.TimeoutError)
+        action = playerguard.FORFEIT if forfeit else playerguard.ELIMINATE
+        failure = playerguard.PlayerFailure(observation.turn, observation.player, 0,
+                                            playerguard.TIME if timed_out else playerguard.EXCEPTION,
+                                            type(error).__name__, str(error), '', action)
+        match.eliminate(observation.player, forfeit, failure)
+
+    async def serve(self, host, port, opponents=None):
+        """
+        Accept TCP clients, each of which plays a match against bots. A client first sends
+        'join <name>'.
+        Args:
+            host, port: the address to listen on
+            opponents: a function of no arguments returning a list of FarklePlayer values for
+                       one match, or None for an automated and a simpleauto player
+        """
+        if opponents is None:
+            def opponents():
+                return [automated.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')]
+
+        async def handle(reader, writer):
+            connection = StreamConnection(reader, writer)
+            try:
+                line = await connection.read_line()
+                command, _, name = (line or '').partition(' ')
+                bots = [BotSeat(player) for player in opponents()]
+                if command != 'join' or not name or name in {bot.name() for bot in bots}:
+                    await connection.write_line(json.dumps({'event': 'error', 'message': 'send join <name>'}))
+                    return
+                await self.play([RemoteSeat(name, connection)] + bots)
+            finally:
+                connection.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def _simple_client(connection, latency):
+    """A remote client that plays as simpleauto.FarklePlayer does, for testing"""
+    scores = None
+    while True:
+        await asyncio.sleep(latency)
+        line = await connection.read_line()
+        if line is None:
+            return scores
+        event = json.loads(line)
+        if event['event'] == 'turn':
+            await connection.write_line('roll')
+        elif event['event'] == 'rolled':
+            await connection.write_line('score 0')
+        elif event['event'] == 'scored':
+            await connection.write_line('bank')
+        elif event['event'] == 'over':
+            connection.close()
+            return event['scores']
+
+
+async def _spamming_client(connection):
+    """
+    A remote client that only sends invalid commands, for testing
+    Returns:
+        True once the server stops answering, or False if it answers for 5 seconds
+    """
+    loop = asyncio.get_running_loop()
+    stop = loop.time() + 5
+    while loop.time() < stop:
+        await connection.write_line('bogus')
+        try:
+            await asyncio.wait_for(connection.read_line(), 0.2)
+        except asyncio.TimeoutError:
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+def _check():
+    """Check the server plays exactly as FarkleMatch does, with bots and remote clients at once"""
+    import random
+    import time
+
+    scorings_table = farklescoring.build_scorings_table()
+
+    def match_result(players, seed):
+        match = farklematch.FarkleMatch(players, silent=True, scorings_table=scorings_table,
+                                        dice=farkle.RandomDice(seed))
+        match.start_play()
+        return match.result()
+
+    async def run():
+        server = MatchServer(decision_seconds=0.5, scorings_table=scorings_table)
+        bot_count, remote_count = 1000, 100
+        seat_lists = [[BotSeat(automated.FarklePlayer('Ben')), BotSeat(simpleauto.FarklePlayer('Jessica'))]
+                      for _ in range(bot_count)]
+        clients = []
+        for number in range(remote_count):
+            server_end, client_end = memory_connection_pair()
+            seat_lists.append([BotSeat(automated.FarklePlayer('Ben')), RemoteSeat('Ann', server_end)])
+            clients.append(_simple_client(client_end, random.Random(number).random() * 0.002))
+        # A client that never answers sits out, and the match goes on without waiting for it
+        server_end, silent_client_end = memory_connection_pair()
+        seat_lists.append([RemoteSeat('Mute', server_end), BotSeat(automated.FarklePlayer('Ben'))])
+        # So does a client that only sends invalid commands
+        server_end, client_end = memory_connection_pair()
+        seat_lists.append([RemoteSeat('Spam', server_end), BotSeat(automated.FarklePlayer('Ben'))])
+        clients.append(_spamming_client(client_end))
+        log = playerguard.FailureLog()
+        server._failure_log = log
+
+        started = time.perf_counter()
+        results, *client_scores = await asyncio.gather(
+            server.play_many(seat_lists, [farkle.RandomDice(seed) for seed in range(len(seat_lists))]), *clients)
+        elapsed = time.perf_counter() - started
+        print(f'{len(seat_lists)} concurrent matches in {elapsed:.2f} s')
+
+        for seed in range(0, bot_count, 50):
+            assert results[seed] == match_result([automated.FarklePlayer('Ben'),
+                                                  simpleauto.FarklePlayer('Jessica')], seed), seed
+        for number in range(remote_count):
+            seed = bot_count + number
+            expected = match_result([automated.FarklePlayer('Ben'), simpleauto.FarklePlayer('Ann')], seed)
+            assert results[seed] == expected and client_scores[number] == expected.scores, seed
+        assert client_scores[-1] is True, 'an invalid command extended the time for a decision'
+        for result, name in zip(results[-2:], ('Mute', 'Spam')):
+            assert result.winner == 'Ben' and result.overruns == {name: 1, 'Ben': 0}
+        assert sorted((failure.player, failure.kind) for failure in log.failures) == \
+               [('Mute', playerguard.TIME), ('Spam', playerguard.TIME)]
+        assert server.active_matches == 0 and server.matches_played == len(seat_lists)
+
+    asyncio.run(run())
+    print('DONE')
+
+
+def main():
+    """Serve matches over TCP, or check the server with 'check'"""
+    if sys.argv[1:] == ['check']:
+        _check()
+        return
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8642
+    print(f'Serving Farkle matches on port {port}')
+    asyncio.run(MatchServer(decision_seconds=300).serve('0.0.0.0', port))
+
+
+if __name__ == '__main__':
+    main()
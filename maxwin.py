@@ -0,0 +1,77 @@
+"""
+The class maxwin.FarklePlayer makes the choices that maximize its chance to win a two-player match.
+
+The choices come from the policy file exported by farklegamesolver. Create it once with
+    python farklegamesolver.py
+"""
+
+import farklegamesolver
+
+
+class FarklePlayer:
+    """ A Farkle player who plays each turn to maximize its chance to win the match"""
+
+    POLICY_FILE = farklegamesolver.DEFAULT_POLICY_FILE
+    _policy = None      # Shared by every player; opened on first use
+
+    def __init__(self, name):
+        """Initialize a player with a given name"""
+        self._name = name
+
+    def name(self):
+        """Get this player's name"""
+        return self._name
+
+    @classmethod
+    def policy(cls):
+        """Get the shared farklegamesolver.GamePolicy, opening it if necessary"""
+        if cls._policy is None:
+            try:
+                FarklePlayer._policy = farklegamesolver.GamePolicy(cls.POLICY_FILE)
+            except FileNotFoundError:
+                raise FileNotFoundError(f'There is no policy file {cls.POLICY_FILE}. Build it with '
+                                        f'"python farklegamesolver.py", which writes '
+                                        f'{farklegamesolver.DEFAULT_POLICY_FILE}') from None
+        return cls._policy
+
+    @staticmethod
+    def _state_for(model, match, player_name):
+        """Get a player's solver state from the match"""
+        score = match.score_for(player_name)
+        danger_level = match.farkle_danger_level(player_name)
+        # The match does not say whether a player with 0 points has recorded a first score.
+        # A player on the board with exactly 0 points and no Farkles is rare, so assume not.
+        return model.state_for(score, danger_level, score != 0 or danger_level > 0)
+
+    def take_turn(self, match):
+        """
+        Take my turn, which comprises at least one roll of 6 dice
+        Args:
+            match: a two-player match
+
+        Returns:
+            a comment string about this turn
+        """
+        policy = self.policy()
+        model = policy.model
+
+        player_names = match.player_names()
+        assert len(player_names) == 2, 'maxwin.FarklePlayer only plays two-player matches'
+        seat = player_names.index(self.name())
+        other_name = player_names[1 - seat]
+        plan = policy.plan(seat,
+                           self._state_for(model, match, self.name()),
+                           self._state_for(model, match, other_name),
+                           match.score_for(other_name) >= model.target)
+
+        score_this_turn = 0
+        nbr_of_dice = 6          # Start with 6
+        while True:
+            scorings = match.roll('Rolling.')
+            selection = plan.choose_scoring(scorings, score_this_turn, nbr_of_dice)
+            score_this_turn += scorings[selection][0]
+            nbr_of_dice = match.score_as(selection, 'That gives me the best chance.')
+            if not plan.should_roll(score_this_turn, nbr_of_dice):
+                break
+
+        return f'I will bank {score_this_turn} points.'
@@ -0,0 +1,60 @@
+"""
+The class optimal.FarklePlayer makes the choices that maximize the expected score of each turn.
+
+The choices come from the policy solved by farklesolver, which is read from its policy file
+(or solved and saved) the first time a player takes a turn. Set FarklePlayer.POLICY_FILE to
+keep the file elsewhere, or to None to solve without saving.
+"""
+
+import farklesolver
+
+
+class FarklePlayer:
+    """ A Farkle player who plays each turn to maximize its expected score"""
+
+    POLICY_FILE = farklesolver.DEFAULT_POLICY_FILE
+    _policy = None      # Shared by every player; loaded on first use
+
+    def __init__(self, name):
+        """Initialize a player with a given name"""
+        self._name = name
+
+    def name(self):
+        """Get this player's name"""
+        return self._name
+
+    @classmethod
+    def policy(cls):
+        """Get the shared farklesolver.EVPolicy, loading it if necessary"""
+        if cls._policy is None:
+            FarklePlayer._policy = farklesolver.load_policy(cls.POLICY_FILE)
+        return cls._policy
+
+    def take_turn(self, match):
+        """
+        Take my turn, which comprises at least one roll of 6 dice
+        Args:
+            match:
+
+        Returns:
+            a comment string about this turn
+        """
+        policy = self.policy()
+
+        # A turn worth less than 500 points does not count until I am on the board
+        needs_to_get_on_board = match.score_for(self.name()) == 0
+
+        score_this_turn = 0
+        nbr_of_dice = 6          # Start with 6
+        while True:
+            scorings = match.roll('Rolling.')
+            selection = policy.choose_scoring(scorings, score_this_turn, nbr_of_dice)
+            score_this_turn += scorings[selection][0]
+            nbr_of_dice = match.score_as(selection, 'That is the best choice.')
+
+            if needs_to_get_on_board and score_this_turn < 500:
+                continue
+            if not policy.should_roll(score_this_turn, nbr_of_dice):
+                break
+
+        return f'I will bank {score_this_turn} points.'
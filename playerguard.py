@@ -0,0 +1,357 @@
+"""
+Keep a failing or runaway player from stopping a Farkle match.
+
+A player fails a turn when its take_turn() raises an exception or overruns the turn budget.
+FarkleMatch then applies its failure policy:
+    INTERACTIVE  report the traceback and wait for Enter, then sit the player out
+                 (the classroom behaviour, and the default for a match that is not silent)
+    ELIMINATE    sit the player out for the rest of the match (the default for a silent match)
+    FORFEIT      end the match at once; the player loses
+    RETRY        play the turn again from the start, up to the match's number of retries,
+                 and then sit the player out
+Every failure is kept as a PlayerFailure by the match and, if the match has one, appended
+to a FailureLog, which can write each failure to a file as a line of JSON.
+
+A TurnBudget limits the rolls and the seconds of a single turn. The match checks it each
+time the player calls roll() or score_as(), and raises BudgetExceeded in the player's code
+when it is spent. That cannot stop a player that computes for ever without calling the
+match, so an isolated budget runs each player in its own process (see IsolatedPlayer): the
+player's calls to the match are passed over a pipe, and a turn that outlasts the budget is
+ended by killing the process. The match counts the overruns of each player in its result.
+"""
+
+import collections
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+INTERACTIVE = 'interactive'
+ELIMINATE = 'eliminate'
+FORFEIT = 'forfeit'
+RETRY = 'retry'
+
+POLICIES = (INTERACTIVE, ELIMINATE, FORFEIT, RETRY)
+
+# How a turn failed
+EXCEPTION = 'exception'         # take_turn() raised an exception
+ROLLS = 'rolls'                 # the player rolled more often than the budget allows
+TIME = 'time'                   # the turn took longer than the budget allows
+
+# The limits on a single turn; None is no limit:
+#   seconds: the wall-clock time from the start of the turn
+#   rolls: the number of rolls
+#   isolated: True to run each player in its own process, which is killed when the turn
+#             outlasts seconds (see IsolatedPlayer)
+TurnBudget = collections.namedtuple('TurnBudget', 'seconds rolls isolated', defaults=(None, None, False))
+
+# One failed turn:
+#   turn: the match's turn number
+#   player: the player's name
+#   attempt: 0 for the first attempt at the turn, 1 for the first retry, and so on
+#   kind: EXCEPTION, ROLLS or TIME
+#   error_type: the name of the exception's class
+#   message: the exception's message
+#   traceback: the formatted traceback
+#   action: the policy applied: INTERACTIVE, ELIMINATE, FORFEIT or RETRY
+PlayerFailure = collections.namedtuple('PlayerFailure',
+                                       'turn player attempt kind error_type message traceback action')
+
+
+class BudgetExceeded(Exception):
+    """A player has spent its turn budget"""
+
+    def __init__(self, kind, message):
+        """
+        Initialize the exception
+        Args:
+            kind: ROLLS or TIME
+            message: a description of the overrun
+        """
+        super().__init__(message)
+        self.kind = kind
+
+    def __reduce__(self):
+        """Pickle the kind too, so the exception can cross a pipe"""
+        return BudgetExceeded, (self.kind, str(self))
+
+
+class PlayerProcessError(Exception):
+    """An isolated player raised an exception or its process died"""
+
+
+class FailureLog:
+    """
+    Collect the failures of one or more matches, optionally writing each to a file
+    """
+
+    def __init__(self, path=None):
+        """
+        Initialize a log
+        Args:
+            path: a file to which each failure is appended as a line of JSON, or None to
+                  keep the failures only in memory
+        """
+        self.failures = []
+        self._path = path
+
+    def append(self, failure):
+        """Add a PlayerFailure to the log"""
+        self.failures.append(failure)
+        if self._path is not None:
+            with open(self._path, 'a') as log_file:
+                print(json.dumps(failure._asdict()), file=log_file)
+
+    def __len__(self):
+        return len(self.failures)
+
+
+# The match methods an isolated player may call
+_MATCH_METHODS = frozenset(('player_names', 'score_for', 'high_score', 'farkle_danger_level', 'winner',
+                            'roll', 'score_as'))
+
+
+class _MatchProxy:
+    """Stands in for the match in an isolated player's process, passing each call over a pipe"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.match_error = None         # The last exception raised by the match
+
+    def __getattr__(self, method):
+        if method not in _MATCH_METHODS:
+            raise AttributeError(method)
+
+        def call(*args):
+            self._connection.send(('call', method, args))
+            kind, value = self._connection.recv()
+            if kind == 'raise':
+                self.match_error = value
+                raise value
+            return value
+
+        return call
+
+
+def _serve_player(player, connection, silent):
+    """Take turns for a player, one for each request from the match, in the player's own process"""
+    match = _MatchProxy(connection)
+    output = open(os.devnull, 'w') if silent else None
+    while connection.recv() is not None:
+        match.match_error = None
+        try:
+            if silent:
+                with contextlib.redirect_stdout(output):
+                    commentary = player.take_turn(match)
+            else:
+                commentary = player.take_turn(match)
+            connection.send(('return', commentary))
+        except BaseException as error:
+            # An exception from the match, such as a Farkle, is raised again by the match itself
+            connection.send(('raise', error is match.match_error,
+                             f'{type(error).__name__}: {error}\n{traceback.format_exc()}'))
+
+
+class IsolatedPlayer:
+    """
+    Run a player in its own process, so its turns can be ended by killing the process
+    """
+
+    def __init__(self, player, seconds=None, silent=False):
+        """
+        Initialize an isolated player. The process starts with the first turn.
+        Args:
+            player: a player, which must be picklable unless processes are started by forking
+            seconds: the longest a turn may last before the process is killed, or None
+            silent: True to discard anything the player prints
+        """
+        self._player = player
+        self._seconds = seconds
+        self._silent = silent
+        self._process = None
+        self._connection = None
+
+    def name(self):
+        """Get the player's name"""
+        return self._player.name()
+
+    def take_turn(self, match):
+        """
+        Take the player's turn in its process, passing its calls on to the match
+        Args:
+            match: the FarkleMatch
+
+        Returns:
+            the player's comment on the turn
+        """
+        if self._process is None:
+            self._connection, child_connection = multiprocessing.Pipe()
+            self._process = multiprocessing.Process(target=_serve_player,
+                                                    args=(self._player, child_connection, self._silent),
+                                                    daemon=True)
+            self._process.start()
+            child_connection.close()
+        deadline = None if self._seconds is None else time.perf_counter() + self._seconds
+        connection = self._connection
+        connection.send(('turn',))
+        match_error = None      # The last exception the match raised in the player
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not connection.poll(timeout):
+                self.close()    # The next turn starts a fresh process
+                raise BudgetExceeded(TIME, f'more than {self._seconds} seconds in one turn; the process was killed')
+            try:
+                message = connection.recv()
+            except EOFError:
+                self.close()
+                raise PlayerProcessError(f'the process of player {self.name()} exited') from None
+            if message[0] == 'return':
+                return message[1]
+            if message[0] == 'raise':
+                _, from_match, details = message
+                if from_match:
+                    raise match_error
+                raise PlayerProcessError(details)
+            _, method, args = message
+            try:
+                if method not in _MATCH_METHODS:
+                    raise AttributeError(method)
+                result = getattr(match, method)(*args)
+            except Exception as error:
+                match_error = error
+                connection.send(('raise', error))
+            else:
+                connection.send(('return', result))
+
+    def close(self):
+        """Stop the player's process"""
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join()
+            self._connection.close()
+            self._process = None
+            self._connection = None
+
+
+def read_failures(path):
+    """
+    Read back the failures written by a FailureLog
+    Args:
+        path: the log file
+
+    Returns:
+        an iterator over PlayerFailure values
+    """
+    with open(path) as log_file:
+        for line in log_file:
+            yield PlayerFailure(**json.loads(line))
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    import time
+
+    import automated
+    import farkle
+    import farklematch
+
+    class _FailingPlayer(automated.FarklePlayer):
+        """Fails on the turns given, either by raising an exception or by overrunning the budget"""
+
+        def __init__(self, name, failing_turns, loop=False):
+            super().__init__(name)
+            self._failing_turns = failing_turns
+            self._loop = loop
+            self.turns = 0
+
+        def take_turn(self, match):
+            self.turns += 1
+            if self.turns in self._failing_turns:
+                if not self._loop:
+                    raise RuntimeError('bad player')
+                time.sleep(0.1)
+                while True:
+                    try:
+                        match.roll('again')
+                        match.score_as(0, 'again')
+                    except BudgetExceeded:
+                        pass        # Swallowing the overrun does not help
+            return super().take_turn(match)
+
+    def play(failing_player, **options):
+        match = farklematch.FarkleMatch([failing_player, automated.FarklePlayer('Ben')], silent=True,
+                                        dice=farkle.RandomDice(11), **options)
+        return match.start_play(), match.failures()
+
+    log_path = os.path.join(tempfile.mkdtemp(), 'failures.jsonl')
+    log = FailureLog(log_path)
+    winner, failures = play(_FailingPlayer('Bad', {1}), failure_log=log)
+    assert winner == 'Ben' and len(failures) == 1 and failures[0].action == ELIMINATE
+    assert failures[0].kind == EXCEPTION and failures[0].error_type == 'RuntimeError'
+
+    winner, failures = play(_FailingPlayer('Bad', {3}), on_failure=FORFEIT, failure_log=log)
+    assert winner == 'Ben' and failures[0].turn == 5 and failures[0].action == FORFEIT
+
+    player = _FailingPlayer('Bad', {2})
+    winner, failures = play(player, on_failure=RETRY, failure_log=log)
+    assert [failure.action for failure in failures] == [RETRY] and player.turns > 3
+
+    winner, failures = play(_FailingPlayer('Bad', {2, 3, 4}), on_failure=RETRY, retries=2, failure_log=log)
+    assert [failure.action for failure in failures] == [RETRY, RETRY, ELIMINATE] and winner == 'Ben'
+
+    # The budget holds for every player, so Ben overruns it too as soon as he rolls twice
+    winner, failures = play(_FailingPlayer('Bad', {1}, loop=True), turn_budget=TurnBudget(rolls=1))
+    assert failures[0].player == 'Bad' and {failure.kind for failure in failures} == {ROLLS}
+
+    winner, failures = play(_FailingPlayer('Bad', {1}, loop=True), turn_budget=TurnBudget(seconds=0.05),
+                            failure_log=log)
+    assert winner == 'Ben' and failures[0].kind == TIME
+
+    assert list(read_failures(log_path)) == log.failures and len(log) == 7
+
+    # Ctrl-C stops the match instead of counting as the player's failure
+    class _InterruptedPlayer(automated.FarklePlayer):
+        def take_turn(self, match):
+            raise KeyboardInterrupt
+
+    try:
+        play(_InterruptedPlayer('Bad'))
+        assert False, 'KeyboardInterrupt was swallowed'
+    except KeyboardInterrupt:
+        pass
+
+    # An isolated match plays exactly as one in a single process
+    def play_pair(**options):
+        match = farklematch.FarkleMatch([automated.FarklePlayer('Amy'), automated.FarklePlayer('Ben')],
+                                        silent=True, dice=farkle.RandomDice(5), **options)
+        match.start_play()
+        return match.result()
+
+    assert play_pair() == play_pair(turn_budget=TurnBudget(seconds=30, isolated=True))
+
+    class _SpinningPlayer(automated.FarklePlayer):
+        """Computes for ever on its second turn without calling the match"""
+
+        turns = 0
+
+        def take_turn(self, match):
+            self.turns += 1
+            while self.turns == 2:
+                pass
+            return super().take_turn(match)
+
+    started = time.perf_counter()
+    match = farklematch.FarkleMatch([_SpinningPlayer('Spin'), automated.FarklePlayer('Ben')], silent=True,
+                                    dice=farkle.RandomDice(3), turn_budget=TurnBudget(seconds=0.5, isolated=True))
+    assert match.start_play() == 'Ben' and time.perf_counter() - started < 30
+    result = match.result()
+    assert result.overruns == {'Spin': 1, 'Ben': 0} and match.failures()[0].kind == TIME
+
+    winner, failures = play(_FailingPlayer('Bad', {2}), turn_budget=TurnBudget(isolated=True))
+    assert winner == 'Ben' and failures[0].error_type == 'PlayerProcessError'
+    assert 'RuntimeError: bad player' in failures[0].message
+    print('DONE')
@@ -0,0 +1,286 @@
+"""
+Record every roll and decision of Farkle matches in a compact binary log, and read it back.
+
+A replay log is a file that starts with a short header and then holds fixed-size 8-byte
+records, one per event. Matches are appended one after another, so a log may hold any number
+of matches and a recorder can reopen the log and keep appending. Only the player names at
+the start of each match are text; every other event is packed numbers.
+
+    MATCH    a match begins: the number of players, followed by that many NAME records
+    NAME     one player's name: its length in bytes, followed by the UTF-8 bytes
+    TURN     a turn begins: the seat of the player and the turn number
+    ROLL     the dice rolled, as a packed roll (see farkle.pack_dice())
+    SCORE    the index of the scoring taken and its points
+    END      a turn ends: the seat, how it ended (BANKED, FARKLED or ELIMINATED) and the
+             turn score
+    RESULT   a match ends: the seat of the winner and the number of turns
+
+Give FarkleMatch a ReplayRecorder to record a match. Use read_events() to stream the events
+of a log, or read_matches() to stream whole matches as MatchReplay values. Both read the log
+a block at a time, so a log of any size can be analysed without loading it.
+
+To re-run a recorded match, give FarkleMatch a ReplayDice for it as its dice source. The
+same players make the same rolls and decisions again, event for event.
+"""
+
+import collections
+import struct
+
+import farkle
+
+_HEADER = struct.Struct('<4sI')
+_MAGIC = b'FKRP'
+_VERSION = 1
+
+# Every record is (kind, small, medium, value)
+_RECORD = struct.Struct('<BBhi')
+
+MATCH, NAME, TURN, ROLL, SCORE, END, RESULT = range(7)
+
+# How a turn ended
+BANKED, FARKLED, ELIMINATED = range(3)
+
+READ_BLOCK = 1 << 16        # Bytes read from a log at a time
+
+# One event from a replay log:
+#   kind: MATCH, NAME, TURN, ROLL, SCORE, END or RESULT
+#   The other fields depend on the kind:
+#       MATCH:  a = the number of players
+#       NAME:   b = the length of the name in bytes; value = the name
+#       TURN:   a = the seat; value = the turn number
+#       ROLL:   a = the number of dice; value = the packed roll
+#       SCORE:  a = the scoring index; value = the points
+#       END:    a = the seat; b = BANKED, FARKLED or ELIMINATED; value = the turn score
+#       RESULT: a = the seat of the winner; value = the number of turns
+Event = collections.namedtuple('Event', 'kind a b value')
+
+# A turn read back from a log:
+#   seat: the index of the player taking the turn
+#   turn_number: the number of the turn, starting from 1
+#   rolls: a list of (packed roll, scoring index, points) triples; the index and points are
+#          None for a roll that Farkled or was never scored
+#   outcome: BANKED, FARKLED or ELIMINATED
+#   turn_score: the points recorded on the score sheet for the turn, before any rules of the
+#               score sheet are applied
+TurnReplay = collections.namedtuple('TurnReplay', 'seat turn_number rolls outcome turn_score')
+
+# A match read back from a log:
+#   players: a tuple of the players' names, in seat order
+#   turns: a list of TurnReplay values
+#   winner: the seat of the winner
+MatchReplay = collections.namedtuple('MatchReplay', 'players turns winner')
+
+
+class ReplayRecorder:
+    """
+    Append the events of one or more matches to a replay log
+    """
+
+    def __init__(self, path, buffer_size=1 << 16):
+        """
+        Open a replay log for appending, creating it if necessary
+        Args:
+            path: the path of the log
+            buffer_size: the number of bytes buffered before they are written to the file
+        """
+        self._file = open(path, 'ab', buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+        self._pack = _RECORD.pack
+        self._write = self._file.write
+
+    def begin_match(self, player_names):
+        """Record the start of a match between players with the given names, in seat order"""
+        player_names = tuple(player_names)
+        self._write(self._pack(MATCH, len(player_names), 0, 0))
+        for player_name in player_names:
+            encoded = player_name.encode('utf-8')
+            assert len(encoded) < 256, 'Player names are limited to 255 bytes'
+            self._write(self._pack(NAME, 0, len(encoded), 0))
+            self._write(encoded)
+
+    def begin_turn(self, seat, turn_number):
+        """Record the start of a turn"""
+        self._write(self._pack(TURN, seat, 0, turn_number))
+
+    def roll(self, dice_count, packed_roll):
+        """Record a roll of dice_count dice as a packed roll"""
+        self._write(self._pack(ROLL, dice_count, 0, packed_roll))
+
+    def score(self, scorings_index, points):
+        """Record the scoring taken from the last roll"""
+        self._write(self._pack(SCORE, scorings_index, 0, points))
+
+    def end_turn(self, seat, outcome, turn_score):
+        """Record the end of a turn; outcome is BANKED, FARKLED or ELIMINATED"""
+        self._write(self._pack(END, seat, outcome, turn_score))
+
+    def end_match(self, winner_seat, turns):
+        """Record the end of a match"""
+        self._write(self._pack(RESULT, winner_seat, 0, turns))
+
+    def flush(self):
+        """Write any buffered events to the file"""
+        self._file.flush()
+
+    def close(self):
+        """Write any buffered events and close the log"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayDice:
+    """
+    A dice source (see farkle.py) that rolls the dice recorded for a match, in order
+    """
+
+    def __init__(self, match_replay):
+        """
+        Initialize a source
+        Args:
+            match_replay: a MatchReplay from read_matches()
+        """
+        self._rolls = iter([packed for turn in match_replay.turns for packed, _, _ in turn.rolls])
+
+    def roll_packed(self, k):
+        """
+        Roll k dice
+        Returns:
+            the next recorded packed roll
+        Raises:
+            ValueError if the recorded roll is not of k dice, or no rolls remain, which means
+            that play has departed from the recording
+        """
+        packed = next(self._rolls, None)
+        if packed is None or farkle.packed_count(packed) != k:
+            raise ValueError(f'The match departed from the recording at a roll of {k} dice')
+        return packed
+
+    def roll(self, k):
+        """Roll k dice as for roll_packed() and return a tuple of their values, in sorted order"""
+        return farkle.unpack_dice(self.roll_packed(k))
+
+
+def read_events(path):
+    """
+    Stream the events of a replay log
+    Args:
+        path: the path of the log
+
+    Returns:
+        an iterator over Event values, in the order they were recorded. The value of a NAME
+        event is the player's name.
+    """
+    with open(path, 'rb') as log:
+        magic, version = _HEADER.unpack(log.read(_HEADER.size))
+        assert magic == _MAGIC, f'{path} is not a replay log'
+        assert version == _VERSION, f'{path} is replay log version {version}, not {_VERSION}'
+
+        unpack_from = _RECORD.unpack_from
+        record_size = _RECORD.size
+        buffer = b''
+        offset = 0
+        at_end = False
+        while True:
+            # Refill once half a block is left; a record and any name fit in half a block
+            if not at_end and len(buffer) - offset < READ_BLOCK // 2:
+                block = log.read(READ_BLOCK)
+                at_end = not block
+                buffer = buffer[offset:] + block
+                offset = 0
+            if offset == len(buffer):
+                return
+            if len(buffer) - offset < record_size:
+                raise ValueError(f'{path} ends part of the way through a record')
+            kind, a, b, value = unpack_from(buffer, offset)
+            offset += record_size
+            if kind == NAME:
+                value = buffer[offset:offset + b].decode('utf-8')
+                offset += b
+            yield Event(kind, a, b, value)
+
+
+def read_matches(path):
+    """
+    Stream the matches of a replay log
+    Args:
+        path: the path of the log
+
+    Returns:
+        an iterator over a MatchReplay for each complete match in the log. A match the
+        recorder did not finish is left out.
+    """
+    players = turns = rolls = None
+    seat = turn_number = None
+    for kind, a, b, value in read_events(path):
+        if kind == ROLL:
+            rolls.append((value, None, None))
+        elif kind == SCORE:
+            rolls[-1] = (rolls[-1][0], a, value)
+        elif kind == TURN:
+            seat, turn_number, rolls = a, value, []
+        elif kind == END:
+            turns.append(TurnReplay(seat, turn_number, rolls, b, value))
+        elif kind == MATCH:
+            players, turns = [], []
+        elif kind == NAME:
+            players.append(value)
+        elif kind == RESULT:
+            yield MatchReplay(tuple(players), turns, a)
+
+
+if __name__ == '__main__':
+    import os
+    import random
+    import tempfile
+
+    import automated
+    import farklematch
+    import scoresheet2
+    import simpleauto
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'matches.fkr')
+        results = []
+        for seed in range(20):
+            random.seed(seed)
+            with ReplayRecorder(log_path) as recorder:
+                match = farklematch.FarkleMatch([automated.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')],
+                                                silent=True, recorder=recorder)
+                match.start_play()
+            results.append(match.result())
+
+        print(f'{len(results)} matches in {os.path.getsize(log_path)} bytes')
+        replays = list(read_matches(log_path))
+        assert len(replays) == len(results)
+        for replay, result in zip(replays, results):
+            # Replaying the turn scores onto a fresh score sheet gives the same final scores
+            sheet = scoresheet2.ScoreSheet(replay.players)
+            for turn in replay.turns:
+                if turn.outcome != ELIMINATED:
+                    sheet.add_score(replay.players[turn.seat], turn.turn_score)
+                if turn.outcome == BANKED:
+                    assert sum(points for _, _, points in turn.rolls) == turn.turn_score
+                elif turn.outcome == FARKLED:
+                    assert turn.turn_score == 0 and turn.rolls[-1][1] is None
+                assert all(farkle.packed_count(packed) in range(1, 7) for packed, _, _ in turn.rolls)
+            assert {name: sheet.score_for(name) for name in replay.players} == result.scores
+            assert replay.players[replay.winner] == result.winner
+            assert len(replay.turns) == result.turns
+
+        # Re-running every match from its recorded dice records exactly the same log
+        replay_path = os.path.join(directory, 'replayed.fkr')
+        for replay in replays:
+            with ReplayRecorder(replay_path) as recorder:
+                match = farklematch.FarkleMatch([automated.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')],
+                                                silent=True, recorder=recorder, dice=ReplayDice(replay))
+                match.start_play()
+        with open(log_path, 'rb') as original, open(replay_path, 'rb') as replayed:
+            assert original.read() == replayed.read()
+        print(f'{len(replays)} matches replayed exactly')
+    print('DONE')
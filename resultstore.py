@@ -0,0 +1,373 @@
+"""
+Store the results of many matches column by column, and answer grouped queries about them.
+
+A results file holds three tables:
+    matches  one row per match: match, seed, players, winner (a seat), turns
+    seats    one row per player per match: match, seat, player, farkles, score, won
+    turns    one row per turn: match, seat, player, turn, rolls, outcome, turn_score
+Player names are stored once each and referred to by number. The outcome of a turn is
+replaylog.BANKED, replaylog.FARKLED or replaylog.ELIMINATED.
+
+ResultsWriter buffers rows and writes each table in chunks of up to chunk_rows rows, each
+chunk holding one packed array per column. ResultsStore reads back only the columns a
+query needs, as NumPy arrays, so millions of matches are analysed without creating a
+Python object per match. Reading requires NumPy.
+
+    with ResultsWriter('results.fkc') as writer:
+        writer.add_match(seed, player_names, result, turns)
+    store = ResultsStore('results.fkc')
+    store.win_rates(('player', 'seat'))
+    store.quantiles('seats', 'score', (0.25, 0.5, 0.75))
+"""
+
+import array
+import collections
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:     # Only ResultsStore needs NumPy
+    numpy = None
+
+_HEADER = struct.Struct('<4sI')
+_MAGIC = b'FKRS'
+_VERSION = 2         # Version 2 widened the rolls column of the turns table to 16 bits
+
+_CHUNK = struct.Struct('<BI')      # table number, number of rows
+_NAME_LENGTH = struct.Struct('<H')
+
+NAMES = 0           # The table number of a chunk of player names
+
+# The columns of each table, as (name, array typecode, NumPy dtype)
+TABLES = {'matches': (('match', 'I', '<u4'), ('seed', 'Q', '<u8'), ('players', 'B', 'u1'),
+                      ('winner', 'B', 'u1'), ('turns', 'H', '<u2')),
+          'seats': (('match', 'I', '<u4'), ('seat', 'B', 'u1'), ('player', 'H', '<u2'),
+                    ('farkles', 'H', '<u2'), ('score', 'i', '<i4'), ('won', 'B', 'u1')),
+          'turns': (('match', 'I', '<u4'), ('seat', 'B', 'u1'), ('player', 'H', '<u2'),
+                    ('turn', 'H', '<u2'), ('rolls', 'H', '<u2'), ('outcome', 'B', 'u1'),
+                    ('turn_score', 'i', '<i4'))}
+_TABLE_NUMBERS = {'matches': 1, 'seats': 2, 'turns': 3}
+
+# One turn, as collected by TurnCollector:
+#   seat: the index of the player taking the turn
+#   turn: the turn number, starting from 1
+#   rolls: the number of rolls made
+#   outcome: replaylog.BANKED, replaylog.FARKLED or replaylog.ELIMINATED
+#   turn_score: the points scored in the turn, before the score sheet applies the 500-point
+#               first score and the penalty for three Farkles in a row
+TurnRecord = collections.namedtuple('TurnRecord', 'seat turn rolls outcome turn_score')
+
+
+class TurnCollector:
+    """
+    Collect a TurnRecord for each turn of a match. Give one to a FarkleMatch as its recorder.
+    """
+
+    def __init__(self):
+        """Initialize a collector with no turns"""
+        self.turns = []
+        self._turn = None
+        self._rolls = 0
+
+    def begin_match(self, player_names):
+        """Start collecting the turns of a new match"""
+        self.turns = []
+
+    def begin_turn(self, seat, turn_number):
+        """Start a turn"""
+        self._turn, self._rolls = turn_number, 0
+
+    def roll(self, dice_count, packed_roll):
+        """Count a roll"""
+        self._rolls += 1
+
+    def score(self, scorings_index, points):
+        """Ignore a scoring; only the turn score is kept"""
+        pass
+
+    def end_turn(self, seat, outcome, turn_score):
+        """Keep the record of the turn"""
+        self.turns.append(TurnRecord(seat, self._turn, self._rolls, outcome, turn_score))
+
+    def end_match(self, winner_seat, turns):
+        """Do nothing; the match result is kept by the match"""
+        pass
+
+
+class ResultsWriter:
+    """
+    Write the results of matches to a new results file
+    """
+
+    def __init__(self, path, chunk_rows=65536):
+        """
+        Create a results file, replacing any file already at the path
+        Args:
+            path: the path of the file
+            chunk_rows: the number of rows of a table buffered before they are written
+        """
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+        self._chunk_rows = chunk_rows
+        self._columns = {table: tuple(array.array(typecode) for _, typecode, _ in columns)
+                         for table, columns in TABLES.items()}
+        self._player_numbers = {}
+        self._new_names = []
+        self._match_count = 0
+
+    def _player_number(self, player_name):
+        """Get the number that stands for a player's name, assigning one if necessary"""
+        number = self._player_numbers.get(player_name)
+        if number is None:
+            number = self._player_numbers[player_name] = len(self._player_numbers)
+            self._new_names.append(player_name)
+        return number
+
+    def add_match(self, seed, player_names, result, turns=()):
+        """
+        Add the results of a match
+        Args:
+            seed: the match's seed, an int between 0 and 2 ** 64 - 1
+            player_names: the players' names in seat order
+            result: the farklematch.MatchResult of the match
+            turns: a sequence of TurnRecord values, possibly empty
+        """
+        match = self._match_count
+        self._match_count += 1
+        player_names = tuple(player_names)
+        players = [self._player_number(player_name) for player_name in player_names]
+        winner = player_names.index(result.winner)
+
+        for column, value in zip(self._columns['matches'],
+                                 (match, seed, len(player_names), winner, result.turns)):
+            column.append(value)
+
+        match_column, seat_column, player_column, farkles_column, score_column, won_column = self._columns['seats']
+        for seat, player_name in enumerate(player_names):
+            match_column.append(match)
+            seat_column.append(seat)
+            player_column.append(players[seat])
+            farkles_column.append(result.farkle_tallies[player_name])
+            score_column.append(result.scores[player_name])
+            won_column.append(seat == winner)
+
+        match_column, seat_column, player_column, turn_column, rolls_column, outcome_column, turn_score_column = \
+            self._columns['turns']
+        for seat, turn, rolls, outcome, turn_score in turns:
+            match_column.append(match)
+            seat_column.append(seat)
+            player_column.append(players[seat])
+            turn_column.append(turn)
+            rolls_column.append(rolls)
+            outcome_column.append(outcome)
+            turn_score_column.append(turn_score)
+
+        if any(len(columns[0]) >= self._chunk_rows for columns in self._columns.values()):
+            self.flush()
+
+    def flush(self):
+        """Write every buffered row"""
+        write = self._file.write
+        if self._new_names:
+            write(_CHUNK.pack(NAMES, len(self._new_names)))
+            for player_name in self._new_names:
+                encoded = player_name.encode('utf-8')
+                write(_NAME_LENGTH.pack(len(encoded)))
+                write(encoded)
+            self._new_names = []
+
+        for table, columns in self._columns.items():
+            if len(columns[0]) == 0:
+                continue
+            write(_CHUNK.pack(_TABLE_NUMBERS[table], len(columns[0])))
+            for column in columns:
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                write(column.tobytes())
+                del column[:]
+        self._file.flush()
+
+    def close(self):
+        """Write every buffered row and close the file"""
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ResultsStore:
+    """
+    Read a results file and answer queries about it. Requires NumPy.
+    """
+
+    def __init__(self, path):
+        """
+        Open a results file, reading only the player names and the position of each chunk
+        Args:
+            path: the path of a file written by a ResultsWriter
+        """
+        if numpy is None:
+            raise ImportError('ResultsStore requires NumPy')
+        self.path = path
+        self.player_names = []
+        self._chunks = {table: [] for table in TABLES}      # table -> list of (offset, rows)
+        table_names = {number: table for table, number in _TABLE_NUMBERS.items()}
+        row_sizes = {table: sum(numpy.dtype(dtype).itemsize for _, _, dtype in columns)
+                     for table, columns in TABLES.items()}
+        with open(path, 'rb') as results:
+            magic, version = _HEADER.unpack(results.read(_HEADER.size))
+            assert magic == _MAGIC, f'{path} is not a results file'
+            assert version == _VERSION, f'{path} is results file version {version}, not {_VERSION}'
+            while True:
+                header = results.read(_CHUNK.size)
+                if not header:
+                    break
+                table_number, rows = _CHUNK.unpack(header)
+                if table_number == NAMES:
+                    for _ in range(rows):
+                        length, = _NAME_LENGTH.unpack(results.read(_NAME_LENGTH.size))
+                        self.player_names.append(results.read(length).decode('utf-8'))
+                else:
+                    table = table_names[table_number]
+                    self._chunks[table].append((results.tell(), rows))
+                    results.seek(rows * row_sizes[table], 1)
+
+    def rows(self, table):
+        """Get the number of rows in a table"""
+        return sum(rows for _, rows in self._chunks[table])
+
+    def column(self, table, name):
+        """
+        Read one column of a table
+        Args:
+            table: 'matches', 'seats' or 'turns'
+            name: the name of one of the table's columns
+
+        Returns:
+            a NumPy array holding the column
+        """
+        columns = TABLES[table]
+        names = [column_name for column_name, _, _ in columns]
+        index = names.index(name)
+        dtype = numpy.dtype(columns[index][2])
+        parts = []
+        with open(self.path, 'rb') as results:
+            for offset, rows in self._chunks[table]:
+                skip = sum(numpy.dtype(column_dtype).itemsize for _, _, column_dtype in columns[:index])
+                results.seek(offset + skip * rows)
+                parts.append(numpy.frombuffer(results.read(rows * dtype.itemsize), dtype))
+        if not parts:
+            return numpy.zeros(0, dtype)
+        return numpy.concatenate(parts)
+
+    def _groups(self, table, group_by):
+        """
+        Group the rows of a table
+        Returns:
+            a 2-tuple (keys, inverse): keys is a list of the distinct group keys and inverse
+            gives the index in keys of each row's group
+        """
+        key_columns = numpy.stack([self.column(table, name).astype(numpy.int64) for name in group_by], axis=1)
+        unique_keys, inverse = numpy.unique(key_columns, axis=0, return_inverse=True)
+        keys = []
+        for unique_key in unique_keys.tolist():
+            key = tuple(self.player_names[value] if name == 'player' else value
+                        for name, value in zip(group_by, unique_key))
+            keys.append(key if len(group_by) > 1 else key[0])
+        return keys, inverse.reshape(-1)
+
+    def win_rates(self, group_by=('player',)):
+        """
+        Compute win rates by group
+        Args:
+            group_by: the names of one or more columns of the seats table, such as 'player'
+                      and 'seat'
+
+        Returns:
+            a dictionary from group key to a 3-tuple (matches, wins, win rate). A key is a
+            player name or value when grouping by one column, and a tuple otherwise.
+        """
+        keys, inverse = self._groups('seats', group_by)
+        matches = numpy.bincount(inverse, minlength=len(keys))
+        wins = numpy.bincount(inverse, weights=self.column('seats', 'won'), minlength=len(keys))
+        return {key: (int(matches[i]), int(wins[i]), wins[i] / matches[i]) for i, key in enumerate(keys)}
+
+    def quantiles(self, table, name, q=(0.25, 0.5, 0.75), group_by=('player',)):
+        """
+        Compute quantiles of a column by group
+        Args:
+            table: 'seats' or 'turns'
+            name: the column, such as 'score' or 'turn_score'
+            q: a sequence of fractions between 0 and 1
+            group_by: the names of one or more columns of the same table
+
+        Returns:
+            a dictionary from group key, as for win_rates(), to a tuple of the quantiles
+        """
+        keys, inverse = self._groups(table, group_by)
+        order = numpy.argsort(inverse, kind='stable')
+        values = self.column(table, name)[order]
+        boundaries = numpy.cumsum(numpy.bincount(inverse, minlength=len(keys)))[:-1]
+        return {key: tuple(numpy.quantile(group, q).tolist())
+                for key, group in zip(keys, numpy.split(values, boundaries))}
+
+    def score_quantiles(self, q=(0.25, 0.5, 0.75), group_by=('player',)):
+        """Compute quantiles of final scores by group, as for quantiles()"""
+        return self.quantiles('seats', 'score', q, group_by)
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+
+    import farklematch
+    import replaylog
+    import scoresheet2
+    import tournament
+    import trial
+
+    with tempfile.TemporaryDirectory() as directory:
+        results_path = os.path.join(directory, 'results.fkc')
+        standings = tournament.run_tournament(trial.PLAYERS, 1, games_per_pairing=1, repeats=2,
+                                              workers=1, results_path=results_path)
+        store = ResultsStore(results_path)
+        print(f'{store.rows("matches")} matches and {store.rows("turns")} turns in '
+              f'{os.path.getsize(results_path)} bytes')
+        assert store.rows('matches') == standings.matches
+        # The stored scores are the MatchResult scores
+        seat_scores = store.column('seats', 'score')
+        seat_players = store.column('seats', 'player')
+        for number, player_name in enumerate(store.player_names):
+            assert sorted(seat_scores[seat_players == number]) == sorted(standings.scores[player_name])
+
+        # and the stored turns, entered on a score sheet, add up to them
+        players_per_match = store.column('matches', 'players')
+        score_sheets = [scoresheet2.ScoreSheet(range(players)) for players in players_per_match]
+        for match, seat, outcome, turn_score in zip(store.column('turns', 'match'), store.column('turns', 'seat'),
+                                                    store.column('turns', 'outcome'),
+                                                    store.column('turns', 'turn_score')):
+            if outcome != replaylog.ELIMINATED:
+                score_sheets[match].add_score(int(seat), int(turn_score))
+        totals = [score_sheets[match].score_for(int(seat))
+                  for match, seat in zip(store.column('seats', 'match'), store.column('seats', 'seat'))]
+        assert totals == seat_scores.tolist()
+        for player_name, (matches, wins, win_rate) in store.win_rates().items():
+            assert wins == standings.wins[player_name]
+            median = store.score_quantiles((0.5,))[player_name][0]
+            assert median == numpy.median(standings.scores[player_name])
+            print(f'{player_name:>10}: {wins}/{matches} = {win_rate:.0%}, median score {median:.0f}')
+        for (player_name, seat), (matches, wins, win_rate) in store.win_rates(('player', 'seat')).items():
+            print(f'{player_name:>10} in seat {seat}: {win_rate:.0%}')
+
+        # A turn of more than 255 rolls is stored intact
+        long_path = os.path.join(directory, 'long.fkc')
+        with ResultsWriter(long_path) as writer:
+            result = farklematch.MatchResult('Ann', 1, {'Ann': 0, 'Bob': 0}, {'Ann': 500, 'Bob': 0}, {'Ann': 0, 'Bob': 0})
+            writer.add_match(1, ('Ann', 'Bob'), result, [TurnRecord(0, 1, 300, 0, 500)])
+        assert ResultsStore(long_path).column('turns', 'rolls')[0] == 300
+    print('DONE')
@@ -2,6 +2,10 @@
 Handle Farkle score keeping.
 """
 
+# Updates 2026-10-18
+#    - Keep running totals, the high score and the winner up to date in add_score() so that
+#      score_for(), high_score() and winner() no longer rescan the score sheet.
+
 # Updates 2021-12-06
 #    - Fixed a bug in which a second score below 500 was added at the top of the score sheet
 #      when it should not have been added.
@@ -26,6 +30,11 @@ class ScoreSheet:
         # initially an empty list
         self._score_sheet = {player_name: [] for player_name in player_names}
 
+        # Running totals, kept up to date by add_score()
+        self._totals = {player_name: 0 for player_name in self._score_sheet}
+        self._high_score = 0
+        self._winner = None
+
     def add_score(self, player_name, score):
         """
         Add a score for the player whose name is given
@@ -47,16 +56,36 @@ class ScoreSheet:
                 # Scores as 0 unless two Farkles (0s) precede it
                 if self.farkle_danger_level(player_name) == 2:
                     # Triple Farkle!!!
-                    scores.append(-1000)
-                else:
-                    scores.append(0)
-            else:
-                scores.append(score)
-        elif score >= 500:
-            # this is an acceptable first score
-            scores.append(score)
-        else:
-            scores.append(None)     # No score
+                    score = -1000
+        elif score < 500:
+            score = None            # No score
+        # otherwise this is an acceptable first score
+        scores.append(score)
+
+        if score:
+            self._update_totals(player_name, score)
+
+    def _update_totals(self, player_name, score):
+        """
+        Bring the running totals up to date after a non-zero score is recorded
+        Args:
+            player_name: a player's name
+            score: the non-zero score just recorded for the player
+        """
+        old_total = self._totals[player_name]
+        total = old_total + score
+        self._totals[player_name] = total
+
+        if total > self._high_score:
+            self._high_score = total
+        elif old_total == self._high_score and score < 0:
+            # The leader lost points, so another player may now hold the high score
+            self._high_score = max(self._totals.values())
+
+        if (old_total >= 10000) != (total >= 10000):
+            # The winner is the first player, in score sheet order, with at least 10,000 points
+            self._winner = next((name for name, player_total in self._totals.items() if player_total >= 10000),
+                                None)
 
     def score_for(self, player_name):
         """
@@ -66,7 +95,7 @@ class ScoreSheet:
         Returns:
             the current score for the given player
         """
-        return sum(item for item in self._score_sheet[player_name] if item is not None)
+        return self._totals[player_name]
 
     def farkle_danger_level(self, player_name):
         """
@@ -95,11 +124,7 @@ class ScoreSheet:
              The name of a player whose score is at least 10,000 and None if
              no player has a score of at least 10,000.
         """
-        for player_name in self._score_sheet:
-            if self.score_for(player_name) >= 10000:
-                return player_name
-
-        return None
+        return self._winner
 
     def high_score(self):
         """
@@ -108,7 +133,7 @@ class ScoreSheet:
          Returns:
              The highest score on this score sheet
          """
-        return max(self.score_for(player_name) for player_name in self._score_sheet)
+        return self._high_score
 
     def __str__(self):
         """
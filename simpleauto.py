@@ -3,6 +3,7 @@ The class simpleauto.FarklePlayer always rolls once and uses the highest scoring
 """
 
 import consoleui
+import farkleodds
 
 __AUTHOR__ = 'DAVID SYKES'
 
@@ -10,7 +11,7 @@ __AUTHOR__ = 'DAVID SYKES'
 class FarklePlayer:
     """ A Farkle player who rolls only once each turn"""
 
-    FARKLE_ODDS = (None, 2 / 3, 1 / 2.3, 1 / 3.6, 1 / 6.4, 1 / 13, 1 / 43.2)
+    FARKLE_ODDS = farkleodds.FARKLE_ODDS      # The exact probability of a Farkle for each number of dice
 
     def __init__(self, name):
         """Initialize a player with a given name"""
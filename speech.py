@@ -0,0 +1,175 @@
+"""
+Speak messages in the background so that a match never waits for text-to-speech.
+
+A SpeechWorker owns a thread and a bounded queue of (message, voice) pairs. Calling
+speak() only enqueues the message. By default every message is spoken: when the queue is
+full, speak() waits for room, so the match only ever runs max_pending messages ahead of the
+speech. Speech can instead be kept up to date with the match, at the cost of messages:
+with drop_stale=True the oldest waiting message is dropped to make room, and with
+coalesce=True a message identical to the one just queued is ignored.
+
+The backend does the speaking:
+    SayBackend       runs the macOS say command, without a shell
+    NullBackend      discards every message
+    RecordingBackend keeps every message in a list, for testing on any platform
+"""
+
+import queue
+import subprocess
+import threading
+
+
+class SayBackend:
+    """Speak with the macOS say command"""
+
+    def speak(self, message, voice):
+        """Speak the message in the given voice, returning when it has been spoken"""
+        subprocess.run(['say', '-v', voice, message], check=False)
+
+
+class NullBackend:
+    """Discard every message"""
+
+    def speak(self, message, voice):
+        """Do nothing"""
+        pass
+
+
+class RecordingBackend:
+    """Record every message instead of speaking it"""
+
+    def __init__(self):
+        """Initialize a backend with no messages recorded"""
+        self.spoken = []
+
+    def speak(self, message, voice):
+        """Record the (message, voice) pair"""
+        self.spoken.append((message, voice))
+
+
+_STOP = object()        # Placed in the queue to stop the worker thread
+
+
+class SpeechWorker:
+    """
+    Speak messages on a background thread
+    """
+
+    def __init__(self, backend=None, max_pending=8, drop_stale=False, coalesce=False):
+        """
+        Start a worker
+        Args:
+            backend: the backend that speaks each message; None uses a SayBackend
+            max_pending: the largest number of messages waiting to be spoken
+            drop_stale: True to drop the oldest waiting message when the queue is full,
+                        instead of waiting for room
+            coalesce: True to ignore a message identical to the last one queued
+        """
+        self.backend = SayBackend() if backend is None else backend
+        self.dropped = 0            # The number of messages dropped or coalesced
+        self._drop_stale = drop_stale
+        self._coalesce = coalesce
+        self._last_queued = None
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name='speech', daemon=True)
+        self._thread.start()
+
+    def speak(self, message, voice):
+        """
+        Queue a message to be spoken, waiting for room in the queue unless dropping stale messages
+        Args:
+            message: the text to speak
+            voice: the name of the voice to use
+        """
+        item = (message, voice)
+        if self._coalesce and item == self._last_queued:
+            self.dropped += 1
+            return
+        self._last_queued = item
+        if not self._drop_stale:
+            self._queue.put(item)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                # Make room by dropping the stalest message
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def wait(self):
+        """Wait until every queued message has been spoken"""
+        self._queue.join()
+
+    def close(self):
+        """Speak the messages still queued and then stop the worker thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        """Speak queued messages until told to stop"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self.backend.speak(*item)
+            except Exception:
+                pass        # A failed announcement must never stop the match
+            finally:
+                self._queue.task_done()
+
+
+if __name__ == '__main__':
+    import contextlib
+    import io
+
+    import farklematch
+    import simpleauto
+
+    # Every message of a match is spoken, in order, however slow the speech
+    class SlowBackend(RecordingBackend):
+        def speak(self, message, voice):
+            threading.Event().wait(0.0005)
+            super().speak(message, voice)
+
+    backend = SlowBackend()
+    worker = SpeechWorker(backend)
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        farklematch.FarkleMatch([simpleauto.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')],
+                                speech_worker=worker).start_play()
+    worker.close()
+    assert worker.dropped == 0
+    spoken = [message for message, voice in backend.spoken]
+    assert len(spoken) > 100 and spoken[0] == 'Play beginning!' and spoken[-1] == 'GAME OVER'
+    assert all(message in printed.getvalue() for message in spoken)
+
+    # Dropping stale messages keeps the queue short
+    blocked = threading.Event()
+
+    class BlockedBackend(RecordingBackend):
+        def speak(self, message, voice):
+            blocked.wait()
+            super().speak(message, voice)
+
+    backend = BlockedBackend()
+    worker = SpeechWorker(backend, max_pending=2, drop_stale=True, coalesce=True)
+    for i in range(10):
+        worker.speak(str(i), 'Alex')
+        worker.speak(str(i), 'Alex')
+    blocked.set()
+    worker.close()
+    assert worker.dropped >= 10 and len(backend.spoken) <= 3 and backend.spoken[-1] == ('9', 'Alex')
+
+    # A match that owns its worker closes it, even when silent
+    match = farklematch.FarkleMatch([simpleauto.FarklePlayer('Ben'), simpleauto.FarklePlayer('Jessica')],
+                                    say=True, silent=True)
+    match.start_play()
+    assert not any(thread.name == 'speech' for thread in threading.enumerate())
+    print('DONE')
@@ -0,0 +1,166 @@
+"""
+Search for the best ideal scores for automated.FarklePlayer.
+
+Each candidate is a tuple of ideal scores (see automated.FarklePlayer.IDEAL_SCORES). A
+candidate is evaluated by playing silent matches against an opponent, from both seats,
+across a pool of worker processes. Every candidate plays on the same seeds and each pair of
+seat-swapped matches rolls the same dice per turn (farkle.TurnSeededDice), so differences in
+win rate come from the ideal scores rather than from luck.
+
+Candidates come from grid() or random_candidates(). sweep() then either evaluates every
+candidate on the same number of matches or runs successive halving: each round evaluates
+the surviving candidates on more matches and keeps the best fraction of them.
+
+    python thresholdsweep.py [seed]     # successive halving over a grid, then report the best
+"""
+
+import collections
+import functools
+import itertools
+import multiprocessing
+import random
+import sys
+
+import farkle
+import tournament
+
+# The result of evaluating a candidate:
+#   ideal_scores: the candidate's ideal scores
+#   matches: the number of matches played
+#   wins: the number of those matches won by the candidate
+#   win_rate: wins / matches
+Candidate = collections.namedtuple('Candidate', 'ideal_scores matches wins win_rate')
+
+DEFAULT_OPPONENT = tournament.PlayerSpec('automated', 'Opponent')
+
+
+def grid(start_scores, catch_up_scores, comfortable_scores):
+    """
+    Build every combination of ideal scores
+    Args:
+        start_scores: the ideal scores to try when getting on the board
+        catch_up_scores: the ideal scores to try when catching up with the leader
+        comfortable_scores: the ideal scores to try otherwise
+
+    Returns:
+        a list of 5-tuples of ideal scores
+    """
+    return [(0, 0, start, catch_up, comfortable)
+            for start, catch_up, comfortable in itertools.product(start_scores, catch_up_scores, comfortable_scores)]
+
+
+def random_candidates(count, seed, low=100, high=2000, step=50):
+    """
+    Draw candidates at random
+    Args:
+        count: the number of candidates
+        seed: a seed for the draw
+        low, high: the smallest and largest ideal score. The first ideal score is at least 500,
+                   since less than 500 points never gets on the board.
+        step: every ideal score is a multiple of this
+
+    Returns:
+        a list of count distinct 5-tuples of ideal scores, or fewer if there are not that many
+    """
+    rng = random.Random(seed)
+    values = range(low, high + 1, step)
+    start_values = [value for value in values if value >= 500]
+    assert start_values, 'high must be at least 500'
+    candidates = set()
+    for _ in range(count * 10):
+        if len(candidates) == count:
+            break
+        candidates.add((0, 0, rng.choice(start_values), rng.choice(values), rng.choice(values)))
+    return sorted(candidates)
+
+
+def _jobs(ideal_scores, opponent, seeds):
+    """Build the (seed, specs) jobs for a candidate: two seat orders per seed"""
+    candidate = tournament.PlayerSpec('automated', 'Candidate', (('ideal_scores', ideal_scores),))
+    return [(seed, specs) for seed in seeds for specs in ((candidate, opponent), (opponent, candidate))]
+
+
+def _evaluate(pool, candidates, opponent, seeds, chunksize):
+    """Play every candidate on the given seeds and return a dictionary of wins per candidate"""
+    jobs = [job for ideal_scores in candidates for job in _jobs(ideal_scores, opponent, seeds)]
+    play = functools.partial(tournament.play_match, dice_source=farkle.TurnSeededDice)
+    results = pool.imap(play, jobs, chunksize) if pool is not None else map(play, jobs)
+    matches_per_candidate = 2 * len(seeds)
+    wins = {}
+    for number, result in enumerate(results):
+        ideal_scores = candidates[number // matches_per_candidate]
+        wins[ideal_scores] = wins.get(ideal_scores, 0) + (result.winner == 'Candidate')
+    return wins
+
+
+def sweep(candidates, master_seed, matches=200, opponent=DEFAULT_OPPONENT, halving=True, keep=0.5,
+          workers=None, chunksize=16, progress=None):
+    """
+    Evaluate candidates against an opponent
+    Args:
+        candidates: a sequence of distinct 5-tuples of ideal scores
+        master_seed: the seed from which each match's seed is derived
+        matches: the number of matches each candidate plays, in the first round when halving;
+                 an even number
+        opponent: a tournament.PlayerSpec for the opponent, not named 'Candidate'
+        halving: True for successive halving; False to play every candidate once
+        keep: the fraction of candidates kept after each round of successive halving
+        workers: the number of worker processes; None uses one per CPU and 1 plays every
+                 match in this process
+        chunksize: the number of matches handed to a worker at a time
+        progress: a function called with the list of Candidate values after each round, or None
+
+    Returns:
+        a list of Candidate values, best first. With halving, candidates dropped in an early
+        round follow those that survived, each ordered by win rate.
+    """
+    assert opponent.name != 'Candidate', 'The opponent needs another name'
+    assert matches >= 2 and matches % 2 == 0, 'matches must be an even number, at least 2'
+    candidates = [tuple(ideal_scores) for ideal_scores in candidates]
+    seed_source = random.Random(master_seed)
+    played = {ideal_scores: 0 for ideal_scores in candidates}
+    won = {ideal_scores: 0 for ideal_scores in candidates}
+    dropped = []
+    pool = multiprocessing.Pool(workers) if workers != 1 else None
+    try:
+        survivors = candidates
+        round_matches = matches
+        while True:
+            seeds = [seed_source.getrandbits(64) for _ in range(round_matches // 2)]
+            for ideal_scores, wins in _evaluate(pool, survivors, opponent, seeds, chunksize).items():
+                played[ideal_scores] += 2 * len(seeds)
+                won[ideal_scores] += wins
+            ranked = sorted((Candidate(ideal_scores, played[ideal_scores], won[ideal_scores],
+                                       won[ideal_scores] / played[ideal_scores]) for ideal_scores in survivors),
+                            key=lambda candidate: candidate.win_rate, reverse=True)
+            if progress is not None:
+                progress(ranked)
+            if not halving or len(ranked) == 1:
+                return ranked + dropped
+            kept = max(1, int(len(ranked) * keep))
+            dropped = ranked[kept:] + dropped
+            survivors = [candidate.ideal_scores for candidate in ranked[:kept]]
+            round_matches = int(round_matches / keep) // 2 * 2
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def main():
+    """Run successive halving over a grid of ideal scores and report the best"""
+    master_seed = int(sys.argv[1]) if len(sys.argv) > 1 else random.randrange(2 ** 32)
+    candidates = grid((500, 650), (700, 900, 1050, 1200), (250, 300, 400, 500))
+
+    def report(ranked):
+        best = ranked[0]
+        print(f'{len(ranked):>3} candidates on {best.matches} matches each: best {best.ideal_scores} '
+              f'wins {best.win_rate:.1%}', flush=True)
+
+    ranked = sweep(candidates, master_seed, progress=report)
+    print(f'Seed: {master_seed}')
+    print(f'Best ideal scores: {ranked[0].ideal_scores} '
+          f'({ranked[0].wins} wins in {ranked[0].matches} matches against automated.FarklePlayer)')
+
+
+if __name__ == '__main__':
+    main()
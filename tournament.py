@@ -0,0 +1,230 @@
+"""
+Play round-robin tournaments between Farkle players on a pool of worker processes.
+
+Every match is given its own seed, drawn in schedule order from a master seed, and rolls
+its dice from a dice source created with that seed. The results therefore depend only on the
+master seed and never on how many worker processes share the work, nor on anything else
+that uses the random module.
+
+Give run_tournament() a results path to keep every match and turn in a resultstore file, and
+use profile_matches() to find where the time goes, player by player.
+"""
+
+import collections
+import importlib
+import multiprocessing
+import random
+import statistics
+
+import farkle
+import farklematch
+import farklescoring
+import matchprofile
+import resultstore
+
+# A player taking part in a tournament: the name of the module that defines its FarklePlayer
+# class, the player's name and a tuple of (keyword, value) pairs passed to the class after the
+# name. Players are created inside the worker processes, so only these specifications travel
+# between processes.
+PlayerSpec = collections.namedtuple('PlayerSpec', 'module name options', defaults=((),))
+
+# The outcome of a tournament:
+#   matches: the number of matches played
+#   wins: a dictionary from player name to the number of matches that player won
+#   scores: a dictionary from player name to a list of that player's final scores, in schedule order
+#   winners: a list of the name of each match's winner, in schedule order
+Standings = collections.namedtuple('Standings', 'matches wins scores winners')
+
+_scorings_table = None      # Each worker process builds its own table once
+
+
+def round_robin(specs, games_per_pairing=3, repeats=3):
+    """
+    Build the schedule for a round robin in which every player meets every other player
+    in both seat orders
+    Args:
+        specs: a sequence of PlayerSpec values with unique names
+        games_per_pairing: the number of matches played in a row by each ordered pair
+        repeats: the number of times the whole round robin is played
+
+    Returns:
+        a list of player-spec tuples, one per match, in the order given by seat
+    """
+    schedule = []
+    for _ in range(repeats):
+        for first in specs:
+            for second in specs:
+                if first != second:
+                    schedule.extend([(first, second)] * games_per_pairing)
+    return schedule
+
+
+def match_seeds(master_seed, count):
+    """
+    Derive one seed per match from a master seed
+    Args:
+        master_seed: any value accepted by random.Random()
+        count: the number of seeds needed
+
+    Returns:
+        a list of count integer seeds
+    """
+    rng = random.Random(master_seed)
+    return [rng.getrandbits(64) for _ in range(count)]
+
+
+def play_match(job, dice_source=farkle.RandomDice, recorder=None, profiler=None, turn_budget=None):
+    """
+    Play one silent match
+    Args:
+        job: a 2-tuple (seed, specs), where specs is a tuple of PlayerSpec values in seat order
+        dice_source: a dice source class (see farkle.py) that is called with the seed
+        recorder: a recorder for the match, as for farklematch.FarkleMatch, or None
+        profiler: a matchprofile.MatchProfiler for the match, or None
+        turn_budget: a playerguard.TurnBudget limiting each turn, or None. Turns that overrun
+                     it are counted in the result's overruns.
+
+    Returns:
+        the farklematch.MatchResult for the match
+    """
+    global _scorings_table
+    if _scorings_table is None:
+        _scorings_table = farklescoring.build_scorings_table()
+
+    seed, specs = job
+    players = [importlib.import_module(spec.module).FarklePlayer(spec.name, **dict(spec.options)) for spec in specs]
+    match = farklematch.FarkleMatch(players, silent=True, scorings_table=_scorings_table, dice=dice_source(seed),
+                                    recorder=recorder, profiler=profiler, turn_budget=turn_budget)
+    match.start_play()
+    return match.result()
+
+
+def play_match_turns(job):
+    """
+    Play one silent match as for play_match() and collect its turns
+
+    Returns:
+        a 2-tuple (result, turns), where turns is a tuple of resultstore.TurnRecord values
+    """
+    collector = resultstore.TurnCollector()
+    result = play_match(job, recorder=collector)
+    return result, tuple(collector.turns)
+
+
+def play_match_profiled(job):
+    """
+    Play one silent match as for play_match() and profile it
+
+    Returns:
+        a 2-tuple (result, profiler), where profiler is a matchprofile.MatchProfiler
+    """
+    profiler = matchprofile.MatchProfiler()
+    return play_match(job, profiler=profiler), profiler
+
+
+def play_matches(schedule, master_seed, workers=None, chunksize=16, turns=False):
+    """
+    Play every match in a schedule, spreading the matches across worker processes
+    Args:
+        schedule: a sequence of player-spec tuples, as created by round_robin()
+        master_seed: the seed from which each match's seed is derived
+        workers: the number of worker processes; None uses one per CPU and 1 plays
+                 every match in this process
+        chunksize: the number of matches handed to a worker at a time
+        turns: True to collect the turns of each match, as for play_match_turns()
+
+    Returns:
+        an iterator over farklematch.MatchResult values in schedule order or, with turns,
+        over the (result, turns) pairs from play_match_turns()
+    """
+    yield from _play_jobs(_jobs(schedule, master_seed), workers, chunksize, turns)
+
+
+def _jobs(schedule, master_seed):
+    """Pair each match in a schedule with its seed, as the (seed, specs) jobs of play_match()"""
+    return list(zip(match_seeds(master_seed, len(schedule)), (tuple(specs) for specs in schedule)))
+
+
+def _play_jobs(jobs, workers=None, chunksize=16, turns=False):
+    """Play (seed, specs) jobs for play_matches(), yielding the results in job order"""
+    play = play_match_turns if turns else play_match
+    if workers == 1:
+        yield from map(play, jobs)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            yield from pool.imap(play, jobs, chunksize)
+
+
+def run_tournament(specs, master_seed, games_per_pairing=3, repeats=3, workers=None, results_path=None):
+    """
+    Play a round robin and tally the results
+    Args:
+        specs: a sequence of PlayerSpec values with unique names
+        master_seed: the seed from which each match's seed is derived
+        games_per_pairing: the number of matches played in a row by each ordered pair
+        repeats: the number of times the whole round robin is played
+        workers: the number of worker processes, as for play_matches()
+        results_path: the path of a resultstore file to which every match and turn is
+                      written, or None
+
+    Returns:
+        the Standings for the tournament
+    """
+    wins = {spec.name: 0 for spec in specs}
+    scores = {spec.name: [] for spec in specs}
+    winners = []
+    matches = 0
+    jobs = _jobs(round_robin(specs, games_per_pairing, repeats), master_seed)
+    writer = resultstore.ResultsWriter(results_path) if results_path is not None else None
+    try:
+        for outcome, (seed, match_specs) in zip(_play_jobs(jobs, workers, turns=writer is not None), jobs):
+            result, turns = outcome if writer is not None else (outcome, ())
+            matches += 1
+            wins[result.winner] += 1
+            winners.append(result.winner)
+            for player_name, score in result.scores.items():
+                scores[player_name].append(score)
+            if writer is not None:
+                writer.add_match(seed, (spec.name for spec in match_specs), result, turns)
+    finally:
+        if writer is not None:
+            writer.close()
+    return Standings(matches, wins, scores, winners)
+
+
+def profile_matches(schedule, master_seed, workers=None, chunksize=16):
+    """
+    Play every match in a schedule, as for play_matches(), and profile them
+    Returns:
+        a matchprofile.MatchProfiler holding the counts and timings of every match
+    """
+    jobs = _jobs(schedule, master_seed)
+    profiler = matchprofile.MatchProfiler()
+    if workers == 1:
+        for _, match_profiler in map(play_match_profiled, jobs):
+            profiler.merge(match_profiler)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for _, match_profiler in pool.imap_unordered(play_match_profiled, jobs, chunksize):
+                profiler.merge(match_profiler)
+    return profiler
+
+
+def score_summary(scores):
+    """
+    Summarize a distribution of final scores
+    Args:
+        scores: a non-empty list of final scores
+
+    Returns:
+        a dictionary holding the mean, the standard deviation, the minimum, the quartiles
+        and the maximum of the scores
+    """
+    quartiles = statistics.quantiles(scores, n=4) if len(scores) > 1 else [scores[0]] * 3
+    return {'mean': statistics.fmean(scores),
+            'stdev': statistics.pstdev(scores),
+            'min': min(scores),
+            'q1': quartiles[0],
+            'median': quartiles[1],
+            'q3': quartiles[2],
+            'max': max(scores)}
@@ -1,57 +1,58 @@
-"""
-This file allows multiple players to play against each other multiple times, while keeping track of the scores.
-"""
-
-__AUTHOR__ = 'BEN'
-
-import main
-import simpleauto
-import automated
-import number1
-import number2
-import number3
-
-ben_score = 0
-jessica_score = 0
-bg_score = 0
-stevie_score = 0
-maeve_score = 0
-
-for i in range(3):
-    ben = automated.FarklePlayer('Ben')
-    jessica = simpleauto.FarklePlayer('Jessica')
-    bg = number1.FarklePlayer('BG')
-    stevie = number2.FarklePlayer('Stevie')
-    maeve = number3.FarklePlayer('Maeve')
-
-    lst = [ben, jessica, bg, stevie, maeve]
-    lst_1 = [ben, jessica, bg, stevie, maeve]
-
-    for player in lst:
-        for strat in lst_1:
-            if strat != player:
-                winner = main.main(player, strat)
-                winner_0 = main.main(player, strat)
-                winner_1 = main.main(player, strat)
-                if winner == 'Ben' or winner_0 == 'Ben' or winner_1 == 'Ben':
-                    ben_score += 1
-                if winner == 'Jessica' or winner_0 == 'Jessica' or winner_1 == 'Jessica':
-                    jessica_score += 1
-                if winner == 'BG' or winner_0 == 'BG' or winner_1 == 'BG':
-                    bg_score += 1
-                if winner == 'Stevie' or winner_0 == 'Stevie' or winner_1 == 'Stevie':
-                    stevie_score += 1
-                if winner == 'Maeve' or winner_0 == 'Maeve' or winner_1 == 'Maeve':
-                    maeve_score += 1
-
-overall = [ben_score, jessica_score, bg_score, stevie_score, maeve_score]
-players = ["Ben", "Jessica", "BG", "Stevie", "Maeve"]
-overall_max = max(overall)
-overall_winner = players[overall.index(overall_max)]
-
-print(f'Congratulations {overall_winner} on being overall winner!')
-print(f'Overall score of Ben: {ben_score}')
-print(f'Overall score of Jessica: {jessica_score}')
-print(f'Overall score of BG: {bg_score}')
-print(f'Overall score of Stevie: {stevie_score}')
-print(f'Overall score of Maeve: {maeve_score}')
+"""
+This file allows multiple players to play against each other multiple times, while keeping track of the scores.
+
+The matches are spread across all CPUs. Give a seed on the command line to repeat an earlier run,
+and optionally a file name after it to keep every match and turn in a resultstore file:
+    python trial.py 42 results.fkc
+
+Each ordered pair of players meets in a group of GAMES_PER_PAIRING matches, three times over. As
+before, a player's overall score counts the groups in which it won at least one match; the
+number of matches it won is shown beside it.
+"""
+
+__AUTHOR__ = 'BEN'
+
+import random
+import sys
+
+import tournament
+
+PLAYERS = [tournament.PlayerSpec('automated', 'Ben'),
+           tournament.PlayerSpec('simpleauto', 'Jessica'),
+           tournament.PlayerSpec('number1', 'BG'),
+           tournament.PlayerSpec('number2', 'Stevie'),
+           tournament.PlayerSpec('number3', 'Maeve')]
+GAMES_PER_PAIRING = 3
+
+
+def overall_scores(standings, games_per_pairing=GAMES_PER_PAIRING):
+    """
+    Count, for each player, the groups of matches between an ordered pair in which it won at least once
+    Args:
+        standings: the tournament.Standings of a round robin
+        games_per_pairing: the number of matches in each group
+
+    Returns:
+        a dictionary from player name to overall score
+    """
+    scores = {name: 0 for name in standings.wins}
+    for start in range(0, standings.matches, games_per_pairing):
+        for name in set(standings.winners[start:start + games_per_pairing]):
+            scores[name] += 1
+    return scores
+
+
+if __name__ == '__main__':
+    master_seed = int(sys.argv[1]) if len(sys.argv) > 1 else random.randrange(2 ** 32)
+    results_path = sys.argv[2] if len(sys.argv) > 2 else None
+    standings = tournament.run_tournament(PLAYERS, master_seed, GAMES_PER_PAIRING, results_path=results_path)
+    overall = overall_scores(standings)
+
+    overall_winner = max(overall, key=overall.get)
+
+    print(f'Seed: {master_seed}  ({standings.matches} matches)')
+    print(f'Congratulations {overall_winner} on being overall winner!')
+    for name, score in overall.items():
+        summary = tournament.score_summary(standings.scores[name])
+        print(f'Overall score of {name}: {score}  ({standings.wins[name]} matches won; '
+              f'final scores: mean {summary["mean"]:.0f}, median {summary["median"]:.0f})')
@@ -0,0 +1,295 @@
+"""
+Play many Farkle turns at once for the threshold strategies.
+
+automated.FarklePlayer (and number1, number2 and number3) decides every roll from the turn
+score, the dice remaining, its own score, the high score and its Farkle danger level, and
+simpleauto.FarklePlayer always takes the highest scoring and stops. take_turns() plays one
+turn from each of many states with those decisions, a whole array of turns per roll: every
+active turn rolls at once, each roll is scored by a lookup in a RollTable, and the turns
+that stop drop out. The results are the turn scores FarkleMatch._manage_turn() would pass
+to the score sheet, with the same distribution, though not the same dice, as a match.
+choice_table() lists every scoring of every roll, for farkleenv, whose agents choose among them.
+
+Requires NumPy.
+"""
+
+import collections
+import functools
+
+try:
+    import numpy
+except ImportError:     # take_turns() needs NumPy; importing this module does not
+    numpy = None
+
+import automated
+import farkle
+import farklescoring
+
+# The starting states of many turns, as equal-length arrays:
+#   my_score: the score of the player taking the turn
+#   high_score: the high score among all players
+#   farkle_danger_level: the player's Farkle danger level
+TurnStates = collections.namedtuple('TurnStates', 'my_score high_score farkle_danger_level')
+
+# The outcomes of many turns, as arrays in the same order as the states:
+#   turn_score: the points scored, 0 for a Farkle
+#   farkled: True where the turn ended with a Farkle
+#   rolls: the number of rolls made
+TurnOutcomes = collections.namedtuple('TurnOutcomes', 'turn_score farkled rolls')
+
+# The scoring choices for every roll, as arrays indexed by roll_index():
+#   best_score, best_dice: the highest scoring and the dice it uses; 0 for a Farkle
+#   fewest_score, fewest_dice: the scoring automated.choose_scoring() picks below the ideal
+#                              score, the highest of those using the fewest dice
+RollTable = collections.namedtuple('RollTable', 'best_score best_dice fewest_score fewest_dice')
+
+# Every scoring of every roll, as arrays indexed by roll_index():
+#   points, dice: 2-D arrays of the points of each scoring and the number of dice it uses, in
+#                 the order of the scorings (highest points first), padded with 0 to the most
+#                 scorings of any roll
+#   count: the number of scorings of each roll; 0 for a Farkle
+ChoiceTable = collections.namedtuple('ChoiceTable', 'points dice count')
+
+_RADIX = (1, 7, 49, 343, 2401, 16807)      # Each count of a face is a digit in base 7
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is not installed"""
+    if numpy is None:
+        raise ImportError('turnkernel requires NumPy')
+
+
+def roll_index(histograms):
+    """
+    Number rolls by their histograms
+    Args:
+        histograms: an int array whose last axis holds 7 counts, as from farkle.histogram_batch()
+
+    Returns:
+        an int array of indexes, each between 0 and 7 ** 6 - 1
+    """
+    return histograms[..., 1:] @ numpy.array(_RADIX)
+
+
+@functools.lru_cache(maxsize=None)
+def roll_table(rules=farklescoring.STANDARD_RULES):
+    """
+    Build the RollTable for a ruleset, once per ruleset
+    Args:
+        rules: a farklescoring.Ruleset
+
+    Returns:
+        a RollTable
+    """
+    _require_numpy()
+    size = 7 ** 6
+    best_score, best_dice = numpy.zeros(size, numpy.int32), numpy.zeros(size, numpy.int8)
+    fewest_score, fewest_dice = numpy.zeros(size, numpy.int32), numpy.zeros(size, numpy.int8)
+    for packed, scorings in farklescoring.compile_ruleset(rules).items():
+        if not scorings:
+            continue
+        index = sum(count * radix for count, radix in zip(farkle.packed_histogram(packed)[1:], _RADIX))
+        best_score[index], best_dice[index] = scorings[0][0], len(scorings[0][1])
+        # An ideal score beyond any scoring always selects the fewest-dice choice
+        choice, _ = automated.choose_scoring(scorings, 0, len(scorings[0][1]), float('inf'))
+        fewest_score[index], fewest_dice[index] = scorings[choice][0], len(scorings[choice][1])
+    return RollTable(best_score, best_dice, fewest_score, fewest_dice)
+
+
+@functools.lru_cache(maxsize=None)
+def choice_table(rules=farklescoring.STANDARD_RULES):
+    """
+    Build the ChoiceTable for a ruleset, once per ruleset
+    Args:
+        rules: a farklescoring.Ruleset
+
+    Returns:
+        a ChoiceTable
+    """
+    _require_numpy()
+    size = 7 ** 6
+    compiled = farklescoring.compile_ruleset(rules)
+    width = max(len(scorings) for scorings in compiled.values())
+    points, dice = numpy.zeros((size, width), numpy.int32), numpy.zeros((size, width), numpy.int8)
+    count = numpy.zeros(size, numpy.int8)
+    for packed, scorings in compiled.items():
+        index = sum(count * radix for count, radix in zip(farkle.packed_histogram(packed)[1:], _RADIX))
+        count[index] = len(scorings)
+        for column, (score, dice_used) in enumerate(scorings):
+            points[index, column], dice[index, column] = score, len(dice_used)
+    return ChoiceTable(points, dice, count)
+
+
+def roll_indexes(nbr_of_dice, rng):
+    """
+    Roll many sets of dice at once
+    Args:
+        nbr_of_dice: an int array of the number of dice in each roll, each between 1 and 6
+        rng: a numpy.random.Generator
+
+    Returns:
+        an int array of the roll_index() of each roll
+    """
+    roll = farkle.randomize_batch(len(nbr_of_dice), 6, rng)
+    roll[numpy.arange(6) >= nbr_of_dice[:, None]] = 0       # Only the first nbr_of_dice dice count
+    return roll_index(farkle.histogram_batch(roll))
+
+
+def strategies_for(states):
+    """
+    Choose the strategy for each turn, as automated.strategy_for() does
+    Args:
+        states: a TurnStates
+
+    Returns:
+        an int array of strategy numbers between 0 and 4
+    """
+    my_score = numpy.asarray(states.my_score)
+    high_score = numpy.asarray(states.high_score)
+    danger_level = numpy.asarray(states.farkle_danger_level)
+    return numpy.select([(high_score >= 10000) & (high_score > my_score),
+                         danger_level == 2,
+                         my_score == 0,
+                         (high_score - my_score >= 1500) & (high_score >= 5000)],
+                        [0, 1, 2, 3], 4)
+
+
+def take_turns(states, ideal_scores=automated.FarklePlayer.IDEAL_SCORES, single_roll=False, rng=None,
+               rules=farklescoring.STANDARD_RULES):
+    """
+    Play one turn from each state
+    Args:
+        states: a TurnStates of equal-length arrays
+        ideal_scores: the 5 ideal scores of an automated.FarklePlayer, or an array of shape
+                      (number of states, 5) giving each turn its own
+        single_roll: True to play every turn as simpleauto.FarklePlayer does
+        rng: a numpy.random.Generator, a seed for one, or None for fresh entropy
+        rules: the farklescoring.Ruleset
+
+    Returns:
+        a TurnOutcomes
+    """
+    _require_numpy()
+    table = roll_table(rules)
+    rng = numpy.random.default_rng(rng)
+    my_score = numpy.asarray(states.my_score, numpy.int64)
+    high_score = numpy.asarray(states.high_score, numpy.int64)
+    count = len(my_score)
+
+    if single_roll:
+        strategy = numpy.ones(count, numpy.int64)      # Take the highest scoring and stop
+    else:
+        strategy = strategies_for(states)
+    ideal_scores = numpy.asarray(ideal_scores, numpy.int64)
+    if ideal_scores.ndim == 1:
+        ideal_score = ideal_scores[strategy]
+    else:
+        ideal_score = ideal_scores[numpy.arange(count), strategy]
+
+    turn_score = numpy.zeros(count, numpy.int64)
+    farkled = numpy.zeros(count, bool)
+    rolls = numpy.zeros(count, numpy.int32)
+    dice = numpy.full(count, 6, numpy.int8)
+
+    active = numpy.arange(count)
+    while active.size:
+        nbr_of_dice = dice[active]
+        index = roll_indexes(nbr_of_dice, rng)
+        rolls[active] += 1
+
+        best_score = table.best_score[index]
+        farkle_rows = best_score == 0
+        farkled[active[farkle_rows]] = True
+        turn_score[active[farkle_rows]] = 0
+        scored = ~farkle_rows
+        active, nbr_of_dice, index, best_score = active[scored], nbr_of_dice[scored], index[scored], best_score[scored]
+
+        score_before = turn_score[active]
+        active_strategy = strategy[active]
+        below_ideal = (active_strategy >= 2) & (best_score + score_before < ideal_score[active])
+        score = numpy.where(below_ideal, table.fewest_score[index], best_score)
+        dice_used = numpy.where(below_ideal, table.fewest_dice[index], table.best_dice[index])
+        keep_going = numpy.where(active_strategy == 1, False,
+                                 numpy.where(active_strategy == 0,
+                                             my_score[active] + score_before < high_score[active],
+                                             below_ideal | (dice_used == nbr_of_dice)))
+
+        turn_score[active] = score_before + score
+        dice_left = nbr_of_dice - dice_used
+        dice[active] = numpy.where(dice_left == 0, 6, dice_left)
+        active = active[keep_going]
+
+    return TurnOutcomes(turn_score, farkled, rolls)
+
+
+if __name__ == '__main__':
+    import contextlib
+    import io
+    import random
+    import time
+
+    import farklematch
+    import simpleauto
+
+    class _OneTurnMatch:
+        """Just enough of a FarkleMatch to play one turn from a given state, for testing"""
+
+        def __init__(self, state, rng):
+            self._state = state
+            self._rng = rng
+            self._table = farklescoring.compile_ruleset(farklescoring.STANDARD_RULES)
+            self._dice = 6
+            self._scorings = None
+            self.turn_score = 0
+
+        def score_for(self, player_name):
+            return self._state[0]
+
+        def high_score(self):
+            return self._state[1]
+
+        def farkle_danger_level(self, player_name):
+            return self._state[2]
+
+        def roll(self, comment):
+            packed = farkle.pack_dice(self._rng.randint(1, 6) for _ in range(self._dice))
+            self._scorings = farklescoring.table_scorings_for(self._table, packed)
+            if not self._scorings:
+                self.turn_score = 0
+                raise farklematch.Farkle()
+            return self._scorings
+
+        def score_as(self, index, comment):
+            score, dice = self._scorings[index]
+            self.turn_score += score
+            self._dice = self._dice - len(dice) or 6
+            return self._dice
+
+    turns = 20000
+    test_states = [(0, 0, 0), (0, 3000, 1), (2000, 9000, 0), (6000, 7000, 0), (4000, 5000, 2), (9000, 10400, 0)]
+    for player, single_roll in ((automated.FarklePlayer('A'), False), (simpleauto.FarklePlayer('S'), True)):
+        for state in test_states:
+            started = time.perf_counter()
+            outcomes = take_turns(TurnStates(*(numpy.full(turns, value) for value in state)),
+                                  single_roll=single_roll, rng=7771)
+            kernel_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            rng = random.Random(7771)
+            scores = []
+            for _ in range(turns):
+                match = _OneTurnMatch(state, rng)
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        player.take_turn(match)
+                except farklematch.Farkle:
+                    pass
+                scores.append(match.turn_score)
+            player_time = time.perf_counter() - started
+
+            kernel_mean, player_mean = outcomes.turn_score.mean(), numpy.mean(scores)
+            standard_error = numpy.std(scores) / turns ** 0.5
+            print(f'{type(player).__module__:>10} {str(state):>20}: kernel mean {kernel_mean:7.1f}, '
+                  f'players mean {player_mean:7.1f}, {player_time / kernel_time:5.1f} times faster')
+            assert abs(kernel_mean - player_mean) < 5 * standard_error * 2 ** 0.5 + 1e-9, 'FAIL: the means disagree'
+    print('DONE')